@@ -1,31 +1,169 @@
 import asyncio
+import struct
+
 import aiohttp
 
 from gremlin_python.driver import transport
 
 
-class AiohttpTransport(transport.AbstractBaseTransport):
+class ByteCounters:
+    """
+    Bytes passed through one or more transports. `bytes_sent` and
+    `bytes_received` count message payloads, `wire_bytes_sent` and
+    `wire_bytes_received` what actually went over the socket, i.e. after
+    compression and including websocket framing. Only transports that own
+    the socket count wire bytes,
+    :py:class:`AiohttpTransport` leaves them at `0`. Text frames are passed
+    on without encoding them, so their payload is counted in characters.
+    """
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.wire_bytes_sent = 0
+        self.wire_bytes_received = 0
+
+    def __repr__(self):
+        return ('ByteCounters(bytes_sent={}, wire_bytes_sent={}, '
+                'bytes_received={}, wire_bytes_received={})'.format(
+                    self.bytes_sent, self.wire_bytes_sent,
+                    self.bytes_received, self.wire_bytes_received))
+
+
+class Pings:
+    """
+    Outstanding websocket pings of a transport. Each ping carries a unique
+    payload, which the matching pong echoes back.
+
+    :param asyncio.BaseEventLoop loop:
+    """
 
     def __init__(self, loop):
         self._loop = loop
+        self._waiters = {}
+        self._count = 0
+
+    def new(self):
+        """
+        :returns: `tuple` of the ping payload and a future resolved when
+            the pong arrives
+        """
+        self._count += 1
+        payload = struct.pack('!Q', self._count)
+        waiter = self._loop.create_future()
+        self._waiters[payload] = waiter
+        return payload, waiter
+
+    def pong(self, payload):
+        """Resolve the ping answered by a pong, if any"""
+        waiter = self._waiters.pop(bytes(payload), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def discard(self, payload):
+        self._waiters.pop(payload, None)
+
+
+class AiohttpTransport(transport.AbstractBaseTransport):
+    """
+    Websocket transport implemented with :py:mod:`aiohttp`.
+
+    :param asyncio.BaseEventLoop loop:
+    :param int compression_level: Compress requests with
+        permessage-deflate if the server supports it and this is not `0`,
+        the default. aiohttp compresses at a fixed zlib level, so other
+        values are only passed on to custom transports
+    :param int compression_min_size: Ignored, aiohttp compresses every
+        frame once permessage-deflate is negotiated
+    :param ByteCounters byte_counters: Optional counters to update, e.g.
+        shared by all connections to a host. aiohttp doesn't expose the
+        socket, so only payload bytes are counted
+    :param aiohttp.ClientSession session: Optional session shared with other
+        transports, which keeps its connector and DNS cache across
+        connections. It is not closed with the transport. By default each
+        transport creates its own session
+    """
+
+    def __init__(self, loop, *, compression_level=0, compression_min_size=0,
+                 byte_counters=None, session=None):
+        self._loop = loop
         self._connected = False
+        self._session = session
+        self._compression_level = compression_level
+        if byte_counters is None:
+            byte_counters = ByteCounters()
+        self._byte_counters = byte_counters
+        self._compress = 0
+        self._pings = Pings(loop)
+
+    @property
+    def byte_counters(self):
+        """Read-only property"""
+        return self._byte_counters
+
+    @property
+    def compress(self):
+        """
+        Read-only property. Negotiated deflate window bits, `0` if messages
+        are not compressed.
+        """
+        return self._compress
 
     async def connect(self, url, *, ssl_context=None):
         await self.close()
-        connector = aiohttp.TCPConnector(
-            ssl_context=ssl_context, loop=self._loop)
-        self._client_session = aiohttp.ClientSession(
-            loop=self._loop, connector=connector)
-        self._ws = await self._client_session.ws_connect(url)
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                ssl_context=ssl_context, loop=self._loop)
+            self._client_session = aiohttp.ClientSession(
+                loop=self._loop, connector=connector)
+        else:
+            self._client_session = self._session
+        compress = 15 if self._compression_level else 0
+        # Pongs are needed to measure round trips, so pings are answered by
+        # `read` instead of aiohttp
+        self._ws = await self._client_session.ws_connect(
+            url, compress=compress, autoping=False)
         self._connected = True
+        self._compress = self._ws.compress
 
     async def write(self, message):
+        self._byte_counters.bytes_sent += len(message)
+        await self._send(message)
+
+    async def write_many(self, messages):
+        """
+        **coroutine** Write several messages, each as its own frame. aiohttp
+        writes each frame to the socket on its own, see
+        :py:class:`WebSocketTransport<aiogremlin.driver.websocket.transport.WebSocketTransport>`
+        for a transport that writes them at once.
+
+        :param list messages: `bytes` messages
+        """
+        self._byte_counters.bytes_sent += sum(len(m) for m in messages)
+        for message in messages:
+            await self._send(message)
+
+    async def _send(self, message):
         coro = self._ws.send_bytes(message)
         if asyncio.iscoroutine(coro):
-          await coro
+            await coro
 
     async def read(self):
-        data = await self._ws.receive()
+        """
+        **coroutine** Read the next frame without re-encoding it.
+
+        :returns: `str` for text frames, `bytes` for binary frames
+        """
+        while True:
+            data = await self._ws.receive()
+            if data.type == aiohttp.WSMsgType.ping:
+                coro = self._ws.pong(data.data)
+                if asyncio.iscoroutine(coro):
+                    await coro
+            elif data.type == aiohttp.WSMsgType.pong:
+                self._pings.pong(data.data)
+            else:
+                break
         if data.type == aiohttp.WSMsgType.close:
             await self._transport.close()
             raise RuntimeError("Connection closed by server")
@@ -35,18 +173,35 @@ class AiohttpTransport(transport.AbstractBaseTransport):
         elif data.type == aiohttp.WSMsgType.closed:
             # Hmm
             raise RuntimeError("Connection closed by server")
-        elif data.type == aiohttp.WSMsgType.text:
-            # Should return bytes
-            data = data.data.strip().encode('utf-8')
         else:
             data = data.data
+        self._byte_counters.bytes_received += len(data)
         return data
 
+    async def ping(self):
+        """
+        **coroutine** Send a ping and wait for the pong. Pongs are only
+        seen while another task is reading from the transport.
+
+        :returns: Round trip time in seconds
+        """
+        payload, waiter = self._pings.new()
+        start = self._loop.time()
+        try:
+            coro = self._ws.ping(payload)
+            if asyncio.iscoroutine(coro):
+                await coro
+            await waiter
+        finally:
+            self._pings.discard(payload)
+        return self._loop.time() - start
+
     async def close(self):
         if self._connected:
             if not self._ws.closed:
                 await self._ws.close()
-            if not self._client_session.closed:
+            if (self._session is None and
+                    not self._client_session.closed):
                 await self._client_session.close()
 
     @property
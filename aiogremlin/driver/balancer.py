@@ -0,0 +1,221 @@
+"""Policies that pick the host for each request."""
+import itertools
+import math
+import random
+
+
+class HostStats:
+    """
+    Requests and latency of one host, collected by its connections and by
+    the cluster while it waits for one of them.
+
+    The latency estimate is a moving average that jumps to a slower
+    response right away, so a host that starts stalling is avoided after
+    one slow response, and recovers gradually. While a host gets no
+    responses its estimate decays towards zero, so policies that avoid
+    slow hosts try it again eventually.
+
+    :param asyncio.BaseEventLoop loop:
+    :param float smoothing: Weight of the latest latency in the estimate
+    :param float decay: Seconds for the estimate of a host without
+        responses to decay to about a third
+    :param breaker: Optional
+        :py:class:`CircuitBreaker<aiogremlin.driver.health.CircuitBreaker>`
+        of the host, told the outcome of every request
+    """
+
+    def __init__(self, loop, *, smoothing=0.3, decay=10.0, breaker=None):
+        self._loop = loop
+        self._breaker = breaker
+        self._smoothing = smoothing
+        self._decay = decay
+        self._latency = None
+        self._updated = None
+        self.inflight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+
+    def __repr__(self):
+        latency = self.latency
+        return ('HostStats(outstanding={}, requests={}, errors={}, '
+                'latency={})'.format(
+                    self.outstanding, self.requests, self.errors,
+                    'None' if latency is None else '{:.6f}'.format(latency)))
+
+    @property
+    def outstanding(self):
+        """
+        Read-only property. Requests sent and not answered yet, plus those
+        waiting for a connection.
+
+        :returns: `int`
+        """
+        return self.inflight + self.waiting
+
+    @property
+    def latency(self):
+        """
+        Read-only property. Latency estimate in seconds, `None` before the
+        first response.
+
+        :returns: `float`
+        """
+        if self._latency is None:
+            return None
+        idle = self._loop.time() - self._updated
+        return self._latency * math.exp(-idle / self._decay)
+
+    def started(self):
+        """Count a request sent to the host"""
+        self.inflight += 1
+
+    def abandoned(self):
+        """
+        Count a request the client gave up on, e.g. by closing its
+        connection, without counting it as failed
+        """
+        self.inflight -= 1
+
+    def finished(self, latency=None, status_code=None):
+        """
+        Count a completed request.
+
+        :param float latency: Seconds from sending the request until its
+            response was complete, `None` if it failed without a response
+        :param int status_code: Status code of the response
+        """
+        self.inflight -= 1
+        self.requests += 1
+        if latency is None or (status_code is not None and
+                               status_code not in (200, 204, 206)):
+            self.errors += 1
+        if self._breaker is not None:
+            self._breaker.record(
+                latency is not None and
+                status_code not in self._breaker.failure_status_codes)
+        if latency is None:
+            return
+        estimate = self.latency
+        if estimate is None or latency > estimate:
+            estimate = latency
+        else:
+            estimate += (latency - estimate) * self._smoothing
+        self._latency = estimate
+        self._updated = self._loop.time()
+
+
+class LoadBalancer:
+    """
+    Base class of the policies that pick a host for each request sent by
+    a :py:class:`Cluster<aiogremlin.driver.cluster.Cluster>`, configured
+    with its `load_balancer` setting. Policies are instantiated without
+    arguments, or can be passed as an instance.
+    """
+
+    def select(self, hosts):
+        """
+        Pick a host.
+
+        :param hosts: Non empty sequence of the
+            :py:class:`GremlinServer<aiogremlin.driver.server.GremlinServer>`
+            hosts in service, in the same order for every call unless hosts
+            are added or removed
+        :returns: :py:class:`GremlinServer<aiogremlin.driver.server.GremlinServer>`
+        """
+        raise NotImplementedError
+
+
+class RoundRobin(LoadBalancer):
+    """Each host in turn"""
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, hosts):
+        return hosts[next(self._counter) % len(hosts)]
+
+
+class LeastLatency(LoadBalancer):
+    """
+    The host with the lowest latency estimate times outstanding requests
+    plus one, see :py:class:`HostStats`. Hosts without responses yet are
+    assumed to be as fast as the others on average, so they don't get all
+    requests until their first responses arrive. Ties are broken in turn.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, hosts):
+        num_hosts = len(hosts)
+        start = next(self._counter)
+        latencies = [host.stats.latency for host in hosts]
+        known = [latency for latency in latencies if latency is not None]
+        # Without any estimate, outstanding requests decide
+        default = sum(known) / len(known) if known else 1.0
+        best = best_cost = None
+        for i in range(num_hosts):
+            index = (start + i) % num_hosts
+            host = hosts[index]
+            latency = latencies[index]
+            if latency is None:
+                latency = default
+            cost = latency * (host.stats.outstanding + 1)
+            if best is None or cost < best_cost:
+                best, best_cost = host, cost
+        return best
+
+
+class PowerOfTwoChoices(LoadBalancer):
+    """
+    Of two hosts picked at random, the one with fewer outstanding
+    requests, or with the lower latency estimate if both have as many.
+
+    :param random.Random rand: Optional random number generator
+    """
+
+    def __init__(self, rand=None):
+        self._random = rand or random.Random()
+
+    def select(self, hosts):
+        if len(hosts) == 1:
+            return hosts[0]
+        first, second = self._random.sample(range(len(hosts)), 2)
+        return min(hosts[first], hosts[second], key=_load)
+
+
+class Weighted(LoadBalancer):
+    """
+    Each host in turn, as often as its
+    :py:attr:`weight<aiogremlin.driver.server.GremlinServer.weight>`
+    relative to the other hosts, spread out evenly (smooth weighted round
+    robin). Hosts with a weight of `0` only get requests if all hosts do.
+    """
+
+    def __init__(self):
+        self._current = {}
+
+    def select(self, hosts):
+        current = self._current
+        if len(current) > 2 * len(hosts):
+            # Forget hosts that are gone
+            current = self._current = {
+                host: current.get(host, 0) for host in hosts}
+        weighted = [(host, host.weight) for host in hosts if host.weight > 0]
+        if not weighted:
+            weighted = [(host, 1) for host in hosts]
+        total = sum(weight for _, weight in weighted)
+        best = best_current = None
+        for host, weight in weighted:
+            value = current[host] = current.get(host, 0) + weight
+            if best is None or value > best_current:
+                best, best_current = host, value
+        current[best] -= total
+        return best
+
+
+def _load(host):
+    stats = host.stats
+    latency = stats.latency
+    return stats.outstanding, latency if latency is not None else 0
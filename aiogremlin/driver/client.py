@@ -1,16 +1,24 @@
 """Client for the Tinkerpop 3 Gremlin Server."""
 
+import collections
+
 from aiogremlin import exception
+from aiogremlin.driver import limit, script
 
 from gremlin_python.driver import request
 from gremlin_python.process import traversal
 
 
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
 class Client:
     """
     Client that utilizes a :py:class:`Cluster<aiogremlin.driver.cluster.Cluster>`
-    to access a cluster of Gremlin Server hosts. Issues requests to hosts using
-    a round robin strategy.
+    to access a cluster of Gremlin Server hosts. Issues requests to the hosts
+    picked by the cluster's
+    :py:attr:`load_balancer<aiogremlin.driver.cluster.Cluster.load_balancer>`.
 
     :param aiogremlin.driver.cluster.Cluster cluster: Cluster used by
         client
@@ -24,6 +32,11 @@ class Client:
             aliases = {}
         self._hostname = hostname
         self._aliases = aliases
+        self._lift_literals = cluster.config['lift_literals']
+        self._scripts = collections.OrderedDict()
+        self._script_cache_size = cluster.config['script_cache_size']
+        self._script_cache_hits = 0
+        self._script_cache_misses = 0
 
     @property
     def aliases(self):
@@ -54,15 +67,58 @@ class Client:
                         aliases=aliases)
         return client
 
-    async def submit(self, message, bindings=None):
+    def prepare(self, gremlin):
+        """
+        Prepare a script that is submitted many times with different
+        bindings. Prepared scripts are cached per client, see
+        :py:meth:`script_cache_info`.
+
+        :param str gremlin: Gremlin script
+        :returns: :py:class:`PreparedScript<aiogremlin.driver.script.PreparedScript>`
+        """
+        prepared = self._scripts.get(gremlin)
+        if prepared is None:
+            self._script_cache_misses += 1
+            prepared = script.PreparedScript(self, gremlin)
+            self._scripts[gremlin] = prepared
+            if len(self._scripts) > self._script_cache_size:
+                self._scripts.popitem(last=False)
+        else:
+            self._script_cache_hits += 1
+            self._scripts.move_to_end(gremlin)
+        return prepared
+
+    def script_cache_info(self):
+        """
+        Statistics of the prepared script cache, used by :py:meth:`prepare`
+        and, if `lift_literals` is configured, by :py:meth:`submit`.
+
+        :returns: `CacheInfo` named tuple of `hits`, `misses`, `maxsize` and
+            `currsize`
+        """
+        return CacheInfo(self._script_cache_hits, self._script_cache_misses,
+                         self._script_cache_size, len(self._scripts))
+
+    async def submit(self, message, bindings=None, *, http=None,
+                     priority=limit.PRIORITY_NORMAL):
         """
         **coroutine** Submit a script and bindings to the Gremlin Server.
 
         :param message: Can be an instance of
-            `RequestMessage<gremlin_python.driver.request.RequestMessage>` or
-            `Bytecode<gremlin_python.process.traversal.Bytecode>`
+            `RequestMessage<gremlin_python.driver.request.RequestMessage>`,
+            `Bytecode<gremlin_python.process.traversal.Bytecode>`,
+            :py:class:`PreparedScript<aiogremlin.driver.script.PreparedScript>`
             or a `str` representing a raw Gremlin script
         :param dict bindings: Optional bindings used with raw Grelmin
+        :param bool http: Submit a script over HTTP instead of a websocket
+            connection. Default is the cluster's `http` setting, which only
+            applies to scripts; traversals always use websockets
+        :param int priority: Requests with lower values acquire pool
+            connections and in-flight slots first, e.g.
+            :py:data:`PRIORITY_HIGH<aiogremlin.driver.limit.PRIORITY_HIGH>`
+            for interactive and
+            :py:data:`PRIORITY_LOW<aiogremlin.driver.limit.PRIORITY_LOW>`
+            for batch requests
         :returns: :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`
             object
         """
@@ -71,14 +127,30 @@ class Client:
                 processor='traversal', op='bytecode',
                 args={'gremlin': message,
                       'aliases': self._aliases})
-        elif isinstance(message, str):
+        elif isinstance(message, (str, script.PreparedScript)):
+            if isinstance(message, str) and self._lift_literals:
+                gremlin, literals = script.lift_literals(
+                    message, reserved=bindings or ())
+                if literals:
+                    literals.update(bindings or {})
+                    bindings = literals
+                message = self.prepare(gremlin)
+            if (isinstance(message, script.PreparedScript) and
+                    not hasattr(self.message_serializer,
+                                '_serialize_prepared')):
+                # The serializer can't cache the request
+                message = message.script
             message = request.RequestMessage(
                 processor='', op='eval',
                 args={'gremlin': message,
                       'aliases': self._aliases})
             if bindings:
                 message.args.update({'bindings': bindings})
-        conn = await self.cluster.get_connection(hostname=self._hostname)
-        resp = await conn.write(message)
+        if http is None:
+            http = (self.cluster.config['http'] and
+                    getattr(message, 'op', None) == 'eval')
+        conn = await self.cluster.get_connection(
+            hostname=self._hostname, http=http, priority=priority)
+        resp = await conn.write(message, priority=priority)
         self._loop.create_task(conn.release_task(resp))
         return resp
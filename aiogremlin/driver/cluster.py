@@ -1,7 +1,11 @@
 import asyncio
 import collections
+import concurrent.futures
 import configparser
 import importlib
+import itertools
+import logging
+import socket
 
 try:
     import ujson as json
@@ -15,6 +19,9 @@ from aiogremlin import driver
 from gremlin_python.driver import serializer
 
 
+logger = logging.getLogger(__name__)
+
+
 def my_import(name):
     names = name.rsplit('.', maxsplit=1)
     if len(names) != 2:
@@ -52,8 +59,48 @@ class Cluster:
         'min_conns': 1,
         'max_times_acquired': 16,
         'max_inflight': 64,
-        'message_serializer': 'gremlin_python.driver.serializer.GraphSONMessageSerializer',
-        'provider': 'aiogremlin.driver.provider.TinkerGraph'
+        'message_serializer': 'aiogremlin.driver.serializer.GraphSONMessageSerializer',
+        'json_backend': 'json',
+        'lazy_results': False,
+        'lift_literals': False,
+        'compression_level': 0,
+        'compression_min_size': 1024,
+        'script_cache_size': 128,
+        'decode_executor': None,
+        'decode_workers': None,
+        'decode_threshold': 1024 * 1024,
+        'provider': 'aiogremlin.driver.provider.TinkerGraph',
+        'transport': 'aiogremlin.driver.aiohttp.transport.AiohttpTransport',
+        'http': False,
+        'dns_cache_ttl': 10,
+        'reconnect_delay': 0.1,
+        'reconnect_max_delay': 30,
+        'heartbeat_interval': 30,
+        'heartbeat_timeout': 10,
+        'idle_timeout': None,
+        'buffer_size': None,
+        'result_buffer_size': None,
+        'buffer_timeout': 30,
+        'coalesce_writes': False,
+        'coalesce_max_bytes': 65536,
+        'coalesce_max_delay': 0,
+        'connect_timeout': 10,
+        'max_handshakes': 2,
+        'min_inflight': None,
+        'inflight_tolerance': 2.0,
+        'reserved_inflight': 0,
+        'load_balancer': 'aiogremlin.driver.balancer.RoundRobin',
+        'host_weights': None,
+        'failure_threshold': 5,
+        'failure_rate': 0.5,
+        'failure_window': 20,
+        'failure_status_codes': [429],
+        'probe_interval': 5,
+        'probe_timeout': 5,
+        'probe_script': '1',
+        'drain_timeout': 30,
+        'resolve_hostname': None,
+        'resolve_interval': 10
     }
 
     def __init__(self, loop, aliases=None, **config):
@@ -63,7 +110,13 @@ class Cluster:
         self._config = self._process_config_imports(default_config)
         self._hosts = collections.deque()
         self._hostmap = {}
+        self._down_hosts = []
+        self._balancer = None
+        self._recover_task = None
+        self._resolve_task = None
+        self._draining = {}
         self._closed = False
+        self._decode_executor = None
         if aliases is None:
             aliases = {}
         self._aliases = aliases
@@ -88,9 +141,21 @@ class Cluster:
 
     @property
     def hosts(self):
-        """Read-only property"""
+        """Read-only property. Hosts in service"""
         return self._hosts
 
+    @property
+    def down_hosts(self):
+        """
+        Read-only property. Hosts that could not be reached when the
+        cluster was established or they were added. They are retried every `probe_interval`
+        seconds and put in service once they can be reached.
+
+        :returns: `list` of
+            :py:class:`GremlinServer<aiogremlin.driver.server.GremlinServer>`
+        """
+        return self._down_hosts
+
     @property
     def config(self):
         """
@@ -100,10 +165,35 @@ class Cluster:
         """
         return self._config
 
-    async def get_connection(self, hostname=None):
+    @property
+    def load_balancer(self):
+        """
+        Read-only property. Policy that picks the host for each request,
+        from the `load_balancer` setting.
+
+        :returns: :py:class:`LoadBalancer<aiogremlin.driver.balancer.LoadBalancer>`
+        """
+        if self._balancer is None:
+            balancer = self._config['load_balancer']
+            if isinstance(balancer, type):
+                balancer = balancer()
+            self._balancer = balancer
+        return self._balancer
+
+    async def get_connection(self, hostname=None, http=False,
+                             priority=driver.limit.PRIORITY_NORMAL):
         """
-        **coroutine** Get connection from next available host in a round robin
-        fashion.
+        **coroutine** Get connection from the host picked by the
+        :py:attr:`load_balancer`. Hosts whose
+        :py:attr:`breaker<aiogremlin.driver.server.GremlinServer.breaker>`
+        is open are skipped, unless all of them are.
+
+        :param str hostname: Optional host to connect to, even if its
+            circuit is open
+        :param bool http: Get the host's connection that submits scripts
+            over HTTP instead of a websocket connection
+        :param int priority: Acquirers with lower values get pool
+            connections first
 
         :returns: :py:class:`Connection<aiogremlin.driver.connection.Connection>`
         """
@@ -115,25 +205,254 @@ class Cluster:
             except KeyError:
                 raise exception.ConfigError(
                     'Unknown host: {}'.format(hostname))
+            if host.down:
+                raise exception.ConnectionLostError(
+                    'Host {} is down: {}'.format(hostname, host.error))
         else:
-            host = self._hosts.popleft()
-        conn = await host.get_connection()
-        self._hosts.append(host)
-        return conn
+            hosts = [host for host in self._hosts if host.breaker.available]
+            host = self.load_balancer.select(hosts or self._hosts)
+        stats = host.stats
+        stats.waiting += 1
+        try:
+            return await host.get_connection(http=http, priority=priority)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            host.breaker.record(False)
+            raise
+        finally:
+            stats.waiting -= 1
 
     async def establish_hosts(self):
         """
-        **coroutine** Connect to all hosts as specified in configuration.
+        **coroutine** Connect to all hosts as specified in configuration,
+        concurrently. Hosts that can't be reached within `connect_timeout`
+        are marked down instead, unless no host can be reached at all.
+        Hosts established before are closed and replaced.
+
+        If `resolve_hostname` is configured, the hosts are the addresses
+        that name resolves to instead, and it is resolved again every
+        `resolve_interval` seconds, see :py:meth:`add_host` and
+        :py:meth:`remove_host`.
         """
-        scheme = self._config['scheme']
-        hosts = self._config['hosts']
-        port = self._config['port']
-        for hostname in hosts:
-            url = '{}://{}:{}/gremlin'.format(scheme, hostname, port)
-            host = await driver.GremlinServer.open(
-                url, self._loop, **dict(self._config))
-            self._hosts.append(host)
+        old_hosts = list(self._hostmap.values())
+        self._hostmap = {}
+        self._hosts.clear()
+        self._down_hosts = []
+        await asyncio.gather(*[host.close() for host in old_hosts],
+                             loop=self._loop)
+        name = self._config['resolve_hostname']
+        config = self._host_config()
+        hosts = collections.OrderedDict()
+        if name:
+            for address in await self._resolve(name):
+                hosts[address] = self._create_resolved_host(address, config)
+        else:
+            for hostname in self._config['hosts']:
+                hosts[hostname] = self._create_host(hostname, config)
+        results = await asyncio.gather(
+            *[host.initialize() for host in hosts.values()],
+            loop=self._loop, return_exceptions=True)
+        for (hostname, host), result in zip(hosts.items(), results):
             self._hostmap[hostname] = host
+            if isinstance(result, Exception):
+                logger.warning('Host %s is down: %r', host.url, result)
+                self._down_hosts.append(host)
+            else:
+                self._hosts.append(host)
+        if not self._hosts and self._down_hosts:
+            raise self._down_hosts[0].error
+        self._start_recovery()
+        if name and self._resolve_task is None:
+            self._resolve_task = self._loop.create_task(
+                self._resolve_periodically(name))
+
+    async def add_host(self, hostname):
+        """
+        **coroutine** Connect to another host and put it in service. A
+        host that can't be reached is added to the :py:attr:`down_hosts`
+        and retried every `probe_interval` seconds.
+
+        :param str hostname: Host name or address, it is connected to with
+            the configured `scheme` and `port`
+        :returns: :py:class:`GremlinServer<aiogremlin.driver.server.GremlinServer>`
+        """
+        host = self._hostmap.get(hostname)
+        if host is not None:
+            return host
+        host = self._create_host(hostname, self._host_config())
+        await self._add_host(hostname, host)
+        return host
+
+    async def remove_host(self, hostname, *, timeout=None):
+        """
+        **coroutine** Take a host out of service. It gets no more
+        requests right away, and is closed once the requests sent to it
+        are done, see
+        :py:meth:`GremlinServer.drain<aiogremlin.driver.server.GremlinServer.drain>`.
+        The host keeps draining if this coroutine is cancelled.
+
+        :param str hostname: Host name or address it was added with
+        :param float timeout: Seconds to wait for outstanding requests
+            before the host is closed anyway. Default is the
+            `drain_timeout` setting
+        :returns: `bool`, whether the host was drained before it was closed
+        """
+        task = self._start_drain(hostname, timeout)
+        return await asyncio.shield(task, loop=self._loop)
+
+    async def _add_host(self, hostname, host):
+        self._hostmap[hostname] = host
+        try:
+            await host.initialize()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning('Host %s is down: %r', host.url, e)
+            self._down_hosts.append(host)
+            self._start_recovery()
+        else:
+            logger.info('Host %s added', host.url)
+            self._hosts.append(host)
+
+    async def _add_resolved_host(self, address):
+        host = self._create_resolved_host(address, self._host_config())
+        await self._add_host(address, host)
+
+    def _start_drain(self, hostname, timeout=None):
+        # Take the host out of service and close it in the background
+        try:
+            host = self._hostmap.pop(hostname)
+        except KeyError:
+            raise exception.ConfigError('Unknown host: {}'.format(hostname))
+        if host in self._hosts:
+            self._hosts.remove(host)
+        if host in self._down_hosts:
+            self._down_hosts.remove(host)
+        if timeout is None:
+            timeout = self._config['drain_timeout']
+        task = self._loop.create_task(self._drain(host, timeout))
+        self._draining[task] = host
+        task.add_done_callback(self._draining.pop)
+        return task
+
+    async def _drain(self, host, timeout):
+        drained = await host.drain(timeout)
+        if not drained:
+            logger.warning('Closing host %s with requests outstanding',
+                           host.url)
+        await host.close()
+        return drained
+
+    def _host_config(self):
+        config = dict(self._config)
+        config['decode_executor'] = self._get_decode_executor()
+        return config
+
+    def _create_host(self, hostname, config, address=None):
+        weight = (config['host_weights'] or {}).get(address or hostname, 1)
+        if ':' in hostname:
+            # IPv6 address
+            hostname = '[{}]'.format(hostname)
+        url = '{}://{}:{}/gremlin'.format(
+            config['scheme'], hostname, config['port'])
+        return driver.GremlinServer(
+            url, self._loop, weight=weight, address=address, **config)
+
+    def _create_resolved_host(self, address, config):
+        if config['scheme'] in ('wss', 'https'):
+            # Certificates are issued for the name, not its addresses
+            return self._create_host(
+                config['resolve_hostname'], config, address=address)
+        return self._create_host(address, config)
+
+    def _start_recovery(self):
+        if self._down_hosts and self._recover_task is None:
+            self._recover_task = self._loop.create_task(self._recover())
+
+    async def _recover(self):
+        try:
+            while self._down_hosts:
+                await asyncio.sleep(
+                    self._config['probe_interval'], loop=self._loop)
+                down_hosts = list(self._down_hosts)
+                results = await asyncio.gather(
+                    *[host.initialize() for host in down_hosts],
+                    loop=self._loop, return_exceptions=True)
+                for host, result in zip(down_hosts, results):
+                    if isinstance(result, Exception):
+                        continue
+                    if host not in self._down_hosts:
+                        # Removed meanwhile
+                        await host.close()
+                        continue
+                    logger.info('Host %s is up again', host.url)
+                    self._down_hosts.remove(host)
+                    self._hosts.append(host)
+        finally:
+            self._recover_task = None
+
+    async def _resolve(self, name):
+        infos = await self._loop.getaddrinfo(
+            name, self._config['port'], type=socket.SOCK_STREAM)
+        addresses = []
+        for family, type_, proto, canonname, sockaddr in infos:
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses
+
+    async def _resolve_periodically(self, name):
+        while True:
+            await asyncio.sleep(
+                self._config['resolve_interval'], loop=self._loop)
+            try:
+                addresses = await self._resolve(name)
+            except OSError as e:
+                logger.warning('Could not resolve %s: %r', name, e)
+                continue
+            if not addresses:
+                continue
+            added = [address for address in addresses
+                     if address not in self._hostmap]
+            removed = [hostname for hostname in self._hostmap
+                       if hostname not in addresses]
+            if added or removed:
+                logger.info('%s resolved to %s', name, ', '.join(addresses))
+            # Removed hosts drain in the background, so a slow one doesn't
+            # hold up later resolutions
+            for hostname in removed:
+                try:
+                    self._start_drain(hostname)
+                except Exception as e:
+                    logger.warning('Could not remove host %s: %r',
+                                   hostname, e)
+            results = await asyncio.gather(
+                *[self._add_resolved_host(address) for address in added],
+                loop=self._loop, return_exceptions=True)
+            for address, result in zip(added, results):
+                if isinstance(result, Exception):
+                    logger.warning('Could not add host %s: %r',
+                                   address, result)
+
+    def _get_decode_executor(self):
+        # Executors passed in the config belong to the caller, those
+        # created from 'thread' or 'process' are shut down on close
+        executor = self._config['decode_executor']
+        if executor is None or isinstance(
+                executor, concurrent.futures.Executor):
+            return executor
+        if self._decode_executor is None:
+            workers = self._config['decode_workers']
+            if executor == 'thread':
+                self._decode_executor = concurrent.futures.ThreadPoolExecutor(
+                    workers)
+            elif executor == 'process':
+                self._decode_executor = (
+                    concurrent.futures.ProcessPoolExecutor(workers))
+            else:
+                raise exception.ConfigError(
+                    'Unknown decode executor: {}'.format(executor))
+        return self._decode_executor
 
     def config_from_file(self, filename):
         """
@@ -173,10 +492,16 @@ class Cluster:
     def _process_config_imports(self, config):
         message_serializer = config.get('message_serializer')
         provider = config.get('provider')
+        transport = config.get('transport')
+        load_balancer = config.get('load_balancer')
         if isinstance(message_serializer, str):
             config['message_serializer'] = my_import(message_serializer)
         if isinstance(provider, str):
             config['provider'] = my_import(provider)
+        if isinstance(transport, str):
+            config['transport'] = my_import(transport)
+        if isinstance(load_balancer, str):
+            config['load_balancer'] = my_import(load_balancer)
         return config
 
     def config_from_module(self, module):
@@ -215,10 +540,30 @@ class Cluster:
         return client
 
     async def close(self):
-        """**coroutine** Close cluster and all connected hosts."""
-        waiters = []
-        while self._hosts:
-            host = self._hosts.popleft()
-            waiters.append(host.close())
-        await asyncio.gather(*waiters, loop=self._loop)
+        """
+        **coroutine** Close cluster and all its hosts, including those that
+        are down or still draining after :py:meth:`remove_host`.
+        """
+        for task in (self._recover_task, self._resolve_task):
+            if task is not None:
+                task.cancel()
+        self._recover_task = self._resolve_task = None
+        # Hosts that are down or still draining are closed as well
+        draining, self._draining = self._draining, {}
+        hosts = list(self._hostmap.values())
+        hosts.extend(host for host in itertools.chain(
+            self._hosts, self._down_hosts, draining.values())
+            if host not in hosts)
+        tasks = list(draining)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, loop=self._loop, return_exceptions=True)
+        self._hostmap = {}
+        self._hosts.clear()
+        self._down_hosts = []
+        await asyncio.gather(*[host.close() for host in hosts],
+                             loop=self._loop)
+        if self._decode_executor is not None:
+            self._decode_executor.shutdown(wait=False)
+            self._decode_executor = None
         self._closed = True
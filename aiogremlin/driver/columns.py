@@ -0,0 +1,187 @@
+"""Columnar export of results, e.g. from `valueMap` or `project` steps."""
+
+import array
+import collections
+import enum
+import importlib
+
+from gremlin_python import statics
+from gremlin_python.process.traversal import Traverser
+
+
+VALUE_COLUMN = 'value'
+"""Column name used for results that are not maps"""
+
+
+_TYPECODES = {
+    bool: 'b',
+    int: 'q',
+    statics.long: 'q',
+    float: 'd'
+}
+
+_NUMPY_DTYPES = {
+    'b': 'bool',
+    'q': 'int64',
+    'd': 'float64'
+}
+
+
+def _import_optional(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise ImportError(
+            'Columnar export requires {0}: pip install {0}'.format(name))
+
+
+def _column_name(key):
+    if isinstance(key, enum.Enum):
+        return key.name
+    return str(key)
+
+
+class _Column:
+    """
+    A growable column. Values are kept in a typed :py:class:`array.array`
+    as long as they are all bools, ints or floats of one kind, otherwise the
+    column falls back to a :py:class:`list`.
+    """
+    __slots__ = ('typecode', 'values')
+
+    def __init__(self, length=0):
+        self.typecode = None
+        self.values = [None] * length
+
+    def append(self, value):
+        typecode = self.typecode
+        if typecode is not None:
+            if _TYPECODES.get(type(value)) == typecode:
+                try:
+                    self.values.append(value)
+                    return
+                except OverflowError:
+                    pass
+            self._to_list()
+        elif not self.values:
+            typecode = _TYPECODES.get(type(value))
+            if typecode is not None:
+                try:
+                    self.values = array.array(typecode, (value,))
+                    self.typecode = typecode
+                    return
+                except OverflowError:
+                    pass
+        self.values.append(value)
+
+    def tolist(self):
+        if self.typecode == 'b':
+            return [bool(value) for value in self.values]
+        elif self.typecode is not None:
+            return self.values.tolist()
+        return self.values
+
+    def _to_list(self):
+        self.values = self.tolist()
+        self.typecode = None
+
+
+class ColumnBuilder:
+    """
+    Build columns from result rows without keeping the rows themselves.
+    Map results contribute one column per key, any other result goes to
+    the :py:data:`VALUE_COLUMN` column. Keys missing from a row are filled
+    with `None`. Traversers are expanded according to their bulk.
+
+    :param bool unfold: Store single item lists, as returned by `valueMap`,
+        as the item itself. Default is `True`
+    """
+
+    def __init__(self, unfold=True):
+        self._unfold = unfold
+        self._columns = collections.OrderedDict()
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def add(self, row):
+        """Add a single result row"""
+        if type(row) is Traverser:
+            for _ in range(row.bulk):
+                self._add(row.object)
+        else:
+            self._add(row)
+
+    def extend(self, rows):
+        """Add all rows from an iterable"""
+        for row in rows:
+            self.add(row)
+
+    def to_columns(self):
+        """
+        :returns: :py:class:`collections.OrderedDict` of column name to
+            :py:class:`array.array` (numeric columns) or :py:class:`list`
+        """
+        return collections.OrderedDict(
+            (key, column.values) for key, column in self._columns.items())
+
+    def to_numpy(self):
+        """
+        :returns: :py:class:`collections.OrderedDict` of column name to
+            one dimensional `numpy.ndarray`. Numeric columns are wrapped
+            without copying, all other columns have dtype `object`
+        """
+        numpy = _import_optional('numpy')
+        columns = collections.OrderedDict()
+        for key, column in self._columns.items():
+            if column.typecode is None:
+                values = numpy.empty(len(column.values), dtype=object)
+                # Assigned one by one, a slice assignment would broadcast
+                # values that are lists of equal length
+                for i, value in enumerate(column.values):
+                    values[i] = value
+            else:
+                values = numpy.frombuffer(
+                    column.values, dtype=_NUMPY_DTYPES[column.typecode])
+            columns[key] = values
+        return columns
+
+    def to_arrow(self):
+        """
+        :returns: `pyarrow.Table` with one column per key. Column names are
+            converted to strings, int and float columns are wrapped without
+            copying
+        """
+        pyarrow = _import_optional('pyarrow')
+        names = []
+        arrays = []
+        for key, column in self._columns.items():
+            names.append(_column_name(key))
+            if column.typecode in ('q', 'd'):
+                # Arrow's int64/float64 layout matches the array buffer
+                arrays.append(pyarrow.Array.from_buffers(
+                    pyarrow.from_numpy_dtype(_NUMPY_DTYPES[column.typecode]),
+                    len(column.values),
+                    [None, pyarrow.py_buffer(column.values)]))
+            else:
+                arrays.append(pyarrow.array(column.tolist()))
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    def _add(self, row):
+        if not isinstance(row, dict):
+            row = {VALUE_COLUMN: row}
+        columns = self._columns
+        unfold = self._unfold
+        for key, value in row.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = _Column(self._length)
+            if unfold and type(value) is list and len(value) == 1:
+                value = value[0]
+            column.append(value)
+        self._length += 1
+        if len(row) != len(columns):
+            for column in columns.values():
+                if len(column.values) < self._length:
+                    column.append(None)
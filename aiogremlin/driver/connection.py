@@ -7,15 +7,108 @@ try:
 except ImportError:
     import json
 
-from aiogremlin.driver import provider, resultset
-from aiogremlin.driver.protocol import GremlinServerWSProtocol
+from aiogremlin import exception
+from aiogremlin.driver import limit, provider, resultset, serializer
+from aiogremlin.driver.protocol import (
+    DEFAULT_DECODE_THRESHOLD, GremlinServerWSProtocol)
 from aiogremlin.driver.aiohttp.transport import AiohttpTransport
-from gremlin_python.driver import serializer
 
 
 logger = logging.getLogger(__name__)
 
 
+class WriteBuffer:
+    """
+    Coalesces the requests written to a transport within one event loop
+    iteration, or within `max_delay` seconds, into a single socket write.
+    Transports without `write_many` get the requests one by one, still
+    without an event loop round trip per request.
+
+    :param asyncio.BaseEventLoop loop:
+    :param transport: Transport the requests are written to
+    :param int max_bytes: Buffered bytes that trigger a write right away
+    :param float max_delay: Seconds to wait for more requests, `0` writes
+        in the next event loop iteration
+    """
+
+    def __init__(self, loop, transport, *, max_bytes=65536, max_delay=0):
+        self._loop = loop
+        self._transport = transport
+        self._max_bytes = max_bytes
+        self._max_delay = max_delay
+        self._messages = []
+        self._size = 0
+        self._waiters = []
+        self._handle = None
+        self._lock = asyncio.Lock(loop=loop)
+        self.writes = 0
+        self.messages = 0
+
+    def write(self, message):
+        """
+        Buffer a request.
+
+        :param bytes message: Serialized request
+        :returns: :py:class:`asyncio.Future` resolved once the request is
+            written. Each request gets its own future, cancelling it does not
+            affect the other requests of the same write.
+        """
+        if not self._waiters:
+            if self._max_delay:
+                self._handle = self._loop.call_later(
+                    self._max_delay, self.flush)
+            else:
+                self._handle = self._loop.call_soon(self.flush)
+        waiter = self._loop.create_future()
+        self._messages.append(message)
+        self._waiters.append(waiter)
+        self._size += len(message)
+        if self._size >= self._max_bytes:
+            self.flush()
+        return waiter
+
+    def flush(self):
+        """Write the buffered requests"""
+        if not self._waiters:
+            return
+        self._handle.cancel()
+        messages, waiters = self._messages, self._waiters
+        self._messages, self._size, self._waiters = [], 0, []
+        self._loop.create_task(self._write(messages, waiters))
+
+    def fail(self, exc):
+        """Drop the buffered requests, failing their writers with `exc`"""
+        if self._waiters:
+            self._handle.cancel()
+            for waiter in self._waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            self._messages, self._size, self._waiters = [], 0, []
+
+    async def _write(self, messages, waiters):
+        # The lock keeps the order of overlapping writes
+        try:
+            async with self._lock:
+                self.writes += 1
+                self.messages += len(messages)
+                write_many = getattr(self._transport, 'write_many', None)
+                if write_many is not None:
+                    await write_many(messages)
+                else:
+                    for message in messages:
+                        func = self._transport.write(message)
+                        if asyncio.iscoroutine(func):
+                            await func
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+
 class Connection:
     """
     Main classd for interacting with the Gremlin Server. Encapsulates a
@@ -33,9 +126,27 @@ class Connection:
     :param int max_inflight: Maximum number of unprocessed requests at any
         one time on the connection
     :param float response_timeout: (optional) `None` by default
+    :param on_lost: Optional callback called with the connection and the
+        error when the connection fails
+    :param flow_control: Optional
+        :py:class:`FlowControl<aiogremlin.driver.resultset.FlowControl>`
+        budget for the results buffered by the connection
+    :param WriteBuffer write_buffer: Optional buffer that coalesces the
+        requests written to `transport`
+    :param concurrency_limit: Optional
+        :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        of the connection, replaces `max_inflight`
+    :param host_limit: Optional
+        :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        shared with the other connections to the host
+    :param host_stats: Optional
+        :py:class:`HostStats<aiogremlin.driver.balancer.HostStats>` of the
+        host, updated with every request
     """
     def __init__(self, url, transport, protocol, loop, username, password,
-                 max_inflight, response_timeout, message_serializer, provider):
+                 max_inflight, response_timeout, message_serializer, provider,
+                 on_lost=None, flow_control=None, write_buffer=None,
+                 concurrency_limit=None, host_limit=None, host_stats=None):
         self._url = url
         self._transport = transport
         self._protocol = protocol
@@ -44,10 +155,18 @@ class Connection:
         self._username = username
         self._password = password
         self._closed = False
+        self._error = None
+        self._rtt = None
+        self._on_lost = on_lost
+        self._flow_control = flow_control
+        self._write_buffer = write_buffer
         self._result_sets = {}
         self._receive_task = self._loop.create_task(self._receive())
-        self._semaphore = asyncio.Semaphore(value=max_inflight,
-                                            loop=self._loop)
+        if concurrency_limit is None:
+            concurrency_limit = limit.ConcurrencyLimit(loop, max_inflight)
+        self._limit = concurrency_limit
+        self._host_limit = host_limit
+        self._host_stats = host_stats
         if isinstance(message_serializer, type):
             message_serializer = message_serializer()
         self._message_serializer = message_serializer
@@ -57,13 +176,34 @@ class Connection:
     async def open(cls, url, loop, *,
                    protocol=None,
                    transport_factory=None,
+                   transport_class=AiohttpTransport,
+                   session=None,
+                   on_lost=None,
                    ssl_context=None,
                    username='',
                    password='',
                    max_inflight=64,
                    response_timeout=None,
                    message_serializer=serializer.GraphSONMessageSerializer,
-                   provider=provider.TinkerGraph):
+                   provider=provider.TinkerGraph,
+                   lazy_results=False,
+                   compression_level=0,
+                   compression_min_size=0,
+                   byte_counters=None,
+                   decode_executor=None,
+                   decode_threshold=DEFAULT_DECODE_THRESHOLD,
+                   decode_stats=None,
+                   buffer_size=None,
+                   result_buffer_size=None,
+                   buffer_timeout=None,
+                   coalesce_writes=False,
+                   coalesce_max_bytes=65536,
+                   coalesce_max_delay=0,
+                   min_inflight=None,
+                   inflight_tolerance=2.0,
+                   reserved_inflight=0,
+                   host_limit=None,
+                   host_stats=None):
         """
         **coroutine** Open a connection to the Gremlin Server.
 
@@ -72,6 +212,15 @@ class Connection:
         :param gremlin_python.driver.protocol.AbstractBaseProtocol protocol:
             Protocol implementation
         :param transport_factory: Factory function for transports
+        :param transport_class: Transport class used if no
+            `transport_factory` is passed, called with `loop` and the
+            compression and `byte_counters` keyword arguments. Default is
+            :py:class:`AiohttpTransport<aiogremlin.driver.aiohttp.transport.AiohttpTransport>`
+        :param aiohttp.ClientSession session: Optional session shared by the
+            transports of several connections. Ignored if `transport_factory`
+            is passed
+        :param on_lost: Optional callback called with the connection and the
+            error when reading from or writing to the connection fails
         :param ssl.SSLContext ssl_context:
         :param str username: Username for database auth
         :param str password: Password for database auth
@@ -81,18 +230,87 @@ class Connection:
         :param float response_timeout: (optional) `None` by default
         :param message_serializer: Message serializer implementation
         :param provider: Graph provider object implementation
+        :param bool lazy_results: Only deserialize result items when they are
+            read from the result set. Ignored if `protocol` is passed
+        :param int compression_level: zlib level used to compress requests,
+            `0` disables compression. Ignored if `transport_factory` is passed
+        :param int compression_min_size: Requests smaller than this are sent
+            uncompressed, if the transport supports it
+        :param byte_counters: Optional
+            :py:class:`ByteCounters<aiogremlin.driver.aiohttp.transport.ByteCounters>`
+            updated by the transport
+        :param concurrent.futures.Executor decode_executor: Optional executor
+            for decoding large response frames. Ignored if `protocol` is
+            passed
+        :param int decode_threshold: Minimum size of frames decoded in
+            `decode_executor`
+        :param decode_stats: Optional
+            :py:class:`DecodeStats<aiogremlin.driver.protocol.DecodeStats>`
+            updated by the protocol
+        :param int buffer_size: Bytes of unread response frames buffered by
+            all result sets before the connection stops reading, `None` for
+            no limit
+        :param int result_buffer_size: Same for any one result set
+        :param float buffer_timeout: Maximum seconds the connection stops
+            reading for, see
+            :py:class:`FlowControl<aiogremlin.driver.resultset.FlowControl>`
+        :param bool coalesce_writes: Gather the requests written in the same
+            event loop iteration into one socket write, see
+            :py:class:`WriteBuffer`
+        :param int coalesce_max_bytes: Buffered request bytes that are
+            written right away
+        :param float coalesce_max_delay: Seconds to wait for more requests
+            before writing
+        :param int min_inflight: Lowest and initial limit of unprocessed
+            requests. If set, the limit adapts to the server's latency
+            between `min_inflight` and `max_inflight`, see
+            :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        :param float inflight_tolerance: Latency increase, relative to the
+            long-term average latency, that cuts an adaptive limit
+        :param int reserved_inflight: Unprocessed requests kept for
+            requests of
+            :py:data:`PRIORITY_HIGH<aiogremlin.driver.limit.PRIORITY_HIGH>`
+        :param host_limit: Optional
+            :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+            shared by all connections to the host
+        :param host_stats: Optional
+            :py:class:`HostStats<aiogremlin.driver.balancer.HostStats>`
+            shared by all connections to the host
 
         :returns: :py:class:`Connection<aiogremlin.driver.connection.Connection>`
         """
         if not protocol:
-            protocol = GremlinServerWSProtocol(message_serializer)
+            protocol = GremlinServerWSProtocol(
+                message_serializer, lazy_results=lazy_results,
+                decode_executor=decode_executor,
+                decode_threshold=decode_threshold, decode_stats=decode_stats,
+                loop=loop)
         if not transport_factory:
-            transport_factory = lambda: AiohttpTransport(loop)
+            transport_factory = lambda: transport_class(
+                loop, compression_level=compression_level,
+                compression_min_size=compression_min_size,
+                byte_counters=byte_counters, session=session)
         transport = transport_factory()
         await transport.connect(url, ssl_context=ssl_context)
+        flow_control = None
+        if buffer_size is not None or result_buffer_size is not None:
+            flow_control = resultset.FlowControl(
+                loop, max_bytes=buffer_size,
+                max_result_bytes=result_buffer_size, timeout=buffer_timeout)
+        write_buffer = None
+        if coalesce_writes:
+            write_buffer = WriteBuffer(
+                loop, transport, max_bytes=coalesce_max_bytes,
+                max_delay=coalesce_max_delay)
+        concurrency_limit = limit.ConcurrencyLimit(
+            loop, max_inflight, min_limit=min_inflight,
+            tolerance=inflight_tolerance, reserved=reserved_inflight)
         return cls(url, transport, protocol, loop, username, password,
                    max_inflight, response_timeout, message_serializer,
-                   provider)
+                   provider, on_lost=on_lost, flow_control=flow_control,
+                   write_buffer=write_buffer,
+                   concurrency_limit=concurrency_limit, host_limit=host_limit,
+                   host_stats=host_stats)
 
     @property
     def message_serializer(self):
@@ -105,7 +323,74 @@ class Connection:
 
         :returns: `bool`
         """
-        return self._closed or self._transport.closed
+        return (self._closed or self._error is not None or
+                self._transport.closed)
+
+    @property
+    def healthy(self):
+        """
+        Read-only property. `False` once reading from or writing to the
+        connection failed.
+
+        :returns: `bool`
+        """
+        return self._error is None
+
+    @property
+    def rtt(self):
+        """
+        Read-only property. Round trip time in seconds measured by the last
+        :py:meth:`ping`, `None` before the first one.
+
+        :returns: `float`
+        """
+        return self._rtt
+
+    @property
+    def can_ping(self):
+        """
+        Read-only property. Whether the transport supports pings.
+
+        :returns: `bool`
+        """
+        return hasattr(self._transport, 'ping')
+
+    @property
+    def write_buffer(self):
+        """
+        Read-only property. `None` unless writes are coalesced.
+
+        :returns: :py:class:`WriteBuffer`
+        """
+        return self._write_buffer
+
+    @property
+    def flow_control(self):
+        """
+        Read-only property. `None` without buffer limits.
+
+        :returns: :py:class:`FlowControl<aiogremlin.driver.resultset.FlowControl>`
+        """
+        return self._flow_control
+
+    @property
+    def concurrency_limit(self):
+        """
+        Read-only property. Limit of unprocessed requests on the connection.
+
+        :returns: :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        """
+        return self._limit
+
+    @property
+    def host_limit(self):
+        """
+        Read-only property. Limit shared with the other connections to the
+        host, `None` if there is none.
+
+        :returns: :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        """
+        return self._host_limit
 
     @property
     def url(self):
@@ -116,47 +401,169 @@ class Connection:
         """
         return self._url
 
-    async def write(self, message):
+    async def write(self, message, *, priority=limit.PRIORITY_NORMAL):
         """
         Submit a script and bindings to the Gremlin Server
 
         :param `RequestMessage<gremlin_python.driver.request.RequestMessage>` message:
+        :param int priority: Requests with lower values get in-flight slots
+            first, see
+            :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
         :returns: :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`
             object
         """
-        await self._semaphore.acquire()
+        if self._error is not None:
+            raise self._error
+        await self._acquire_slot(priority)
         request_id = str(uuid.uuid4())
-        message = self._message_serializer.serialize_message(
-            request_id, message)
-        if self._transport.closed:
-            await self._transport.connect(self.url)
-        func = self._transport.write(message)
-        if asyncio.iscoroutine(func):
-            await func
-        result_set = resultset.ResultSet(request_id, self._response_timeout,
-                                   self._loop)
+        try:
+            message = self._message_serializer.serialize_message(
+                request_id, message)
+        except Exception:
+            self._release_slot()
+            raise
+        # Register the result set first, the response may arrive while the
+        # request is still being written
+        result_set = resultset.ResultSet(
+            request_id, self._response_timeout, self._loop,
+            flow_control=self._flow_control)
         self._result_sets[request_id] = result_set
-        self._loop.create_task(
-            self._terminate_response(result_set, request_id))
+        if self._host_stats is not None:
+            self._host_stats.started()
+        self._loop.create_task(self._terminate_response(
+            result_set, request_id, self._loop.time()))
+        try:
+            if self._write_buffer is not None:
+                await self._write_buffer.write(message)
+            else:
+                if self._transport.closed:
+                    await self._transport.connect(self.url)
+                func = self._transport.write(message)
+                if asyncio.iscoroutine(func):
+                    await func
+        except (exception.ConnectionLostError, asyncio.CancelledError):
+            # Buffered request dropped by `close` or a lost connection, or
+            # the writer gave up. `CancelledError` is an `Exception` before
+            # Python 3.8
+            raise
+        except Exception as e:
+            self._receive_task.cancel()
+            raise self._connection_lost(e) from e
         return result_set
 
     submit = write
 
+    async def ping(self, timeout=None):
+        """
+        **coroutine** Send a websocket ping and wait for the pong. If the
+        pong doesn't arrive within `timeout` seconds, the connection is
+        considered lost. While flow control keeps the connection from
+        reading, pongs can't arrive, so no ping is sent and a missing pong
+        is ignored.
+
+        :param float timeout: Optional timeout in seconds
+        :returns: Round trip time in seconds, `None` if the connection is
+            paused by flow control
+        """
+        if self._error is not None:
+            raise self._error
+        if self._paused():
+            return None
+        try:
+            rtt = await asyncio.wait_for(
+                self._transport.ping(), timeout, loop=self._loop)
+        except asyncio.TimeoutError:
+            if self._paused():
+                return None
+            raise self._connection_lost(asyncio.TimeoutError(
+                'No pong within {} seconds'.format(timeout)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise self._connection_lost(e) from e
+        self._rtt = rtt
+        return rtt
+
     async def close(self):
         """**coroutine** Close underlying connection and mark as closed."""
         self._receive_task.cancel()
-        await self._transport.close()
         self._closed = True
+        self._fail_result_sets(
+            exception.ConnectionLostError('Connection closed'))
+        await self._transport.close()
+
+    def _paused(self):
+        return self._flow_control is not None and self._flow_control.paused
+
+    async def _acquire_slot(self, priority):
+        await self._limit.acquire(priority)
+        if self._host_limit is not None:
+            try:
+                await self._host_limit.acquire(priority)
+            except BaseException:
+                self._limit.release()
+                raise
 
-    async def _terminate_response(self, resp, request_id):
+    def _release_slot(self, latency=None, status_code=None):
+        self._limit.release(latency, status_code)
+        if self._host_limit is not None:
+            self._host_limit.release(latency, status_code)
+
+    async def _terminate_response(self, resp, request_id, sent):
         await resp.done.wait()
         del self._result_sets[request_id]
-        self._semaphore.release()
+        latency = None
+        if self._error is None and not self._closed:
+            latency = self._loop.time() - sent
+        # Failed requests say nothing about the server's latency
+        self._release_slot(latency, resp.status_code)
+        if self._host_stats is not None:
+            if self._closed and self._error is None:
+                self._host_stats.abandoned()
+            else:
+                self._host_stats.finished(latency, resp.status_code)
 
     async def _receive(self):
-        while True:
-            data = await self._transport.read()
-            await self._protocol.data_received(data, self._result_sets)
+        try:
+            while True:
+                data = await self._transport.read()
+                await self._protocol.data_received(data, self._result_sets)
+                if self._flow_control is not None:
+                    # Stop reading while unread results are over budget
+                    await self._flow_control.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._connection_lost(e)
+
+    def _connection_lost(self, exc):
+        # Fail everything waiting on the connection right away instead of
+        # leaving it to the response timeout
+        if self._error is not None:
+            return self._error
+        logger.warning('Connection to %s lost: %r', self._url, exc)
+        error = exception.ConnectionLostError(
+            'Connection to {} lost: {}'.format(self._url, exc))
+        error.__cause__ = exc
+        self._error = error
+        self._fail_result_sets(error)
+        self._loop.create_task(self._close_transport())
+        if self._on_lost is not None:
+            self._on_lost(self, error)
+        return error
+
+    async def _close_transport(self):
+        try:
+            await self._transport.close()
+        except Exception:
+            logger.debug('Error closing transport of lost connection',
+                         exc_info=True)
+
+    def _fail_result_sets(self, error):
+        if self._write_buffer is not None:
+            self._write_buffer.fail(error)
+        for result_set in list(self._result_sets.values()):
+            result_set.fail(error)
 
     async def __aenter__(self):
         return self
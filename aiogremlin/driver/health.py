@@ -0,0 +1,151 @@
+"""Health of hosts and circuit breaking."""
+import collections
+
+
+CLOSED = 'closed'
+"""State of a healthy host, which gets requests"""
+
+OPEN = 'open'
+"""State of a failing host, which gets no requests until a probe succeeds"""
+
+HALF_OPEN = 'half_open'
+"""State of a failing host while it is probed"""
+
+FAILURE_STATUS_CODES = frozenset([429])
+"""Default status codes of responses that count as failures of the host:
+overload. Server errors and server side timeouts are usually caused by the
+request, not the host"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one host. The circuit opens after
+    `failure_threshold` consecutive failed requests, or when at least
+    `failure_rate` of the last `failure_window` requests failed. Requests
+    fail if they get no response, e.g. because their connection was lost
+    or could not be opened, or a response with one of the
+    `failure_status_codes`.
+
+    While the circuit is open the host gets no requests. Its
+    :py:class:`GremlinServer<aiogremlin.driver.server.GremlinServer>` probes
+    it instead, the circuit is half open while a probe is in flight and
+    closes again when one succeeds.
+
+    :param asyncio.BaseEventLoop loop:
+    :param int failure_threshold: Consecutive failures that open the
+        circuit, `None` to ignore them
+    :param float failure_rate: Share of failed requests that opens the
+        circuit, `None` to ignore it
+    :param int failure_window: Number of recent requests `failure_rate`
+        applies to
+    :param failure_status_codes: Status codes of responses that count as
+        failures. Default is :py:data:`FAILURE_STATUS_CODES`
+    :param on_open: Optional callback called with the breaker when the
+        circuit opens
+    """
+
+    def __init__(self, loop, *, failure_threshold=5, failure_rate=0.5,
+                 failure_window=20,
+                 failure_status_codes=FAILURE_STATUS_CODES, on_open=None):
+        self._loop = loop
+        self._failure_threshold = failure_threshold
+        self._failure_status_codes = frozenset(failure_status_codes or ())
+        self._failure_rate = failure_rate
+        self._outcomes = collections.deque(maxlen=failure_window)
+        self._failures = 0
+        self._consecutive = 0
+        self._on_open = on_open
+        self._state = CLOSED
+        self._changed = loop.time()
+        self.opened = 0
+
+    def __repr__(self):
+        return 'CircuitBreaker(state={!r}, failures={}/{})'.format(
+            self._state, self._failures, len(self._outcomes))
+
+    @property
+    def state(self):
+        """
+        Read-only property. :py:data:`CLOSED`, :py:data:`OPEN` or
+        :py:data:`HALF_OPEN`.
+
+        :returns: `str`
+        """
+        return self._state
+
+    @property
+    def available(self):
+        """
+        Read-only property. Whether the host should get requests.
+
+        :returns: `bool`
+        """
+        return self._state == CLOSED
+
+    @property
+    def failure_status_codes(self):
+        """
+        Read-only property. Status codes of responses that count as
+        failures.
+
+        :returns: `frozenset`
+        """
+        return self._failure_status_codes
+
+    @property
+    def changed(self):
+        """
+        Read-only property. Event loop time of the last state change.
+
+        :returns: `float`
+        """
+        return self._changed
+
+    def record(self, success):
+        """
+        Count the outcome of a request. Only requests sent while the
+        circuit is closed count.
+
+        :param bool success: Whether the host answered the request
+        """
+        if self._state != CLOSED:
+            return
+        outcomes = self._outcomes
+        if len(outcomes) == outcomes.maxlen and not outcomes[0]:
+            self._failures -= 1
+        outcomes.append(success)
+        if success:
+            self._consecutive = 0
+            return
+        self._failures += 1
+        self._consecutive += 1
+        threshold = self._failure_threshold
+        rate = self._failure_rate
+        if ((threshold is not None and self._consecutive >= threshold) or
+                (rate is not None and len(outcomes) == outcomes.maxlen and
+                 self._failures >= rate * len(outcomes))):
+            self.open()
+
+    def open(self):
+        """Open the circuit, e.g. after a failed probe"""
+        previous = self._state
+        self._set_state(OPEN)
+        if previous == CLOSED:
+            self.opened += 1
+            if self._on_open is not None:
+                self._on_open(self)
+
+    def half_open(self):
+        """Mark the circuit as being probed"""
+        self._set_state(HALF_OPEN)
+
+    def close(self):
+        """Close the circuit, the host gets requests again"""
+        self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self._changed = self._loop.time()
+        self._outcomes.clear()
+        self._failures = self._consecutive = 0
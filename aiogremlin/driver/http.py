@@ -0,0 +1,196 @@
+"""Stateless script requests over the Gremlin Server HTTP endpoint."""
+import asyncio
+import logging
+import uuid
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import aiohttp
+
+from aiogremlin import exception
+from aiogremlin.driver import resultset
+from aiogremlin.driver.protocol import Message
+
+
+logger = logging.getLogger(__name__)
+
+
+def http_url(url):
+    """
+    HTTP url of the host serving the websocket endpoint `url`. Gremlin
+    Server answers both on the same port when configured with the
+    `WsAndHttpChannelizer`.
+
+    :param str url: websocket url, e.g. `ws://localhost:8182/gremlin`
+    :returns: `str`
+    """
+    scheme, sep, rest = url.partition('://')
+    scheme = {'ws': 'http', 'wss': 'https'}.get(scheme, scheme)
+    return scheme + sep + rest
+
+
+class HTTPConnection:
+    """
+    Submits scripts as HTTP/1.1 POST requests. Requests go through an
+    :py:class:`aiohttp.ClientSession`, whose connector keeps connections
+    alive and reuses them for later requests. Responses are decoded by the
+    same protocol and serializer as websocket responses and returned as a
+    :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`.
+
+    The HTTP endpoint evaluates scripts without a session, so only `eval`
+    requests can be submitted.
+
+    :param str url: url of the Gremlin Server HTTP endpoint
+    :param asyncio.BaseEventLoop loop:
+    :param aiohttp.ClientSession session: Session used for the requests,
+        its connector provides the SSL context. It is not closed with the
+        connection
+    :param protocol: Protocol used to decode responses, e.g.
+        :py:class:`GremlinServerWSProtocol<aiogremlin.driver.protocol.GremlinServerWSProtocol>`
+    :param message_serializer: Message serializer, whose `version` is
+        sent as the accepted mime type
+    :param str username: Username for database auth
+    :param str password: Password for database auth
+    :param float response_timeout: (optional) `None` by default
+    :param host_stats: Optional
+        :py:class:`HostStats<aiogremlin.driver.balancer.HostStats>` of the
+        host, updated with every request
+    """
+
+    def __init__(self, url, loop, session, protocol, message_serializer, *,
+                 username='', password='', response_timeout=None,
+                 host_stats=None):
+        self._url = url
+        self._loop = loop
+        self._session = session
+        self._protocol = protocol
+        self._response_timeout = response_timeout
+        self._host_stats = host_stats
+        self._headers = {'Content-Type': 'application/json'}
+        if isinstance(message_serializer, type):
+            message_serializer = message_serializer()
+        version = getattr(message_serializer, 'version', None)
+        if version:
+            if isinstance(version, bytes):
+                version = version.decode('utf-8')
+            self._headers['Accept'] = version
+        if username:
+            self._auth = aiohttp.BasicAuth(username, password)
+        else:
+            self._auth = None
+        self._requests = {}
+        self._closed = False
+
+    @property
+    def url(self):
+        """Read-only property"""
+        return self._url
+
+    @property
+    def closed(self):
+        """Read-only property"""
+        return self._closed
+
+    async def write(self, message, *, priority=None):
+        """
+        **coroutine** Submit a script request.
+
+        :param gremlin_python.driver.request.RequestMessage message: `eval`
+            request, the script may be a
+            :py:class:`PreparedScript<aiogremlin.driver.script.PreparedScript>`
+        :param int priority: Ignored, the number of HTTP requests is only
+            limited by the session's connector
+        :returns: :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`
+        """
+        if self._closed:
+            raise exception.ConnectionLostError('Connection closed')
+        processor, op, args = message
+        if op != 'eval':
+            raise exception.ClientError(
+                'Only scripts can be submitted over HTTP, not {!r} '
+                'requests'.format(op))
+        gremlin = args['gremlin']
+        body = {'gremlin': getattr(gremlin, 'script', gremlin),
+                'language': args.get('language', 'gremlin-groovy')}
+        if args.get('bindings'):
+            body['bindings'] = args['bindings']
+        if args.get('aliases'):
+            body['aliases'] = args['aliases']
+        try:
+            data = json.dumps(body)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise exception.SerializationError(
+                'Could not encode HTTP request: {}'.format(e))
+        request_id = str(uuid.uuid4())
+        result_set = resultset.ResultSet(
+            request_id, self._response_timeout, self._loop)
+        task = self._loop.create_task(self._request(data, result_set))
+        self._requests[task] = result_set
+        task.add_done_callback(self._requests.pop)
+        return result_set
+
+    submit = write
+
+    async def _request(self, data, result_set):
+        stats = self._host_stats
+        if stats is not None:
+            stats.started()
+        start = self._loop.time()
+        latency = None
+        cancelled = False
+        try:
+            async with self._session.post(
+                    self._url, data=data, headers=self._headers,
+                    auth=self._auth) as resp:
+                body = await resp.read()
+                status = resp.status
+            latency = self._loop.time() - start
+            if status != 200:
+                result_set.status_code = status
+                result_set.queue_result(Message(
+                    status, [], _error_message(body, resp.reason)))
+                result_set.queue_result(None)
+                return
+            await self._protocol.response_received(body, result_set)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except (aiohttp.ClientError, OSError) as e:
+            logger.warning('HTTP request to %s failed: %r', self._url, e)
+            result_set.fail(exception.ConnectionLostError(
+                'HTTP request failed: {!r}'.format(e)))
+        except Exception as e:
+            result_set.fail(e)
+        finally:
+            if stats is not None:
+                if cancelled:
+                    stats.abandoned()
+                else:
+                    stats.finished(latency, result_set.status_code)
+
+    async def release_task(self, resp):
+        """Nothing to release, HTTP connections go back to the session"""
+
+    def release(self):
+        pass
+
+    async def close(self):
+        """**coroutine** Cancel pending requests, failing their results"""
+        self._closed = True
+        tasks = list(self._requests.items())
+        for task, result_set in tasks:
+            task.cancel()
+            result_set.fail(exception.ConnectionLostError('Connection closed'))
+        if tasks:
+            await asyncio.wait([task for task, _ in tasks], loop=self._loop)
+
+
+def _error_message(body, default):
+    # Gremlin Server reports errors as JSON with a `message` field
+    try:
+        return json.loads(body.decode('utf-8'))['message']
+    except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+        return body.decode('utf-8', 'replace') or default
@@ -0,0 +1,240 @@
+"""Limits on the number of requests in flight."""
+import asyncio
+import heapq
+import itertools
+
+
+PRIORITY_HIGH = 0
+"""Priority of interactive requests, which may use reserved capacity"""
+
+PRIORITY_NORMAL = 1
+"""Default priority"""
+
+PRIORITY_LOW = 2
+"""Priority of batch requests"""
+
+
+OVERLOAD_STATUS_CODES = frozenset([429, 598])
+"""Status codes of responses rejected by an overloaded server or timed out
+on the server, both cut adaptive limits"""
+
+
+class ConcurrencyLimit:
+    """
+    Semaphore whose limit can adapt to the latency of the server. Each
+    request acquires a slot before it is sent and releases it with its
+    latency and status code once its response is complete.
+
+    With a `min_limit` below `max_limit` the limit starts at `min_limit`
+    and adapts by additive increase and multiplicative decrease: it grows
+    by one for each limit's worth of requests that complete while all slots
+    are in use and latency stays flat. It is multiplied by `backoff` when
+    the recent latency rises above `tolerance` times the long-term average
+    latency, or when the server reports overload or a timeout (see
+    :py:data:`OVERLOAD_STATUS_CODES`). Only requests sent after the last
+    cut can cut it again, so one burst of slow responses cuts it once.
+
+    Waiting requests get slots in order of priority, lower values first,
+    and in order of arrival within a priority. `reserved` slots are only
+    used by requests of :py:data:`PRIORITY_HIGH` or lower, other requests
+    get at least one slot.
+
+    :param asyncio.BaseEventLoop loop:
+    :param int max_limit: Highest limit, the fixed limit if `min_limit` is
+        `None`
+    :param int min_limit: Lowest and initial limit of an adaptive limit
+    :param float tolerance: Latency increase, relative to the long-term
+        average latency, that cuts the limit
+    :param float backoff: Factor the limit is multiplied by when it is cut
+    :param float smoothing: Weight of the latest latency in the recent
+        latency
+    :param float baseline_smoothing: Weight of the latest latency in the
+        long-term average latency
+    :param int reserved: Slots kept for high priority requests
+    """
+
+    def __init__(self, loop, max_limit, *, min_limit=None, tolerance=2.0,
+                 backoff=0.5, smoothing=0.2, baseline_smoothing=0.01,
+                 reserved=0):
+        if min_limit is None:
+            min_limit = max_limit
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(
+                'Limits must satisfy 1 <= min_limit <= max_limit, got {} '
+                'and {}'.format(min_limit, max_limit))
+        self._loop = loop
+        self._max_limit = max_limit
+        self._min_limit = min_limit
+        self._limit = float(min_limit)
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._smoothing = smoothing
+        self._baseline_smoothing = baseline_smoothing
+        self._reserved = reserved
+        self._inflight = 0
+        # (priority, seq, future) of the waiting requests
+        self._waiters = []
+        self._seq = itertools.count()
+        self._latency = None
+        self._baseline = None
+        self._decreased_at = None
+        self.increases = 0
+        self.decreases = 0
+
+    def __repr__(self):
+        return ('ConcurrencyLimit(limit={}, inflight={}, latency={}, '
+                'baseline={})'.format(
+                    self.limit, self._inflight,
+                    _format_seconds(self._latency),
+                    _format_seconds(self._baseline)))
+
+    @property
+    def adaptive(self):
+        """
+        Read-only property. Whether the limit adapts to latency.
+
+        :returns: `bool`
+        """
+        return self._min_limit < self._max_limit
+
+    @property
+    def limit(self):
+        """
+        Read-only property. Current number of slots.
+
+        :returns: `int`
+        """
+        return int(self._limit)
+
+    @property
+    def inflight(self):
+        """
+        Read-only property. Number of slots in use.
+
+        :returns: `int`
+        """
+        return self._inflight
+
+    @property
+    def waiting(self):
+        """
+        Read-only property. Number of requests waiting for a slot.
+
+        :returns: `int`
+        """
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    @property
+    def reserved(self):
+        """
+        Read-only property. Slots kept for high priority requests.
+
+        :returns: `int`
+        """
+        return self._reserved
+
+    @property
+    def latency(self):
+        """
+        Read-only property. Recent latency in seconds, smoothed, `None`
+        before the first response.
+
+        :returns: `float`
+        """
+        return self._latency
+
+    @property
+    def baseline(self):
+        """
+        Read-only property. Long-term average latency in seconds, `None`
+        before the first response.
+
+        :returns: `float`
+        """
+        return self._baseline
+
+    async def acquire(self, priority=PRIORITY_NORMAL):
+        """
+        **coroutine** Wait for a free slot.
+
+        :param int priority: Requests with lower values get slots first
+        """
+        self._drop_cancelled()
+        if (self._inflight < self._slots(priority) and
+                (not self._waiters or self._waiters[0][0] > priority)):
+            self._inflight += 1
+            return
+        waiter = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Woken up and cancelled at the same time
+                self._inflight -= 1
+                self._wake()
+            raise
+
+    def release(self, latency=None, status_code=None):
+        """
+        Free a slot.
+
+        :param float latency: Seconds from sending the request until its
+            response was complete. `None` for requests that did not get a
+            response, which leave the limit as it is
+        :param int status_code: Status code of the response
+        """
+        saturated = self._inflight >= self.limit
+        self._inflight -= 1
+        if latency is not None and self.adaptive:
+            self._adapt(latency, status_code, saturated)
+        self._wake()
+
+    def _adapt(self, latency, status_code, saturated):
+        if self._latency is None:
+            self._latency = self._baseline = latency
+        else:
+            # Both averages absorb jitter, the baseline also follows a
+            # workload that became slower for good
+            self._latency += (latency - self._latency) * self._smoothing
+            self._baseline += (
+                latency - self._baseline) * self._baseline_smoothing
+        now = self._loop.time()
+        if (status_code in OVERLOAD_STATUS_CODES or
+                self._latency > self._tolerance * self._baseline):
+            sent = now - latency
+            if self._decreased_at is None or sent >= self._decreased_at:
+                self._decreased_at = now
+                self._limit = max(
+                    self._limit * self._backoff, self._min_limit)
+                self.decreases += 1
+        elif saturated and self._limit < self._max_limit:
+            previous = self.limit
+            self._limit = min(self._limit + 1 / self._limit, self._max_limit)
+            if self.limit > previous:
+                self.increases += 1
+
+    def _slots(self, priority):
+        if priority <= PRIORITY_HIGH or not self._reserved:
+            return self.limit
+        return max(self.limit - self._reserved, 1)
+
+    def _drop_cancelled(self):
+        waiters = self._waiters
+        while waiters and waiters[0][2].done():
+            heapq.heappop(waiters)
+
+    def _wake(self):
+        # Strict priority: a waiter held back by the reservation holds back
+        # the less urgent ones too
+        waiters = self._waiters
+        self._drop_cancelled()
+        while waiters and self._inflight < self._slots(waiters[0][0]):
+            _, _, waiter = heapq.heappop(waiters)
+            self._inflight += 1
+            waiter.set_result(None)
+            self._drop_cancelled()
+
+
+def _format_seconds(seconds):
+    return 'None' if seconds is None else '{:.6f}'.format(seconds)
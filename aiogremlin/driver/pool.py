@@ -1,9 +1,23 @@
 import asyncio
 import collections
+import heapq
+import itertools
+import logging
 
 import aiohttp
 
-from aiogremlin.driver import connection
+from aiogremlin import exception
+from aiogremlin.driver import connection, limit
+from aiogremlin.driver.aiohttp.transport import (
+    AiohttpTransport, ByteCounters)
+from aiogremlin.driver.protocol import DEFAULT_DECODE_THRESHOLD, DecodeStats
+
+
+logger = logging.getLogger(__name__)
+
+
+RTT_SAMPLES = 64
+"""Number of recent round trip times kept by each pool"""
 
 
 class PooledConnection:
@@ -18,6 +32,7 @@ class PooledConnection:
         self._conn = conn
         self._pool = pool
         self._times_acquired = 0
+        self.last_used = pool._loop.time()
 
     @property
     def times_acquired(self):
@@ -36,7 +51,7 @@ class PooledConnection:
         """Decrement times acquired attribute by 1"""
         self._times_acquired -= 1
 
-    async def write(self, message):
+    async def write(self, message, *, priority=limit.PRIORITY_NORMAL):
         """
         **coroutine** Submit a script and bindings to the Gremlin Server
 
@@ -44,13 +59,25 @@ class PooledConnection:
         :param str op: Gremlin Server op argument
         :param args: Keyword arguments for Gremlin Server. Depend on processor
             and op.
+        :param int priority: Requests with lower values get in-flight slots
+            first
 
         :returns: :py:class:`aiohttp.ClientResponse` object
         """
-        return await self._conn.write(message)
+        return await self._conn.write(message, priority=priority)
 
     submit = write
 
+    async def ping(self, timeout=None):
+        """
+        **coroutine** Ping the underlying connection
+
+        :param float timeout: Optional timeout in seconds
+        :returns: Round trip time in seconds, `None` if the connection is
+            paused by flow control
+        """
+        return await self._conn.ping(timeout)
+
     async def release_task(self, resp):
         await resp.done.wait()
         self.release()
@@ -73,6 +100,33 @@ class PooledConnection:
         """
         return self._conn.closed
 
+    @property
+    def healthy(self):
+        """
+        Readonly property.
+
+        :returns: bool
+        """
+        return self._conn.healthy
+
+    @property
+    def rtt(self):
+        """
+        Readonly property.
+
+        :returns: float
+        """
+        return self._conn.rtt
+
+    @property
+    def concurrency_limit(self):
+        """
+        Readonly property.
+
+        :returns: :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        """
+        return self._conn.concurrency_limit
+
 
 class ConnectionPool:
     """
@@ -90,11 +144,73 @@ class ConnectionPool:
         shared by multiple coroutines (clients)
     :param int max_inflight: Maximum number of unprocessed requests at any
         one time on the connection
+    :param bool lazy_results: Only deserialize result items when they are
+        read from the result set
+    :param int compression_level: zlib level used to compress requests, `0`
+        disables compression
+    :param int compression_min_size: Minimum size of compressed requests,
+        if the transport supports it
+    :param concurrent.futures.Executor decode_executor: Optional executor
+        for decoding large response frames
+    :param int decode_threshold: Minimum size of frames decoded in
+        `decode_executor`
+    :param transport_class: Websocket transport implementation
+    :param aiohttp.ClientSession session: Optional session shared by the
+        transports of all connections
+    :param float reconnect_delay: Seconds to wait before retrying a failed
+        reconnect, doubled after every failure
+    :param float reconnect_max_delay: Maximum delay between reconnects
+    :param float heartbeat_interval: Seconds between pings of all
+        connections, `None` disables pings
+    :param float heartbeat_timeout: Connections that don't answer a ping
+        within this many seconds are considered lost
+    :param float idle_timeout: Connections above `min_conns` that were not
+        used for this many seconds are closed, `None` keeps them open
+    :param int buffer_size: Bytes of unread results buffered per
+        connection before it stops reading, `None` for no limit
+    :param int result_buffer_size: Bytes of unread results buffered per
+        result set before its connection stops reading
+    :param float buffer_timeout: Maximum seconds a connection stops reading
+        for, then the result sets over budget are discarded
+    :param bool coalesce_writes: Gather the requests written to a
+        connection in the same event loop iteration into one socket write
+    :param int coalesce_max_bytes: Buffered request bytes that are written
+        right away
+    :param float coalesce_max_delay: Seconds to wait for more requests
+        before writing
+    :param float connect_timeout: Seconds to wait for a new connection,
+        `None` waits forever
+    :param int max_handshakes: Maximum number of connections opened at the
+        same time by :py:meth:`acquire`
+    :param int min_inflight: Lowest and initial limit of unprocessed
+        requests per connection and for the host. If set, the limits adapt
+        to the server's latency, up to `max_inflight` per connection and
+        `max_inflight` times `max_conns` for the host
+    :param float inflight_tolerance: Latency increase, relative to the
+        long-term average latency, that cuts adaptive limits
+    :param int reserved_inflight: Unprocessed requests per connection and
+        for the host, and acquisitions of each connection, kept for requests
+        of :py:data:`PRIORITY_HIGH<aiogremlin.driver.limit.PRIORITY_HIGH>`
+    :param host_stats: Optional
+        :py:class:`HostStats<aiogremlin.driver.balancer.HostStats>` updated
+        by all connections
     """
 
     def __init__(self, url, loop, ssl_context, username, password, max_conns,
                  min_conns, max_times_acquired, max_inflight, response_timeout,
-                 message_serializer, provider):
+                 message_serializer, provider, *, lazy_results=False,
+                 compression_level=0, compression_min_size=0,
+                 decode_executor=None,
+                 decode_threshold=DEFAULT_DECODE_THRESHOLD,
+                 transport_class=AiohttpTransport, session=None,
+                 reconnect_delay=0.1, reconnect_max_delay=30,
+                 heartbeat_interval=None, heartbeat_timeout=None,
+                 idle_timeout=None, buffer_size=None, result_buffer_size=None,
+                 buffer_timeout=None, coalesce_writes=False,
+                 coalesce_max_bytes=65536, coalesce_max_delay=0,
+                 connect_timeout=None, max_handshakes=2, min_inflight=None,
+                 inflight_tolerance=2.0, reserved_inflight=0,
+                 host_stats=None):
         self._url = url
         self._loop = loop
         self._ssl_context = ssl_context
@@ -110,6 +226,110 @@ class ConnectionPool:
         self._available = collections.deque()
         self._acquired = collections.deque()
         self._provider = provider
+        self._lazy_results = lazy_results
+        self._compression_level = compression_level
+        self._compression_min_size = compression_min_size
+        self._byte_counters = ByteCounters()
+        self._decode_executor = decode_executor
+        self._decode_threshold = decode_threshold
+        self._decode_stats = DecodeStats()
+        self._transport_class = transport_class
+        self._session = session
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._reconnect_task = None
+        self._heartbeat_interval = heartbeat_interval
+        self._heartbeat_timeout = heartbeat_timeout
+        self._idle_timeout = idle_timeout
+        self._buffer_size = buffer_size
+        self._result_buffer_size = result_buffer_size
+        self._buffer_timeout = buffer_timeout
+        self._coalesce_writes = coalesce_writes
+        self._coalesce_max_bytes = coalesce_max_bytes
+        self._coalesce_max_delay = coalesce_max_delay
+        self._connect_timeout = connect_timeout
+        self._max_handshakes = max_handshakes
+        self._min_inflight = min_inflight
+        self._inflight_tolerance = inflight_tolerance
+        self._reserved_inflight = reserved_inflight
+        self._host_stats = host_stats
+        self._host_limit = None
+        if min_inflight is not None:
+            self._host_limit = limit.ConcurrencyLimit(
+                loop, max_inflight * max_conns, min_limit=min_inflight,
+                tolerance=inflight_tolerance, reserved=reserved_inflight)
+        # Number of waiting acquirers by priority
+        self._waiting = collections.Counter()
+        self._deferred = False
+        self._opening = 0
+        self._growing = set()
+        # Acquired connections keyed by times acquired, see `_share`
+        self._load = []
+        self._load_seq = itertools.count()
+        self._maintenance_task = None
+        self._rtt_samples = collections.deque(maxlen=RTT_SAMPLES)
+        self._closed = False
+
+    @property
+    def byte_counters(self):
+        """
+        Read-only property. Bytes sent and received by all connections of
+        the pool.
+
+        :returns: :py:class:`ByteCounters<aiogremlin.driver.aiohttp.transport.ByteCounters>`
+        """
+        return self._byte_counters
+
+    @property
+    def decode_stats(self):
+        """
+        Read-only property. Frames decoded by all connections of the pool,
+        inline and in the decode executor.
+
+        :returns: :py:class:`DecodeStats<aiogremlin.driver.protocol.DecodeStats>`
+        """
+        return self._decode_stats
+
+    @property
+    def rtt_samples(self):
+        """
+        Read-only property. Round trip times in seconds of the most recent
+        heartbeat pings, oldest first.
+
+        :returns: :py:class:`collections.deque`
+        """
+        return self._rtt_samples
+
+    @property
+    def concurrency_limit(self):
+        """
+        Read-only property. Adaptive limit of unprocessed requests to the
+        host, `None` unless `min_inflight` is set.
+
+        :returns: :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        """
+        return self._host_limit
+
+    @property
+    def num_acquired(self):
+        """
+        Read-only property. Number of connections acquired and not
+        released yet.
+
+        :returns: `int`
+        """
+        return len(self._acquired)
+
+    @property
+    def connection_limits(self):
+        """
+        Read-only property. Limits of unprocessed requests of the open
+        connections.
+
+        :returns: `list` of :py:class:`ConcurrencyLimit<aiogremlin.driver.limit.ConcurrencyLimit>`
+        """
+        return [conn.concurrency_limit for conn in itertools.chain(
+            self._available, self._acquired) if not conn.closed]
 
     @property
     def url(self):
@@ -121,15 +341,29 @@ class ConnectionPool:
         return self._url
 
     async def init_pool(self):
-        """**coroutine** Open minumum number of connections to host"""
-        for i in range(self._min_conns):
-            conn = await self._get_connection(self._username,
-                                              self._password,
-                                              self._max_inflight,
-                                              self._response_timeout,
-                                              self._message_serializer,
-                                              self._provider)
-            self._available.append(conn)
+        """
+        **coroutine** Open minumum number of connections to host, all at
+        once. If any of them fails, the others are closed again.
+        """
+        results = await asyncio.gather(
+            *[self._get_connection(self._username, self._password,
+                                   self._max_inflight,
+                                   self._response_timeout,
+                                   self._message_serializer, self._provider)
+              for i in range(self._min_conns)],
+            loop=self._loop, return_exceptions=True)
+        conns = [conn for conn in results
+                 if not isinstance(conn, BaseException)]
+        if len(conns) < len(results):
+            await asyncio.gather(*[conn.close() for conn in conns],
+                                 loop=self._loop)
+            raise next(error for error in results
+                       if isinstance(error, BaseException))
+        self._available.extend(conns)
+        interval = self._heartbeat_interval or self._idle_timeout
+        if interval and self._maintenance_task is None:
+            self._maintenance_task = self._loop.create_task(
+                self._maintain(interval))
 
     def release(self, conn):
         """
@@ -138,50 +372,158 @@ class ConnectionPool:
         :param PooledConnection conn:
         """
         if conn.closed:
-            self._acquired.remove(conn)
+            if conn in self._acquired:
+                self._acquired.remove(conn)
         else:
             conn.decrement_acquired()
+            conn.last_used = self._loop.time()
             if not conn.times_acquired:
                 self._acquired.remove(conn)
                 self._available.append(conn)
+            else:
+                self._update_load(conn)
         self._loop.create_task(self._notify())
 
     async def _notify(self):
         async with self._condition:
-            self._condition.notify()
+            if len(self._waiting) > 1:
+                # The first waiter may have to let a more urgent one go first
+                self._condition.notify_all()
+            else:
+                self._condition.notify()
+
+    async def acquire(self, priority=limit.PRIORITY_NORMAL):
+        """
+        **coroutine** Acquire a new connection from the pool. New connections
+        are opened in the background, at most `max_handshakes` at a time.
+        Meanwhile the lock is free for acquirers that can share an open
+        connection, and waiters get whichever connection is released or
+        comes online first.
+
+        Acquirers wait while a more urgent one, with a lower `priority`, is
+        waiting. Connections are shared `max_times_acquired` times with
+        requests of
+        :py:data:`PRIORITY_HIGH<aiogremlin.driver.limit.PRIORITY_HIGH>`,
+        `reserved_inflight` times less with other requests.
 
-    async def acquire(self):
-        """**coroutine** Acquire a new connection from the pool."""
+        :param int priority: Acquirers with lower values go first
+        """
+        growing = None
         async with self._condition:
             while True:
-                while self._available:
+                behind = any(waiting < priority for waiting in self._waiting)
+                while self._available and not behind:
                     conn = self._available.popleft()
                     if not conn.closed:
-                        conn.increment_acquired()
-                        self._acquired.append(conn)
-                        return conn
-                if len(self._acquired) < self._max_conns:
-                    conn = await self._get_connection(self._username, self._password,
-                                                      self._max_inflight,
-                                                      self._response_timeout,
-                                                      self._message_serializer,
-                                                      self._provider)
-                    conn.increment_acquired()
-                    self._acquired.append(conn)
-                    return conn
-                else:
-                    for x in range(len(self._acquired)):
-                        conn = self._acquired.popleft()
-                        if conn.times_acquired < self._max_times_acquired:
-                            conn.increment_acquired()
-                            self._acquired.append(conn)
-                            return conn
                         self._acquired.append(conn)
-                    else:
-                        await self._condition.wait()
+                        return self._hand_out(conn)
+                if growing is not None and growing.done():
+                    error = growing.result()
+                    if error is not None:
+                        raise error
+                    # Another waiter took the new connection
+                    growing = None
+                if growing is None and self._can_grow():
+                    self._opening += 1
+                    growing = self._loop.create_task(self._grow())
+                    self._growing.add(growing)
+                    growing.add_done_callback(self._growing.discard)
+                if growing is None and not behind:
+                    conn = self._share(priority)
+                    if conn is not None:
+                        return self._hand_out(conn)
+                if behind:
+                    self._deferred = True
+                self._waiting[priority] += 1
+                try:
+                    await self._condition.wait()
+                except asyncio.CancelledError:
+                    if self._deferred:
+                        self._deferred = False
+                        self._condition.notify_all()
+                    raise
+                finally:
+                    self._waiting[priority] -= 1
+                    if not self._waiting[priority]:
+                        del self._waiting[priority]
+
+    def _hand_out(self, conn):
+        conn.increment_acquired()
+        self._update_load(conn)
+        if self._deferred and self._waiting:
+            # Acquirers that let this one go first may be able to go on
+            self._deferred = False
+            self._condition.notify_all()
+        return conn
+
+    def _share(self, priority):
+        # The acquired connection with the fewest outstanding acquisitions,
+        # if it can take one more. Entries are added whenever a count
+        # changes, outdated ones are dropped when they reach the top
+        max_times_acquired = self._max_times_acquired
+        if priority > limit.PRIORITY_HIGH and self._reserved_inflight:
+            max_times_acquired = max(
+                max_times_acquired - self._reserved_inflight, 1)
+        load = self._load
+        while load:
+            times_acquired, _, conn = load[0]
+            if conn.closed or conn.times_acquired != times_acquired:
+                heapq.heappop(load)
+                continue
+            if times_acquired < max_times_acquired:
+                return conn
+            return None
+        return None
+
+    def _update_load(self, conn):
+        load = self._load
+        heapq.heappush(
+            load, (conn.times_acquired, next(self._load_seq), conn))
+        if len(load) > 4 * len(self._acquired) + 16:
+            # Drop outdated entries
+            self._load = [
+                (times_acquired, seq, conn)
+                for times_acquired, seq, conn in load
+                if not conn.closed and conn.times_acquired == times_acquired]
+            heapq.heapify(self._load)
+
+    def _can_grow(self):
+        num_conns = len(self._acquired) + len(self._available) + self._opening
+        return (num_conns < self._max_conns and
+                self._opening < self._max_handshakes)
+
+    async def _grow(self):
+        # Returns the error instead of raising it, the acquirer that started
+        # the growth may have given up waiting
+        try:
+            conn = await self._get_connection(
+                self._username, self._password, self._max_inflight,
+                self._response_timeout, self._message_serializer,
+                self._provider)
+        except Exception as e:
+            logger.debug('Connecting to %s failed: %r', self._url, e)
+            async with self._condition:
+                self._opening -= 1
+                self._condition.notify_all()
+            return e
+        async with self._condition:
+            self._opening -= 1
+            if self._closed:
+                await conn.close()
+            else:
+                self._available.append(conn)
+            # Waiters held back by `max_handshakes` may grow the pool now
+            self._condition.notify_all()
 
     async def close(self):
         """**coroutine** Close connection pool."""
+        self._closed = True
+        for task in itertools.chain(
+                (self._reconnect_task, self._maintenance_task),
+                self._growing):
+            if task is not None:
+                task.cancel()
+        self._reconnect_task = self._maintenance_task = None
         waiters = []
         while self._available:
             conn = self._available.popleft()
@@ -193,10 +535,107 @@ class ConnectionPool:
 
     async def _get_connection(self, username, password, max_inflight,
                               response_timeout, message_serializer, provider):
-        conn = await connection.Connection.open(
+        opening = connection.Connection.open(
             self._url, self._loop, ssl_context=self._ssl_context,
             username=username, password=password,
-            response_timeout=response_timeout,
-            message_serializer=message_serializer, provider=provider)
+            max_inflight=max_inflight, response_timeout=response_timeout,
+            message_serializer=message_serializer, provider=provider,
+            lazy_results=self._lazy_results,
+            compression_level=self._compression_level,
+            compression_min_size=self._compression_min_size,
+            byte_counters=self._byte_counters,
+            decode_executor=self._decode_executor,
+            decode_threshold=self._decode_threshold,
+            decode_stats=self._decode_stats,
+            transport_class=self._transport_class,
+            session=self._session, on_lost=self._connection_lost,
+            buffer_size=self._buffer_size,
+            result_buffer_size=self._result_buffer_size,
+            buffer_timeout=self._buffer_timeout,
+            coalesce_writes=self._coalesce_writes,
+            coalesce_max_bytes=self._coalesce_max_bytes,
+            coalesce_max_delay=self._coalesce_max_delay,
+            min_inflight=self._min_inflight,
+            inflight_tolerance=self._inflight_tolerance,
+            reserved_inflight=self._reserved_inflight,
+            host_limit=self._host_limit, host_stats=self._host_stats)
+        try:
+            conn = await asyncio.wait_for(
+                opening, self._connect_timeout, loop=self._loop)
+        except asyncio.TimeoutError:
+            raise exception.ConnectTimeoutError(
+                'Connecting to {} timed out after {} seconds'.format(
+                    self._url, self._connect_timeout))
         conn = PooledConnection(conn, self)
         return conn
+
+    def _connection_lost(self, conn, error):
+        # Lost connections are dropped from the pool as soon as they are
+        # released, replacements are opened in the background
+        for pooled in self._available:
+            if pooled._conn is conn:
+                self._available.remove(pooled)
+                break
+        if self._reconnect_task is None and not self._closed:
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = self._reconnect_delay
+        try:
+            while self._num_open() < max(self._min_conns, 1):
+                try:
+                    conn = await self._get_connection(
+                        self._username, self._password, self._max_inflight,
+                        self._response_timeout, self._message_serializer,
+                        self._provider)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        'Reconnecting to %s failed, retrying in %.1fs: %r',
+                        self._url, delay, e)
+                    await asyncio.sleep(delay, loop=self._loop)
+                    delay = min(delay * 2, self._reconnect_max_delay)
+                else:
+                    delay = self._reconnect_delay
+                    self._available.append(conn)
+                    await self._notify()
+        finally:
+            self._reconnect_task = None
+
+    async def _maintain(self, interval):
+        while True:
+            await asyncio.sleep(interval, loop=self._loop)
+            self._close_idle()
+            if self._heartbeat_interval:
+                await self._heartbeat()
+
+    async def _heartbeat(self):
+        # Connections that miss the pong are lost and get replaced
+        conns = [conn for conn in itertools.chain(
+            self._available, self._acquired)
+            if not conn.closed and conn._conn.can_ping]
+        results = await asyncio.gather(
+            *[conn.ping(self._heartbeat_timeout) for conn in conns],
+            loop=self._loop, return_exceptions=True)
+        for result in results:
+            if result is not None and not isinstance(result, BaseException):
+                self._rtt_samples.append(result)
+
+    def _close_idle(self):
+        if self._idle_timeout is None:
+            return
+        now = self._loop.time()
+        num_open = self._num_open()
+        for conn in list(self._available):
+            if num_open <= self._min_conns:
+                break
+            if (not conn.closed and
+                    now - conn.last_used >= self._idle_timeout):
+                self._available.remove(conn)
+                num_open -= 1
+                self._loop.create_task(conn.close())
+
+    def _num_open(self):
+        return sum(1 for conn in self._available if not conn.closed) + sum(
+            1 for conn in self._acquired if not conn.closed)
@@ -1,13 +1,16 @@
 import asyncio
 import base64
 import collections
+import concurrent.futures
 import logging
+import time
 
 try:
     import ujson as json
 except ImportError:
     import json
 
+from aiogremlin.driver.serializer import Response
 from gremlin_python.driver import protocol, request, serializer
 
 
@@ -22,14 +25,72 @@ Message = collections.namedtuple(
     ["status_code", "data", "message"])
 
 
+DEFAULT_DECODE_THRESHOLD = 1024 * 1024
+
+
+class DecodeStats:
+    """
+    Response frames decoded by one or more protocols and the time spent on
+    them. `inline_seconds` is time the event loop was blocked decoding,
+    `executor_seconds` the time from handing a frame to the decode executor
+    until its response was ready, including any wait for a free worker.
+    With lazy results, inline time only covers the frame envelope.
+    """
+
+    def __init__(self):
+        self.inline_frames = 0
+        self.inline_seconds = 0.0
+        self.executor_frames = 0
+        self.executor_seconds = 0.0
+
+    def __repr__(self):
+        return ('DecodeStats(inline_frames={}, inline_seconds={:.6f}, '
+                'executor_frames={}, executor_seconds={:.6f})'.format(
+                    self.inline_frames, self.inline_seconds,
+                    self.executor_frames, self.executor_seconds))
+
+
 class GremlinServerWSProtocol(protocol.AbstractBaseProtocol):
-    """Implemenation of the Gremlin Server Websocket protocol"""
-    def __init__(self, message_serializer, username='', password=''):
+    """
+    Implemenation of the Gremlin Server Websocket protocol
+
+    :param message_serializer: Message serializer implementation
+    :param str username: Username for database auth
+    :param str password: Password for database auth
+    :param bool lazy_results: Only deserialize result items when they are
+        read from the
+        :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`.
+        Requires a serializer that implements `deserialize_response`
+    :param concurrent.futures.Executor decode_executor: Optional executor
+        used to decode large frames off the event loop. Process pools
+        require a picklable message serializer
+    :param int decode_threshold: Frames of at least this many bytes (or
+        characters, for text frames) are decoded in `decode_executor`
+    :param DecodeStats decode_stats: Optional stats to update, e.g. shared
+        by all connections to a host
+    :param asyncio.BaseEventLoop loop:
+    """
+    def __init__(self, message_serializer, username='', password='',
+                 lazy_results=False, decode_executor=None,
+                 decode_threshold=DEFAULT_DECODE_THRESHOLD, decode_stats=None,
+                 loop=None):
         if isinstance(message_serializer, type):
             message_serializer = message_serializer()
         self._message_serializer = message_serializer
         self._username = username
         self._password = password
+        self._lazy_results = lazy_results
+        self._decode_executor = decode_executor
+        self._decode_threshold = decode_threshold
+        if decode_stats is None:
+            decode_stats = DecodeStats()
+        self._decode_stats = decode_stats
+        self._loop = loop
+
+    @property
+    def decode_stats(self):
+        """Read-only property"""
+        return self._decode_stats
 
     def connection_made(self, transport):
         self._transport = transport
@@ -42,34 +103,96 @@ class GremlinServerWSProtocol(protocol.AbstractBaseProtocol):
             await func
 
     async def data_received(self, data, results_dict):
-        data = data.decode('utf-8')
-        message = self._message_serializer.deserialize_message(json.loads(data))
-        request_id = message['requestId']
-        status_code = message['status']['code']
-        data = message['result']['data']
-        msg = message['status']['message']
-        if request_id in results_dict:
-            result_set = results_dict[request_id]
-            aggregate_to = message['result']['meta'].get('aggregateTo', 'list')
-            result_set.aggregate_to = aggregate_to
+        """
+        Decode a response frame and queue its results.
 
-            if status_code == 407:
+        :param data: A frame as returned by the transport: `str` for text
+            frames, `bytes` or `memoryview` for binary frames
+        :param dict results_dict: Result sets of the pending requests
+        """
+        response = await self._decode(data)
+        request_id = response.request_id
+        if request_id in results_dict:
+            if response.status_code == 407:
                 auth = b''.join([b'\x00', self._username.encode('utf-8'),
                                  b'\x00', self._password.encode('utf-8')])
                 request_message = request.RequestMessage(
                     'traversal', 'authentication',
                     {'sasl': base64.b64encode(auth).decode()})
                 await self.write(request_id, request_message)
-            elif status_code == 204:
-                result_set.queue_result(None)
             else:
-                if data:
-                    for result in data:
-                        result = self._message_serializer.deserialize_message(result)
-                        message = Message(status_code, result, msg)
-                        result_set.queue_result(message)
-                else:
-                    message = Message(status_code, data, msg)
-                    result_set.queue_result(message)
-                if status_code != 206:
-                    result_set.queue_result(None)
+                self._queue_response(
+                    response, results_dict[request_id], len(data))
+
+    async def response_received(self, data, result_set):
+        """
+        Decode a complete response and queue its results, whatever its
+        request id. Used for HTTP responses, which answer exactly one
+        request.
+
+        :param data: Response body
+        :param ResultSet result_set: Result set of the request
+        """
+        response = await self._decode(data)
+        self._queue_response(response, result_set, len(data))
+
+    def _queue_response(self, response, result_set, size):
+        status_code = response.status_code
+        msg = response.message
+        result_set.aggregate_to = response.meta.get('aggregateTo', 'list')
+        result_set.status_code = status_code
+        if status_code == 204:
+            result_set.queue_result(None)
+        elif status_code in (200, 206):
+            result_set.queue_batch(status_code, response.data, msg, size)
+            if status_code != 206:
+                result_set.queue_result(None)
+        else:
+            result_set.queue_result(Message(status_code, [], msg))
+            result_set.queue_result(None)
+
+    async def _decode(self, data):
+        # The connection waits for each frame before reading the next one,
+        # so responses keep their order even when decoded off the loop
+        executor = self._decode_executor
+        stats = self._decode_stats
+        start = time.perf_counter()
+        if executor is not None and len(data) >= self._decode_threshold:
+            if (type(data) is memoryview and isinstance(
+                    executor, concurrent.futures.ProcessPoolExecutor)):
+                data = data.tobytes()
+            loop = self._loop or asyncio.get_event_loop()
+            response = await loop.run_in_executor(
+                executor, _decode_frame, self._message_serializer, data)
+            stats.executor_frames += 1
+            stats.executor_seconds += time.perf_counter() - start
+        else:
+            response = _deserialize_response(
+                self._message_serializer, data, self._lazy_results)
+            stats.inline_frames += 1
+            stats.inline_seconds += time.perf_counter() - start
+        return response
+
+
+def _deserialize_response(message_serializer, data, lazy):
+    # Serializers that understand whole frames decode them directly,
+    # otherwise fall back to the (slower) plain GraphSON envelope
+    deserialize_response = getattr(
+        message_serializer, 'deserialize_response', None)
+    if deserialize_response is not None:
+        return deserialize_response(data, lazy=lazy)
+    if not isinstance(data, str):
+        data = str(data, 'utf-8')
+    message = message_serializer.deserialize_message(json.loads(data))
+    return Response(message['requestId'], message['status']['code'],
+                    message['status']['message'],
+                    message['result']['meta'],
+                    message['result']['data'] or [])
+
+
+def _decode_frame(message_serializer, data):
+    # Runs in the decode executor: deserialize all result items there, a
+    # lazy response would move the work back onto the event loop
+    response = _deserialize_response(message_serializer, data, False)
+    return response._replace(data=list(response.data))
+
@@ -1,38 +1,163 @@
 import asyncio
-import functools
+import collections
 
 from aiogremlin import exception
+from aiogremlin.driver import columns
 
 
-def error_handler(fn):
-    @functools.wraps(fn)
-    async def wrapper(self):
-        msg = await fn(self)
-        if msg:
-            if msg.status_code not in [200, 206]:
-                self.close()
-                raise exception.GremlinServerError(
-                    msg.status_code,
-                    "{0}: {1}".format(msg.status_code, msg.message))
-            msg = msg.data
-        return msg
-    return wrapper
+_Batch = collections.namedtuple(
+    "_Batch", ["status_code", "data", "message", "size"])
+
+_Failure = collections.namedtuple("_Failure", ["exception"])
+
+_END = object()
+
+
+class FlowControl:
+    """
+    Budget for the response frames buffered by the result sets of a
+    connection but not read yet. While the connection as a whole, or any
+    single result set, is over its budget, the connection stops reading
+    from its socket, so TCP backpressure slows down the server.
+
+    Pausing stalls every other response multiplexed on the connection. The
+    stall ends once the result sets are read below their budgets or, at the
+    latest, after `timeout` seconds. Then the result sets holding the
+    excess are discarded: their readers get a
+    :py:class:`ResponseTimeoutError<aiogremlin.exception.ResponseTimeoutError>`
+    and the connection resumes reading.
+    `pauses` and `discarded` count the pauses and the discarded result
+    sets.
+
+    :param asyncio.BaseEventLoop loop:
+    :param int max_bytes: Bytes buffered by all result sets of the
+        connection, `None` for no limit
+    :param int max_result_bytes: Bytes buffered by any one result set,
+        `None` for no limit
+    :param float timeout: Maximum seconds a pause lasts, `None` waits for
+        the readers forever
+    """
+
+    def __init__(self, loop, *, max_bytes=None, max_result_bytes=None,
+                 timeout=None):
+        self._loop = loop
+        self._max_bytes = max_bytes
+        self._max_result_bytes = max_result_bytes
+        self._timeout = timeout
+        self._buffered = 0
+        self._result_sets = set()
+        self._over_budget = set()
+        self._resume = asyncio.Event(loop=loop)
+        self._resume.set()
+        self.pauses = 0
+        self.discarded = 0
+
+    @property
+    def buffered(self):
+        """Read-only property. Bytes buffered by all result sets"""
+        return self._buffered
+
+    @property
+    def paused(self):
+        """
+        Read-only property. Whether the connection should stop reading.
+
+        :returns: `bool`
+        """
+        return not self._resume.is_set()
+
+    def buffer(self, result_set, size):
+        """Account for a frame of `size` bytes queued to `result_set`"""
+        self._buffered += size
+        self._result_sets.add(result_set)
+        if (self._max_result_bytes is not None and
+                result_set.buffered > self._max_result_bytes):
+            self._over_budget.add(result_set)
+        self._update()
+
+    def consume(self, result_set, size):
+        """Account for a frame of `size` bytes read from `result_set`"""
+        self._buffered -= size
+        if not result_set.buffered:
+            self._result_sets.discard(result_set)
+        if (self._max_result_bytes is None or
+                result_set.buffered <= self._max_result_bytes):
+            self._over_budget.discard(result_set)
+        self._update()
+
+    async def wait(self):
+        """
+        **coroutine** Wait until the result sets are back within their
+        budgets, discarding result sets that hold the excess once the
+        timeout expires.
+        """
+        if not self.paused:
+            return
+        self.pauses += 1
+        try:
+            await asyncio.wait_for(
+                self._resume.wait(), self._timeout, loop=self._loop)
+        except asyncio.TimeoutError:
+            self._discard()
+
+    def _update(self):
+        if self._over_budget or (self._max_bytes is not None and
+                                 self._buffered > self._max_bytes):
+            self._resume.clear()
+        else:
+            self._resume.set()
+
+    def _discard(self):
+        error = exception.ResponseTimeoutError(
+            'Results were not read within {} seconds while the connection '
+            'was paused, buffered results were discarded'.format(
+                self._timeout))
+        for result_set in list(self._over_budget):
+            self.discarded += 1
+            result_set.discard(error)
+        # Largest first, until the connection is within its budget
+        result_sets = sorted(self._result_sets, key=lambda rs: rs.buffered)
+        while self.paused and result_sets:
+            self.discarded += 1
+            result_sets.pop().discard(error)
 
 
 class ResultSet:
-    """Gremlin Server response implementated as an async iterator."""
-    def __init__(self, request_id, timeout, loop):
+    """
+    Gremlin Server response implementated as an async iterator.
+
+    :param str request_id:
+    :param float timeout: Seconds to wait for each response frame
+    :param asyncio.BaseEventLoop loop:
+    :param FlowControl flow_control: Optional budget of the connection,
+        updated as frames are queued and read
+    """
+    def __init__(self, request_id, timeout, loop, *, flow_control=None):
         self._response_queue = asyncio.Queue(loop=loop)
         self._request_id = request_id
         self._loop = loop
         self._timeout = timeout
         self._done = asyncio.Event(loop=self._loop)
         self._aggregate_to = None
+        self._status_code = None
+        self._batch = None
+        self._buffered = 0
+        self._flow_control = flow_control
 
     @property
     def request_id(self):
         return self._request_id
 
+    @property
+    def buffered(self):
+        """
+        Read-only property. Bytes of the response frames queued but not
+        read yet, as counted by the protocol.
+
+        :returns: `int`
+        """
+        return self._buffered
+
     @property
     def stream(self):
         return self._response_queue
@@ -42,6 +167,53 @@ class ResultSet:
             self.close()
         self._response_queue.put_nowait(result)
 
+    def queue_batch(self, status_code, data, message, size=0):
+        """
+        Queue the results of a whole response frame. Items are pulled from
+        `data` only when they are read, so lazily deserialized results are
+        not converted until then.
+
+        :param int status_code: Response status code
+        :param data: Iterable of result items
+        :param str message: Response status message
+        :param int size: Size of the frame, counted against the flow
+            control budget until the batch is read
+        """
+        self._response_queue.put_nowait(
+            _Batch(status_code, data, message, size))
+        if size:
+            self._buffered += size
+            if self._flow_control is not None:
+                self._flow_control.buffer(self, size)
+
+    def fail(self, exc):
+        """
+        End the response with an error. Results queued so far can still be
+        read, then `exc` is raised.
+
+        :param Exception exc: Error raised to the reader
+        """
+        if self.done.is_set():
+            return
+        self._response_queue.put_nowait(_Failure(exc))
+        self.close()
+
+    def discard(self, exc):
+        """
+        Drop the results queued so far, releasing their buffer, and end
+        the response with an error.
+
+        :param Exception exc: Error raised to the reader
+        """
+        queue = self._response_queue
+        while not queue.empty():
+            msg = queue.get_nowait()
+            if type(msg) is _Batch and msg.size:
+                self._consumed(msg.size)
+        self._batch = None
+        queue.put_nowait(_Failure(exc))
+        self.close()
+
     @property
     def done(self):
         """
@@ -59,12 +231,25 @@ class ResultSet:
     def aggregate_to(self, val):
         self._aggregate_to = val
 
-    async def __aiter__(self):
+    @property
+    def status_code(self):
+        """
+        Status code of the last response frame, `None` until one arrives.
+
+        :returns: `int`
+        """
+        return self._status_code
+
+    @status_code.setter
+    def status_code(self, val):
+        self._status_code = val
+
+    def __aiter__(self):
         return self
 
     async def __anext__(self):
         msg = await self.one()
-        if not msg:
+        if msg is None:
             raise StopAsyncIteration
         return msg
 
@@ -72,9 +257,99 @@ class ResultSet:
         self.done.set()
         self._loop = None
 
-    @error_handler
     async def one(self):
         """Get a single message from the response stream"""
+        while True:
+            if self._batch is not None:
+                result = next(self._batch, _END)
+                if result is not _END:
+                    return result
+                self._batch = None
+            msg = await self._get()
+            if msg is None:
+                return None
+            self._check_status(msg)
+            if type(msg) is not _Batch:
+                return msg.data
+            self._batch = iter(msg.data)
+
+    def batches(self):
+        """
+        Iterate over the response one server batch at a time. Each batch
+        holds the results of one response frame, so the response queue is
+        only read once per frame.
+
+        :returns: Async iterator of result lists
+        """
+        return _BatchIterator(self)
+
+    async def all(self):
+        """Get all results from the response stream as a single list"""
+        results = []
+        async for batch in self.batches():
+            results.extend(batch)
+        return results
+
+    async def to_columns(self, unfold=True):
+        """
+        Stream the results into columns, see
+        :py:class:`ColumnBuilder<aiogremlin.driver.columns.ColumnBuilder>`.
+
+        :param bool unfold: Store single item lists as the item itself
+        :returns: :py:class:`collections.OrderedDict` of column name to
+            :py:class:`array.array` or :py:class:`list`
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_columns()
+
+    async def to_numpy(self, unfold=True):
+        """
+        Stream the results into columns of `numpy` arrays.
+
+        :param bool unfold: Store single item lists as the item itself
+        :returns: :py:class:`collections.OrderedDict` of column name to
+            `numpy.ndarray`
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_numpy()
+
+    async def to_arrow(self, unfold=True):
+        """
+        Stream the results into a `pyarrow.Table`.
+
+        :param bool unfold: Store single item lists as the item itself
+        :returns: `pyarrow.Table`
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_arrow()
+
+    async def _build_columns(self, unfold):
+        builder = columns.ColumnBuilder(unfold=unfold)
+        async for batch in self.batches():
+            builder.extend(batch)
+        return builder
+
+    async def _next_batch(self):
+        if self._batch is not None:
+            # Rest of a batch partially read with `one`
+            batch = list(self._batch)
+            self._batch = None
+            if batch:
+                return batch
+        while True:
+            msg = await self._get()
+            if msg is None:
+                return None
+            self._check_status(msg)
+            if type(msg) is not _Batch:
+                return [msg.data]
+            batch = msg.data
+            if type(batch) is not list:
+                batch = list(batch)
+            if batch:
+                return batch
+
+    async def _get(self):
         if not self._response_queue.empty():
             msg = self._response_queue.get_nowait()
         elif self.done.is_set():
@@ -87,10 +362,35 @@ class ResultSet:
             except asyncio.TimeoutError:
                 self.close()
                 raise exception.ResponseTimeoutError('Response timed out')
+        if type(msg) is _Batch and msg.size:
+            self._consumed(msg.size)
         return msg
 
-    async def all(self):
-        results = []
-        async for result in self:
-            results.append(result)
-        return results
+    def _consumed(self, size):
+        self._buffered -= size
+        if self._flow_control is not None:
+            self._flow_control.consume(self, size)
+
+    def _check_status(self, msg):
+        if type(msg) is _Failure:
+            raise msg.exception
+        if msg.status_code not in [200, 206]:
+            self.close()
+            raise exception.GremlinServerError(
+                msg.status_code,
+                "{0}: {1}".format(msg.status_code, msg.message))
+
+
+class _BatchIterator:
+
+    def __init__(self, result_set):
+        self._result_set = result_set
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self._result_set._next_batch()
+        if batch is None:
+            raise StopAsyncIteration
+        return batch
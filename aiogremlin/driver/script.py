@@ -0,0 +1,176 @@
+"""Prepared Gremlin scripts and literal extraction."""
+
+import re
+
+from aiogremlin.driver import limit
+
+
+_TOKENS = re.compile(r"""
+    (?P<skip>
+        '''.*?''' | \"\"\".*?\"\"\"     # triple quoted strings
+      | //[^\n]* | /\*.*?\*/            # comments
+      | \$/(?:\$[$/]|.)*?/\$            # dollar slashy strings
+      | [A-Za-z_$][\w$]*                # identifiers
+      | 0[xXbB][\w]*                    # hex and binary numbers
+    )
+  | '(?P<single>[^'\\\n]*)'
+  | "(?P<double>[^"\\\n$]*)"
+  | (?P<gstring>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<number>\d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?[A-Za-z]?)
+  | (?P<slash>/)                        # division or slashy string
+""", re.VERBOSE | re.DOTALL)
+
+# Rest of a slashy string, only slashes are escaped
+_SLASHY = re.compile(r'(?:\\/|[^/])*/', re.DOTALL)
+
+# Characters after which a slash starts a slashy string
+_OPERAND_EXPECTED = frozenset('([{,;:=!&|?+-*%<>~^\n')
+
+_MAP_KEY = re.compile(r'\s*:(?!:)')
+
+# A leading zero makes an integer octal in Groovy
+_INT = re.compile(r'(?:0|[1-9]\d*)$')
+
+_DOUBLE = re.compile(r'\d+(?:\.\d+)?(?:[eE][+-]?\d+)?[dD]$')
+
+
+def lift_literals(script, prefix='_lit', reserved=()):
+    """
+    Replace the string and number literals of a Gremlin-Groovy script with
+    bindings, so that scripts which only differ in their literals share one
+    compiled script on the server. Only literals whose meaning does not
+    change when bound are lifted: single quoted strings, double quoted
+    strings without interpolation or escapes, plain decimal integers and
+    decimals with a `d` suffix. Map keys, member names and the contents of
+    slashy strings are left in place. Scripts in which a slash can't be
+    told to be a division or to start a slashy string are not rewritten.
+
+    :param str script: Gremlin-Groovy script
+    :param str prefix: Prefix of the binding names, extended with
+        underscores until it does not occur in the script and starts none
+        of the `reserved` names
+    :param reserved: Names of bindings passed with the script, which the
+        generated names must not replace
+    :returns: `tuple` of the rewritten script and a `dict` of bindings
+    """
+    while prefix in script or any(
+            name.startswith(prefix) for name in reserved):
+        prefix = '_' + prefix
+    bindings = {}
+    names = {}
+    parts = []
+    start = 0
+    pos = 0
+    while True:
+        match = _TOKENS.search(script, pos)
+        if match is None:
+            break
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == 'slash':
+            slashy = _starts_slashy(script, match.start())
+            if slashy:
+                end = _SLASHY.match(script, pos)
+                if end is None:
+                    return script, {}
+                pos = end.end()
+            elif slashy is None:
+                return script, {}
+            continue
+        if kind in ('single', 'double'):
+            value = match.group(kind)
+        elif kind == 'number':
+            token = match.group(kind)
+            if _INT.match(token):
+                value = int(token)
+            elif _DOUBLE.match(token):
+                value = float(token[:-1])
+            else:
+                continue
+        else:
+            continue
+        if (_MAP_KEY.match(script, match.end()) or
+                _is_member(script, match.start())):
+            continue
+        key = (type(value), value)
+        name = names.get(key)
+        if name is None:
+            name = names[key] = '{}{}'.format(prefix, len(names))
+            bindings[name] = value
+        parts.append(script[start:match.start()])
+        parts.append(name)
+        start = match.end()
+    if not parts:
+        return script, bindings
+    parts.append(script[start:])
+    return ''.join(parts), bindings
+
+
+def _starts_slashy(script, index):
+    # Whether the slash at `index` starts a slashy string rather than being
+    # a division, `None` if that depends on more than the previous token
+    end = index
+    while end > 0 and script[end - 1] in ' \t\r':
+        end -= 1
+    if end == 0 or script[end - 1] in _OPERAND_EXPECTED:
+        return True
+    char = script[end - 1]
+    if char.isalnum() or char in '_$':
+        start = end
+        while start > 0 and (script[start - 1].isalnum() or
+                             script[start - 1] in '_$'):
+            start -= 1
+        return script[start:end] in ('return', 'in', 'case', 'assert')
+    if char in ')]\'"':
+        return False
+    return None
+
+
+def _is_member(script, index):
+    # Literals such as `v.'name'` are property or method names
+    index -= 1
+    while index >= 0 and script[index].isspace():
+        index -= 1
+    return index >= 0 and script[index] == '.'
+
+
+class PreparedScript:
+    """
+    A script that is submitted many times with different bindings, see
+    :py:meth:`Client.prepare<aiogremlin.driver.client.Client.prepare>`. The
+    message serializers shipped with :py:mod:`aiogremlin` cache the
+    serialized request envelope for each prepared script.
+
+    :param aiogremlin.driver.client.Client client: Client used to submit
+        the script
+    :param str script: Gremlin script
+    """
+
+    def __init__(self, client, script):
+        self._client = client
+        self._script = script
+
+    @property
+    def prepared(self):
+        """Read-only property"""
+        return self
+
+    @property
+    def script(self):
+        """Read-only property"""
+        return self._script
+
+    async def submit(self, bindings=None, *, priority=limit.PRIORITY_NORMAL):
+        """
+        **coroutine** Submit the script to the Gremlin Server.
+
+        :param dict bindings: Optional bindings
+        :param int priority: Priority of the request, see
+            :py:meth:`Client.submit<aiogremlin.driver.client.Client.submit>`
+        :returns: :py:class:`ResultSet<aiogremlin.driver.resultset.ResultSet>`
+            object
+        """
+        return await self._client.submit(self, bindings, priority=priority)
+
+    def __repr__(self):
+        return 'PreparedScript({!r})'.format(self._script)
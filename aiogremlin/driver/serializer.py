@@ -0,0 +1,541 @@
+"""Message serializers that decode whole Gremlin Server response frames."""
+
+import collections
+import functools
+import importlib
+import uuid
+import weakref
+
+from aiogremlin import exception
+from aiogremlin.process.traversal import bind_bytecode
+from aiogremlin.structure.io import graphbinaryV1
+from gremlin_python import statics
+from gremlin_python.driver import request, serializer
+from gremlin_python.process.traversal import Traverser
+from gremlin_python.structure.graph import (
+    Edge, Path, Property, Vertex, VertexProperty)
+from gremlin_python.structure.io import graphsonV3d0
+
+
+Response = collections.namedtuple(
+    "Response",
+    ["request_id", "status_code", "message", "meta", "data"])
+"""
+A decoded response frame. `data` is an iterable of result items, which
+may be deserialized as they are iterated over.
+"""
+
+
+JSON_BACKENDS = ('json', 'orjson', 'ujson')
+
+
+def get_json_backend(name=None):
+    """
+    Import a JSON backend by name. Default is `'json'`.
+
+    :returns: The backend module
+    """
+    name = name or 'json'
+    if name not in JSON_BACKENDS:
+        raise exception.ConfigError(
+            'Unknown json_backend: {}. Choose one of {}'.format(
+                name, ', '.join(JSON_BACKENDS)))
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise exception.ConfigError(
+            'json_backend {} is not installed'.format(name))
+
+
+def _to_map(value):
+    items = iter(value)
+    return dict(zip(items, items))
+
+
+def _to_vertex(value):
+    return Vertex(value['id'], value.get('label', 'vertex'))
+
+
+def _to_edge(value):
+    return Edge(value['id'],
+                Vertex(value['outV'], value.get('outVLabel', 'vertex')),
+                value.get('label', 'edge'),
+                Vertex(value['inV'], value.get('inVLabel', 'vertex')))
+
+
+def _to_vertex_property(value):
+    vertex = Vertex(value['vertex']) if 'vertex' in value else None
+    return VertexProperty(value['id'], value['label'], value['value'], vertex)
+
+
+def _to_property(value):
+    return Property(value['key'], value['value'], value.get('element'))
+
+
+def _to_path(value):
+    return Path([set(label) for label in value['labels']], value['objects'])
+
+
+def _to_traverser(value):
+    return Traverser(value['value'], value['bulk'])
+
+
+def _walk_list(value, to_object):
+    return [to_object(item) for item in value]
+
+
+def _walk_set(value, to_object):
+    return set([to_object(item) for item in value])
+
+
+def _walk_map(value, to_object):
+    items = iter(value)
+    return {to_object(key): to_object(item) for key, item in zip(items, items)}
+
+
+def _walk_vertex(value, to_object):
+    return Vertex(to_object(value['id']), value.get('label', 'vertex'))
+
+
+def _walk_edge(value, to_object):
+    return Edge(to_object(value['id']),
+                Vertex(to_object(value['outV']),
+                       value.get('outVLabel', 'vertex')),
+                value.get('label', 'edge'),
+                Vertex(to_object(value['inV']),
+                       value.get('inVLabel', 'vertex')))
+
+
+def _walk_vertex_property(value, to_object):
+    if 'vertex' in value:
+        vertex = Vertex(to_object(value['vertex']))
+    else:
+        vertex = None
+    return VertexProperty(to_object(value['id']), value['label'],
+                          to_object(value['value']), vertex)
+
+
+def _walk_property(value, to_object):
+    return Property(value['key'], to_object(value['value']),
+                    to_object(value.get('element')))
+
+
+def _walk_path(value, to_object):
+    return Path([set(label) for label in to_object(value['labels'])],
+                to_object(value['objects']))
+
+
+def _walk_traverser(value, to_object):
+    return Traverser(to_object(value['value']), to_object(value['bulk']))
+
+
+# GraphSON 3.0 deserializers used by the JSON parser's object hook. Types
+# are built bottom up, so nested values are already deserialized.
+_GRAPHSON_V3_HOOKS = {
+    'g:List': lambda value: value,
+    'g:Set': set,
+    'g:Map': _to_map,
+    'g:Int32': lambda value: value,
+    'g:Int64': statics.long,
+    'g:Float': float,
+    'g:Double': float,
+    'g:Vertex': _to_vertex,
+    'g:Edge': _to_edge,
+    'g:VertexProperty': _to_vertex_property,
+    'g:Property': _to_property,
+    'g:Path': _to_path,
+    'g:Traverser': _to_traverser
+}
+
+# GraphSON 3.0 deserializers used when walking an already parsed frame.
+# Nested values are deserialized with the `to_object` callback.
+_GRAPHSON_V3_WALKERS = {
+    'g:List': _walk_list,
+    'g:Set': _walk_set,
+    'g:Map': _walk_map,
+    'g:Int32': lambda value, to_object: value,
+    'g:Int64': lambda value, to_object: statics.long(value),
+    'g:Float': lambda value, to_object: float(value),
+    'g:Double': lambda value, to_object: float(value),
+    'g:Vertex': _walk_vertex,
+    'g:Edge': _walk_edge,
+    'g:VertexProperty': _walk_vertex_property,
+    'g:Property': _walk_property,
+    'g:Path': _walk_path,
+    'g:Traverser': _walk_traverser
+}
+
+
+def _default_deserializers(deserializers, functions):
+    # Only use fast paths for types the reader has not overridden
+    return dict(
+        (graphson_type, func) for graphson_type, func in functions.items()
+        if deserializers.get(graphson_type) is
+        graphsonV3d0._deserializers.get(graphson_type))
+
+
+_BYTECODE_ARGS = frozenset(['gremlin', 'aliases'])
+_EVAL_ARGS = frozenset(['gremlin', 'aliases', 'bindings'])
+
+
+class _RequestTemplate:
+    """
+    A serialized request split around its variable parts: the request id
+    and the values of the prepared traversal's parameters.
+
+    :param bytes payload: Request serialized with placeholder values
+    :param dict markers: Map of encoded placeholder to parameter name, or
+        to `None` for the request id
+    """
+    __slots__ = ('_fragments', '_slots')
+
+    def __init__(self, payload, markers):
+        positions = []
+        for marker, name in markers.items():
+            index = payload.find(marker)
+            while index != -1:
+                positions.append((index, len(marker), name))
+                index = payload.find(marker, index + len(marker))
+        positions.sort(key=lambda position: position[0])
+        self._fragments = []
+        self._slots = []
+        start = 0
+        for index, length, name in positions:
+            self._fragments.append(payload[start:index])
+            self._slots.append(name)
+            start = index + length
+        self._fragments.append(payload[start:])
+
+    def render(self, encoded):
+        """
+        :param dict encoded: Encoded values keyed like the template markers
+        :returns: `bytes`
+        """
+        fragments = self._fragments
+        parts = [fragments[0]]
+        for name, fragment in zip(self._slots, fragments[1:]):
+            parts.append(encoded[name])
+            parts.append(fragment)
+        return b''.join(parts)
+
+
+class _PreparedRequests:
+    """
+    Serializer mixin for prepared traversals (see
+    :py:meth:`AsyncGraphTraversalSource.prepare
+    <aiogremlin.process.graph_traversal.AsyncGraphTraversalSource.prepare>`)
+    and prepared scripts (see
+    :py:meth:`Client.prepare<aiogremlin.driver.client.Client.prepare>`).
+    One request template is cached per prepared object, aliases and binding
+    names, so a prepared request is serialized by patching the request id
+    and binding values into the cached payload.
+    """
+
+    def serialize_message(self, request_id, request_message):
+        message = self._serialize_prepared(request_id, request_message)
+        if message is None:
+            message = self._serialize_message(request_id, request_message)
+        return message
+
+    def _serialize_prepared(self, request_id, request_message):
+        processor, op, args = request_message
+        gremlin = args.get('gremlin')
+        prepared = getattr(gremlin, 'prepared', None)
+        if prepared is None:
+            return None
+        if op == 'bytecode' and set(args) <= _BYTECODE_ARGS:
+            values = gremlin.values
+        elif op == 'eval' and set(args) <= _EVAL_ARGS:
+            values = args.get('bindings') or {}
+        else:
+            if op == 'eval':
+                args = dict(args, gremlin=prepared.script)
+                return self._serialize_message(
+                    request_id, request.RequestMessage(processor, op, args))
+            return None
+        aliases = args.get('aliases') or {}
+        templates = self._templates.setdefault(prepared, {})
+        key = (tuple(sorted(aliases.items())), tuple(sorted(values)))
+        template = templates.get(key)
+        if template is None:
+            template = templates[key] = self._build_template(
+                processor, op, aliases, prepared, values)
+        encoded = dict((name, self._encode_value(value, op))
+                       for name, value in values.items())
+        encoded[None] = self._encode_request_id(request_id)
+        return template.render(encoded)
+
+    def _build_template(self, processor, op, aliases, prepared, names):
+        request_id = str(uuid.uuid4())
+        placeholders = dict(
+            (name, 'aiogremlin-{}'.format(uuid.uuid4().hex))
+            for name in names)
+        # Parameters that are never used are simply not found in the payload
+        if op == 'bytecode':
+            args = {'gremlin': bind_bytecode(prepared.bytecode, placeholders),
+                    'aliases': aliases}
+        else:
+            args = {'gremlin': prepared.script, 'aliases': aliases}
+            if placeholders:
+                args['bindings'] = placeholders
+        payload = self._serialize_message(
+            request_id, request.RequestMessage(processor, op, args))
+        markers = dict((self._encode_value(placeholder, op), name)
+                       for name, placeholder in placeholders.items())
+        markers[self._encode_request_id(request_id)] = None
+        return _RequestTemplate(payload, markers)
+
+
+class GraphSONMessageSerializer(_PreparedRequests,
+                                serializer.GraphSONMessageSerializer):
+    """
+    GraphSON message serializer that decodes each response frame in a
+    single pass. With the default standard library `json` backend, GraphSON
+    types are built by the parser itself through an object hook. `orjson`
+    and `ujson` parse faster but do not support hooks, so the parsed frame
+    is converted in one walk afterwards; which one wins depends on how
+    heavily typed the results are (see `benchmarks/bench_decode.py`).
+
+    Types overridden by a custom reader fall back to the reader's own
+    deserializers. Requests for prepared traversals are serialized from a
+    cached template.
+
+    :param reader: Optional custom GraphSON reader
+    :param writer: Optional custom GraphSON writer
+    :param bytes version: Optional mime type
+    :param str json_backend: One of `'json'`, `'orjson'` or `'ujson'`.
+        Default is `'json'`
+    """
+
+    def __init__(self, reader=None, writer=None, version=None,
+                 json_backend=None):
+        super().__init__(reader=reader, writer=writer, version=version)
+        self._graphson_writer = self.traversal._graphson_writer
+        self._templates = weakref.WeakKeyDictionary()
+        deserializers = self._graphson_reader.deserializers
+        self._deserializers = deserializers
+        module = get_json_backend(json_backend)
+        self._json_backend = module.__name__
+        self._raw_loads = module.loads
+        self._walkers = _default_deserializers(
+            deserializers, _GRAPHSON_V3_WALKERS)
+        if self._json_backend == 'json':
+            self._hooks = _default_deserializers(
+                deserializers, _GRAPHSON_V3_HOOKS)
+            self._loads = functools.partial(
+                module.loads, object_hook=self._object_hook)
+        else:
+            self._loads = module.loads
+
+    @property
+    def json_backend(self):
+        """Read only property"""
+        return self._json_backend
+
+    def __reduce__(self):
+        # Pickled to decode frames in a process pool. Writers map the
+        # `function` type, which can't be pickled, so copies get a default
+        # writer; cached templates and parser hooks are rebuilt
+        return (self.__class__, (self._graphson_reader, None, self._version,
+                                 self._json_backend))
+
+    def _serialize_message(self, request_id, request_message):
+        return serializer.GraphSONMessageSerializer.serialize_message(
+            self, request_id, request_message)
+
+    def _encode_request_id(self, request_id):
+        return request_id.encode('utf-8')
+
+    def _encode_value(self, value, op):
+        # Encode values exactly like the base serializer: script bindings
+        # are written as plain JSON, bytecode arguments as GraphSON
+        if op != 'eval':
+            value = self._graphson_writer.toDict(value)
+        return serializer.json.dumps(value).encode('utf-8')
+
+    def deserialize_response(self, data, lazy=False):
+        """
+        Decode a response frame.
+
+        :param data: `str`, `bytes` or `memoryview` containing the frame.
+            It is handed to the JSON parser without copying, only the
+            standard library parser needs a `memoryview` decoded first
+        :param bool lazy: If `True`, only parse the JSON and deserialize
+            each result item when it is iterated over
+        :returns: :py:class:`Response`
+        """
+        if type(data) is memoryview and self._json_backend == 'json':
+            data = str(data, 'utf-8')
+        if lazy:
+            message = self._raw_loads(data)
+        else:
+            message = self._loads(data)
+        status = message['status']
+        result = message['result']
+        results = result['data']
+        meta = result['meta']
+        if lazy:
+            results = self._iter_results(results)
+            meta = self._to_object(meta)
+        elif self._json_backend != 'json':
+            results = self._to_object(results)
+            meta = self._to_object(meta)
+        return Response(message['requestId'], status['code'],
+                        status['message'], meta, results or [])
+
+    def _iter_results(self, results):
+        if results is None:
+            return
+        if (type(results) is dict and
+                results.get('@type') in ('g:List', 'g:Set') and
+                results['@type'] in self._walkers):
+            results = results['@value']
+        elif type(results) is not list:
+            # Scalar results and custom collection types can't be split
+            # up, so they are deserialized as a whole
+            results = self._to_object(results)
+            if not isinstance(results, (list, set)):
+                results = [results]
+            for result in results:
+                yield result
+            return
+        for result in results:
+            yield self._to_object(result)
+
+    def _object_hook(self, obj):
+        graphson_type = obj.get('@type')
+        if graphson_type is not None and '@value' in obj:
+            func = self._hooks.get(graphson_type)
+            if func is not None:
+                return func(obj['@value'])
+            deserializer = self._deserializers.get(graphson_type)
+            if deserializer is not None:
+                return deserializer.objectify(
+                    obj['@value'], self._graphson_reader)
+        return obj
+
+    def _to_object(self, obj):
+        obj_type = type(obj)
+        if obj_type is dict:
+            graphson_type = obj.get('@type')
+            if graphson_type is not None and '@value' in obj:
+                func = self._walkers.get(graphson_type)
+                if func is not None:
+                    return func(obj['@value'], self._to_object)
+                deserializer = self._deserializers.get(graphson_type)
+                if deserializer is not None:
+                    return deserializer.objectify(
+                        obj['@value'], self._graphson_reader)
+            to_object = self._to_object
+            return dict((to_object(key), to_object(value))
+                        for key, value in obj.items())
+        elif obj_type is list:
+            to_object = self._to_object
+            return [to_object(item) for item in obj]
+        return obj
+
+
+class GraphBinaryMessageSerializer(_PreparedRequests):
+    """
+    Message serializer for GraphBinary 1.0 (requires Gremlin Server 3.4+).
+    Requests are written as binary frames, requests for prepared traversals
+    from a cached template. Response frames are decoded
+    straight from the received buffer; the result items of a frame are
+    deserialized one at a time as they are consumed.
+
+    :param reader: Optional custom GraphBinary reader
+    :param writer: Optional custom GraphBinary writer
+    :param bytes version: Optional mime type
+    """
+
+    DEFAULT_READER_CLASS = graphbinaryV1.GraphBinaryReader
+    DEFAULT_WRITER_CLASS = graphbinaryV1.GraphBinaryWriter
+    DEFAULT_VERSION = b"application/vnd.graphbinary-v1.0"
+
+    VERSION_BYTE = 0x81
+
+    def __init__(self, reader=None, writer=None, version=None):
+        if not version:
+            version = self.DEFAULT_VERSION
+        self._version = version
+        self._header = bytes((len(version),)) + version
+        if not reader:
+            reader = self.DEFAULT_READER_CLASS()
+        self._graphbinary_reader = reader
+        if not writer:
+            writer = self.DEFAULT_WRITER_CLASS()
+        self._graphbinary_writer = writer
+        self._templates = weakref.WeakKeyDictionary()
+
+    @property
+    def version(self):
+        """Read only property"""
+        return self._version
+
+    def __reduce__(self):
+        # See GraphSONMessageSerializer.__reduce__
+        return (self.__class__, (self._graphbinary_reader, None,
+                                 self._version))
+
+    def _serialize_message(self, request_id, request_message):
+        processor, op, args = request_message
+        args = self._get_op_args(op, args)
+        writer = self._graphbinary_writer
+        buf = bytearray(self._header)
+        buf.append(self.VERSION_BYTE)
+        buf += uuid.UUID(request_id).bytes
+        writer.write_bare_string(op, buf)
+        writer.write_bare_string(processor, buf)
+        writer.write_bare_map(args, buf)
+        return bytes(buf)
+
+    def _encode_request_id(self, request_id):
+        return uuid.UUID(request_id).bytes
+
+    def _encode_value(self, value, op):
+        return self._graphbinary_writer.writeObject(value)
+
+    def deserialize_message(self, message):
+        """Deserialize a single fully qualified GraphBinary value"""
+        return self._graphbinary_reader.read_object(message)[0]
+
+    def deserialize_response(self, data, lazy=False):
+        """
+        Decode the header of a response frame. Result items are always
+        decoded from the frame buffer as they are iterated over, so `lazy`
+        makes no difference.
+
+        :param data: `bytes` or `memoryview` containing the frame
+        :returns: :py:class:`Response` whose `data` lazily yields the
+            result items of the frame
+        """
+        reader = self._graphbinary_reader
+        buf = memoryview(data)
+        if buf[0] != self.VERSION_BYTE:
+            raise exception.SerializationError(
+                'Unsupported GraphBinary response version: {:#04x}'.format(
+                    buf[0]))
+        request_id, offset = reader.read_nullable(
+            graphbinaryV1.DataType.uuid, buf, 1)
+        if request_id is not None:
+            request_id = str(request_id)
+        status_code, offset = reader.read_value(
+            graphbinaryV1.DataType.int, buf, offset)
+        message, offset = reader.read_nullable(
+            graphbinaryV1.DataType.string, buf, offset)
+        _, offset = reader.read_value(
+            graphbinaryV1.DataType.map, buf, offset)  # status attributes
+        meta, offset = reader.read_value(
+            graphbinaryV1.DataType.map, buf, offset)
+        return Response(request_id, status_code, message, meta,
+                        reader.iter_results(buf, offset))
+
+    def _get_op_args(self, op, args):
+        args = dict(args)
+        if op in ('bytecode', 'gather') and not args.get('aliases'):
+            args['aliases'] = {'g': 'g'}
+        if op in ('gather', 'keys', 'close'):
+            side_effect = args['sideEffect']
+            if not isinstance(side_effect, uuid.UUID):
+                args['sideEffect'] = uuid.UUID(side_effect)
+        return args
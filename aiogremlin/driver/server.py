@@ -1,6 +1,37 @@
+import asyncio
+import logging
+import socket
 import ssl
 
-from aiogremlin.driver import pool
+import aiohttp
+from aiohttp import abc
+
+from aiogremlin.driver import (
+    balancer, health, http, limit, pool, protocol, serializer)
+from gremlin_python.driver import request
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PinnedResolver(abc.AbstractResolver):
+    # Resolves the host name of the url to one given address, so TLS still
+    # checks the certificate against, and sends SNI for, the name
+
+    def __init__(self, address):
+        self._address = address
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        if ':' in self._address:
+            family = socket.AF_INET6
+        else:
+            family = socket.AF_INET
+        return [{'hostname': host, 'host': self._address, 'port': port,
+                 'family': family, 'proto': 0,
+                 'flags': socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
 
 
 class GremlinServer:
@@ -13,8 +44,24 @@ class GremlinServer:
 
     def __init__(self, url, loop, **config):
         self._pool = None
+        self._session = None
+        self._http_connection = None
         self._url = url
         self._loop = loop
+        # Per host settings, set by the cluster
+        self._weight = config.get('weight', 1)
+        self._address = config.get('address')
+        self._breaker = health.CircuitBreaker(
+            loop, failure_threshold=config['failure_threshold'],
+            failure_rate=config['failure_rate'],
+            failure_window=config['failure_window'],
+            failure_status_codes=config['failure_status_codes'],
+            on_open=self._circuit_opened)
+        self._stats = balancer.HostStats(loop, breaker=self._breaker)
+        self._probe_interval = config['probe_interval']
+        self._probe_timeout = config['probe_timeout']
+        self._probe_script = config['probe_script']
+        self._probe_task = None
         self._response_timeout = config['response_timeout']
         self._username = config['username']
         self._password = config['password']
@@ -22,8 +69,37 @@ class GremlinServer:
         self._max_conns = config['max_conns']
         self._min_conns = config['min_conns']
         self._max_inflight = config['max_inflight']
-        self._message_serializer = config['message_serializer']
+        message_serializer = config['message_serializer']
+        if (isinstance(message_serializer, type) and issubclass(
+                message_serializer, serializer.GraphSONMessageSerializer)):
+            message_serializer = message_serializer(
+                json_backend=config['json_backend'])
+        self._message_serializer = message_serializer
         self._provider = config['provider']
+        self._lazy_results = config['lazy_results']
+        self._compression_level = config['compression_level']
+        self._compression_min_size = config['compression_min_size']
+        self._decode_executor = config['decode_executor']
+        self._decode_threshold = config['decode_threshold']
+        self._transport_class = config['transport']
+        self._dns_cache_ttl = config['dns_cache_ttl']
+        self._reconnect_delay = config['reconnect_delay']
+        self._reconnect_max_delay = config['reconnect_max_delay']
+        self._heartbeat_interval = config['heartbeat_interval']
+        self._heartbeat_timeout = config['heartbeat_timeout']
+        self._idle_timeout = config['idle_timeout']
+        self._buffer_size = config['buffer_size']
+        self._result_buffer_size = config['result_buffer_size']
+        self._buffer_timeout = config['buffer_timeout']
+        self._coalesce_writes = config['coalesce_writes']
+        self._coalesce_max_bytes = config['coalesce_max_bytes']
+        self._coalesce_max_delay = config['coalesce_max_delay']
+        self._connect_timeout = config['connect_timeout']
+        self._max_handshakes = config['max_handshakes']
+        self._min_inflight = config['min_inflight']
+        self._inflight_tolerance = config['inflight_tolerance']
+        self._reserved_inflight = config['reserved_inflight']
+        self._error = None
         scheme = config['scheme']
         if scheme in ['https', 'wss']:
             certfile = config['ssl_certfile']
@@ -40,6 +116,48 @@ class GremlinServer:
     def url(self):
         return self._url
 
+    @property
+    def address(self):
+        """
+        Readonly property. Address connected to instead of resolving the
+        url's host name, e.g. one of the addresses of the cluster's
+        `resolve_hostname`. `None` by default.
+
+        :returns: `str`
+        """
+        return self._address
+
+    @property
+    def weight(self):
+        """
+        Readonly property. Share of the requests sent to this host by the
+        :py:class:`Weighted<aiogremlin.driver.balancer.Weighted>` policy,
+        from the cluster's `host_weights` setting.
+
+        :returns: `float`
+        """
+        return self._weight
+
+    @property
+    def breaker(self):
+        """
+        Readonly property. Circuit breaker that takes this host out of
+        service while it fails.
+
+        :returns: :py:class:`CircuitBreaker<aiogremlin.driver.health.CircuitBreaker>`
+        """
+        return self._breaker
+
+    @property
+    def stats(self):
+        """
+        Readonly property. Requests and latency of this host, used by load
+        balancing policies.
+
+        :returns: :py:class:`HostStats<aiogremlin.driver.balancer.HostStats>`
+        """
+        return self._stats
+
     @property
     def pool(self):
         """
@@ -50,28 +168,196 @@ class GremlinServer:
         if self._pool:
             return self._pool
 
+    @property
+    def down(self):
+        """
+        Readonly property. `True` if the host could not be initialized.
+
+        :returns: `bool`
+        """
+        return self._error is not None
+
+    @property
+    def error(self):
+        """
+        Readonly property. Error that brought the host down, if any.
+
+        :returns: `Exception`
+        """
+        return self._error
+
+    @property
+    def session(self):
+        """
+        Readonly property. Session shared by the transports of all
+        connections to this host.
+
+        :returns: :py:class:`aiohttp.ClientSession`
+        """
+        return self._session
+
+    @property
+    def http_connection(self):
+        """
+        Readonly property. Connection used to submit scripts over HTTP.
+
+        :returns: :py:class:`HTTPConnection<aiogremlin.driver.http.HTTPConnection>`
+        """
+        return self._http_connection
+
+    async def drain(self, timeout=None):
+        """
+        **coroutine** Wait until no connection of the host is acquired and
+        no request is outstanding, e.g. before closing a host that was
+        taken out of service.
+
+        :param float timeout: Seconds to wait at most, `None` to wait as
+            long as it takes
+        :returns: `bool`, whether the host was drained in time
+        """
+        if timeout is not None:
+            deadline = self._loop.time() + timeout
+        while self._stats.outstanding or (
+                self._pool is not None and self._pool.num_acquired):
+            if timeout is not None and self._loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.05, loop=self._loop)
+        return True
+
     async def close(self):
         """**coroutine** Close underlying connection pool."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._http_connection:
+            await self._http_connection.close()
+            self._http_connection = None
         if self._pool:
             await self._pool.close()
             self._pool = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def get_connection(self, http=False,
+                             priority=limit.PRIORITY_NORMAL):
+        """
+        **coroutine** Acquire a connection from the pool.
 
-    async def get_connection(self):
-        """**coroutine** Acquire a connection from the pool."""
+        :param bool http: Return the connection that submits scripts over
+            HTTP instead
+        :param int priority: Acquirers with lower values get connections
+            first
+        """
+        if http:
+            if self._http_connection is None:
+                raise Exception("Please initialize pool")
+            return self._http_connection
         try:
-            conn = await self._pool.acquire()
+            conn = await self._pool.acquire(priority)
         except AttributeError:
             raise Exception("Please initialize pool")
         return conn
 
     async def initialize(self):
+        # Websockets keep their connection, so the connector must not limit
+        # the number of connections; it still caches DNS lookups and keeps
+        # HTTP connections alive between requests
+        resolver = None
+        if self._address is not None:
+            resolver = _PinnedResolver(self._address)
+        connector = aiohttp.TCPConnector(
+            ssl_context=self._ssl_context, limit=0, use_dns_cache=True,
+            ttl_dns_cache=self._dns_cache_ttl, resolver=resolver,
+            loop=self._loop)
+        self._session = aiohttp.ClientSession(
+            loop=self._loop, connector=connector)
         conn_pool = pool.ConnectionPool(
             self._url, self._loop, self._ssl_context, self._username,
             self._password, self._max_conns, self._min_conns,
             self._max_times_acquired, self._max_inflight,
-            self._response_timeout, self._message_serializer, self._provider)
-        await conn_pool.init_pool()
+            self._response_timeout, self._message_serializer, self._provider,
+            lazy_results=self._lazy_results,
+            compression_level=self._compression_level,
+            compression_min_size=self._compression_min_size,
+            decode_executor=self._decode_executor,
+            decode_threshold=self._decode_threshold,
+            transport_class=self._transport_class, session=self._session,
+            reconnect_delay=self._reconnect_delay,
+            reconnect_max_delay=self._reconnect_max_delay,
+            heartbeat_interval=self._heartbeat_interval,
+            heartbeat_timeout=self._heartbeat_timeout,
+            idle_timeout=self._idle_timeout, buffer_size=self._buffer_size,
+            result_buffer_size=self._result_buffer_size,
+            buffer_timeout=self._buffer_timeout,
+            coalesce_writes=self._coalesce_writes,
+            coalesce_max_bytes=self._coalesce_max_bytes,
+            coalesce_max_delay=self._coalesce_max_delay,
+            connect_timeout=self._connect_timeout,
+            max_handshakes=self._max_handshakes,
+            min_inflight=self._min_inflight,
+            inflight_tolerance=self._inflight_tolerance,
+            reserved_inflight=self._reserved_inflight,
+            host_stats=self._stats)
+        try:
+            await conn_pool.init_pool()
+        except Exception as e:
+            await conn_pool.close()
+            await self._session.close()
+            self._session = None
+            self._error = e
+            raise
+        self._error = None
         self._pool = conn_pool
+        http_protocol = protocol.GremlinServerWSProtocol(
+            self._message_serializer, lazy_results=self._lazy_results,
+            decode_executor=self._decode_executor,
+            decode_threshold=self._decode_threshold,
+            decode_stats=conn_pool.decode_stats, loop=self._loop)
+        self._http_connection = http.HTTPConnection(
+            http.http_url(self._url), self._loop, self._session,
+            http_protocol, self._message_serializer,
+            username=self._username, password=self._password,
+            response_timeout=self._response_timeout, host_stats=self._stats)
+
+    def _circuit_opened(self, breaker):
+        logger.warning('Circuit of %s opened, probing every %ss',
+                       self._url, self._probe_interval)
+        if self._probe_task is None:
+            self._probe_task = self._loop.create_task(self._probe())
+
+    async def _probe(self):
+        breaker = self._breaker
+        try:
+            while breaker.state != health.CLOSED:
+                await asyncio.sleep(self._probe_interval, loop=self._loop)
+                breaker.half_open()
+                try:
+                    await asyncio.wait_for(
+                        self._send_probe(), self._probe_timeout,
+                        loop=self._loop)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.debug('Probe of %s failed: %r', self._url, e)
+                    breaker.open()
+                else:
+                    logger.info('Probe of %s succeeded, circuit closed',
+                                self._url)
+                    breaker.close()
+        finally:
+            self._probe_task = None
+
+    async def _send_probe(self):
+        conn = await self._pool.acquire(limit.PRIORITY_HIGH)
+        try:
+            resp = await conn.write(
+                request.RequestMessage(
+                    '', 'eval', {'gremlin': self._probe_script}),
+                priority=limit.PRIORITY_HIGH)
+            await resp.all()
+        finally:
+            conn.release()
 
     @classmethod
     async def open(cls, url, loop, **config):
@@ -0,0 +1,663 @@
+"""
+Websocket transport implemented directly on :py:class:`asyncio.Protocol`,
+with a minimal client side RFC 6455 framer and the permessage-deflate
+extension of RFC 7692.
+"""
+import asyncio
+import base64
+import collections
+import hashlib
+import os
+import ssl
+import struct
+import urllib.parse
+import zlib
+
+from aiogremlin import exception
+from aiogremlin.driver.aiohttp.transport import ByteCounters, Pings
+from gremlin_python.driver import transport
+
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xa
+
+CLOSE_NORMAL = 1000
+CLOSE_PROTOCOL_ERROR = 1002
+
+_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+_UINT16 = struct.Struct('!H')
+_UINT64 = struct.Struct('!Q')
+_HEADER = struct.Struct('!BB')
+_HEADER16 = struct.Struct('!BBH')
+_HEADER64 = struct.Struct('!BBQ')
+
+_CLOSED = object()
+
+# Compressed messages end with this sync flush marker, which is left out on
+# the wire, see RFC 7692 section 7.2.1
+_DEFLATE_TAIL = b'\x00\x00\xff\xff'
+
+# Stop reading the socket while this many bytes of frames wait to be read,
+# like aiohttp does
+_READ_LIMIT = 2 ** 16
+
+
+def build_frame(opcode, payload, mask=None, compressed=False):
+    """
+    Build a single, final client frame.
+
+    :param int opcode: Frame opcode
+    :param bytes payload: Unmasked payload
+    :param bytes mask: Optional 4 byte masking key, random by default
+    :param bool compressed: Whether the payload is compressed with
+        permessage-deflate, which sets the RSV1 bit
+    :returns: `tuple` of the header, including the masking key, and the
+        masked payload
+    """
+    length = len(payload)
+    first = 0x80 | opcode
+    if compressed:
+        first |= 0x40
+    if length < 126:
+        header = _HEADER.pack(first, 0x80 | length)
+    elif length < 0x10000:
+        header = _HEADER16.pack(first, 0x80 | 126, length)
+    else:
+        header = _HEADER64.pack(first, 0x80 | 127, length)
+    if mask is None:
+        mask = os.urandom(4)
+    return header + mask, apply_mask(mask, payload)
+
+
+def _apply_mask(mask, payload):
+    """XOR `payload` with the 4 byte `mask`, see RFC 6455 section 5.3"""
+    length = len(payload)
+    if not length:
+        return b''
+    # One big integer XOR runs in C instead of a Python loop over bytes
+    key = (mask * ((length + 3) // 4))[:length]
+    return (int.from_bytes(payload, 'little') ^
+            int.from_bytes(key, 'little')).to_bytes(length, 'little')
+
+
+try:
+    # aiohttp ships a compiled version, which is much faster for large
+    # payloads, but it's not part of its public API
+    from aiohttp.http_websocket import _websocket_mask
+except ImportError:
+    apply_mask = _apply_mask
+else:
+    def apply_mask(mask, payload):
+        """XOR `payload` with the 4 byte `mask`, see RFC 6455 section 5.3"""
+        payload = bytearray(payload)
+        _websocket_mask(mask, payload)
+        return payload
+
+
+class Deflate:
+    """
+    permessage-deflate state of one connection, see RFC 7692.
+
+    :param int level: zlib compression level
+    :param int window_bits: Window size the server accepts for compressed
+        client messages
+    :param bool no_context_takeover: Whether each client message must be
+        compressed on its own
+    """
+
+    def __init__(self, level, window_bits=zlib.MAX_WBITS,
+                 no_context_takeover=False):
+        self._level = level
+        self._window_bits = window_bits
+        self._no_context_takeover = no_context_takeover
+        self._compressor = None
+        # Server messages may use any window size up to the maximum
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    @property
+    def window_bits(self):
+        """Read-only property"""
+        return self._window_bits
+
+    @property
+    def can_compress(self):
+        """
+        Read-only property. zlib can't compress raw deflate streams with a
+        window of 8 bits, messages are sent uncompressed then.
+        """
+        return self._window_bits > 8
+
+    def compress(self, payload):
+        """
+        :param bytes payload: Message payload
+        :returns: Compressed payload
+        """
+        compressor = self._compressor
+        if compressor is None or self._no_context_takeover:
+            compressor = self._compressor = zlib.compressobj(
+                self._level, zlib.DEFLATED, -self._window_bits)
+        data = compressor.compress(payload) + compressor.flush(
+            zlib.Z_SYNC_FLUSH)
+        if data.endswith(_DEFLATE_TAIL):
+            data = data[:-len(_DEFLATE_TAIL)]
+        return data
+
+    def decompress(self, payload):
+        """
+        :param bytes payload: Compressed message payload
+        :returns: Message payload
+        """
+        try:
+            return self._decompressor.decompress(
+                bytes(payload) + _DEFLATE_TAIL)
+        except zlib.error as e:
+            raise exception.ClientError(
+                'Invalid compressed message: {}'.format(e))
+
+
+class FrameParser:
+    """
+    Incremental parser for the unmasked frames sent by a server.
+    Fragmented messages are reassembled, control frames are returned as
+    they arrive, even between the fragments of a message. The payload of a
+    frame that arrives in several chunks is joined straight from the chunks
+    once the frame is complete.
+
+    :param Deflate deflate: Optional permessage-deflate state, if the
+        extension was negotiated. Compressed messages are returned
+        decompressed
+    """
+
+    def __init__(self, deflate=None):
+        self._deflate = deflate
+        self._compressed = False
+        self._chunks = []
+        self._size = 0
+        self._needed = 2
+        # (first byte, payload start, payload end) of an incomplete frame,
+        # relative to the first chunk
+        self._pending = None
+        self._opcode = None
+        self._fragments = []
+
+    def feed(self, data):
+        """
+        Add received bytes.
+
+        :returns: `list` of `(opcode, payload)` tuples for each complete
+            message or control frame
+        """
+        chunks = self._chunks
+        chunks.append(data)
+        self._size += len(data)
+        if self._size < self._needed:
+            return []
+        messages = []
+        if self._pending is not None:
+            first, pos, end = self._pending
+            self._pending = None
+            payload, buf = _split_chunks(chunks, pos, end)
+            self._frame(first, payload, messages)
+        elif len(chunks) == 1:
+            buf = bytes(data)
+        else:
+            buf = b''.join(chunks)
+        size = len(buf)
+        offset = 0
+        needed = 2
+        while size - offset >= 2:
+            first = buf[offset]
+            length = buf[offset + 1]
+            pos = offset + 2
+            if length & 0x80:
+                raise exception.ClientError('Server sent a masked frame')
+            if first & 0x70 and not (
+                    first & 0x70 == 0x40 and self._deflate is not None and
+                    OP_CONTINUATION < first & 0x0f < OP_CLOSE):
+                raise exception.ClientError(
+                    'Server set reserved bits the negotiated extensions '
+                    "don't allow")
+            length &= 0x7f
+            if length == 126:
+                if size - pos < 2:
+                    needed = 4
+                    break
+                length = _UINT16.unpack_from(buf, pos)[0]
+                pos += 2
+            elif length == 127:
+                if size - pos < 8:
+                    needed = 10
+                    break
+                length = _UINT64.unpack_from(buf, pos)[0]
+                pos += 8
+            end = pos + length
+            if size < end:
+                needed = end - offset
+                self._pending = (first, pos - offset, end - offset)
+                break
+            self._frame(first, buf[pos:end], messages)
+            offset = end
+        rest = buf[offset:] if offset else buf
+        self._chunks = [rest] if rest else []
+        self._size = len(rest)
+        self._needed = needed
+        return messages
+
+    def _frame(self, first, payload, messages):
+        opcode = first & 0x0f
+        if opcode >= OP_CLOSE:
+            messages.append((opcode, payload))
+        elif opcode == OP_CONTINUATION:
+            if self._opcode is None:
+                raise exception.ClientError('Unexpected continuation frame')
+            self._fragments.append(payload)
+            if first & 0x80:
+                payload = b''.join(self._fragments)
+                if self._compressed:
+                    payload = self._deflate.decompress(payload)
+                messages.append((self._opcode, payload))
+                self._opcode = None
+                self._fragments = []
+        elif self._opcode is not None:
+            raise exception.ClientError(
+                'New message before the previous one was finished')
+        elif first & 0x80:
+            if first & 0x40:
+                payload = self._deflate.decompress(payload)
+            messages.append((opcode, payload))
+        else:
+            self._opcode = opcode
+            self._compressed = bool(first & 0x40)
+            self._fragments.append(payload)
+
+
+def _split_chunks(chunks, start, end):
+    # Join bytes start:end of the concatenated chunks and return them with
+    # the bytes that follow
+    parts = []
+    offset = 0
+    for chunk in chunks:
+        size = len(chunk)
+        if offset + size > start and offset < end:
+            parts.append(memoryview(chunk)[max(start - offset, 0):
+                                           min(end - offset, size)])
+        offset += size
+    last = chunks[-1]
+    rest = bytes(memoryview(last)[len(last) - (offset - end):])
+    return b''.join(parts), rest
+
+
+class _WebSocketProtocol(asyncio.Protocol):
+
+    def __init__(self, loop, byte_counters, compression_level=0,
+                 compression_min_size=0):
+        self._loop = loop
+        self._byte_counters = byte_counters
+        self._compression_level = compression_level
+        self._compression_min_size = compression_min_size
+        self._transport = None
+        self._key = None
+        self._handshake = loop.create_future()
+        self._header = bytearray()
+        self._deflate = None
+        self._parser = FrameParser()
+        self._messages = collections.deque()
+        self._buffered = 0
+        self._reading_paused = False
+        self._waiter = None
+        self._drain_waiters = collections.deque()
+        self._paused = False
+        self._exception = None
+        self._close_sent = False
+        self.pings = Pings(loop)
+        self.closed = False
+
+    @property
+    def deflate(self):
+        """The :py:class:`Deflate` state, `None` if not negotiated"""
+        return self._deflate
+
+    async def handshake(self, path, host):
+        self._key = base64.b64encode(os.urandom(16))
+        extensions = ''
+        if self._compression_level:
+            extensions = ('Sec-WebSocket-Extensions: permessage-deflate; '
+                          'client_max_window_bits\r\n')
+        request = ('GET {} HTTP/1.1\r\n'
+                   'Host: {}\r\n'
+                   'Upgrade: websocket\r\n'
+                   'Connection: Upgrade\r\n'
+                   'Sec-WebSocket-Key: {}\r\n'
+                   'Sec-WebSocket-Version: 13\r\n'
+                   '{}'
+                   '\r\n').format(path, host, self._key.decode(), extensions)
+        self._transport.write(request.encode('latin-1'))
+        try:
+            await self._handshake
+        except Exception:
+            self.closed = True
+            self._transport.close()
+            raise
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def data_received(self, data):
+        self._byte_counters.wire_bytes_received += len(data)
+        if not self._handshake.done():
+            header = self._header
+            header += data
+            end = header.find(b'\r\n\r\n')
+            if end < 0:
+                return
+            data = header[end + 4:]
+            self._header = None
+            # Frames may follow right away, so the extensions are set up
+            # before they are parsed
+            try:
+                headers = _check_handshake(bytes(header[:end]), self._key)
+                self._deflate = _negotiate_deflate(
+                    headers, self._compression_level)
+            except exception.ClientError as e:
+                self._handshake.set_exception(e)
+                return
+            if self._deflate is not None:
+                self._parser = FrameParser(self._deflate)
+            self._handshake.set_result(None)
+            if not data:
+                return
+        try:
+            for opcode, payload in self._parser.feed(data):
+                if opcode == OP_BINARY:
+                    self._put(payload)
+                elif opcode == OP_TEXT:
+                    self._put(payload.decode('utf-8'))
+                elif opcode == OP_PING:
+                    self.send(OP_PONG, payload)
+                elif opcode == OP_PONG:
+                    self.pings.pong(payload)
+                elif opcode == OP_CLOSE:
+                    self._put(_CLOSED)
+                    self.close()
+                    break
+        except (exception.ClientError, UnicodeDecodeError) as e:
+            self._fail(e)
+            self.close(CLOSE_PROTOCOL_ERROR)
+
+    def connection_lost(self, exc):
+        self.closed = True
+        if exc is None:
+            exc = RuntimeError("Connection closed by server")
+        self._fail(exc)
+        self._wake_drain(exc)
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        self._wake_drain()
+
+    def send(self, opcode, payload):
+        if self.closed:
+            raise RuntimeError("Connection closed")
+        header, payload = self._build_frame(opcode, payload)
+        self._byte_counters.wire_bytes_sent += len(header) + len(payload)
+        if len(payload) < 1024:
+            self._transport.write(header + payload)
+        else:
+            # Avoid copying large payloads just to prepend the header
+            self._transport.write(header)
+            self._transport.write(payload)
+
+    def send_many(self, opcode, payloads):
+        # One frame per payload, handed to the socket in a single write
+        if self.closed:
+            raise RuntimeError("Connection closed")
+        parts = []
+        for payload in payloads:
+            parts.extend(self._build_frame(opcode, payload))
+        self._byte_counters.wire_bytes_sent += sum(len(part) for part in parts)
+        self._transport.writelines(parts)
+
+    def _build_frame(self, opcode, payload):
+        # Data frames of at least `compression_min_size` bytes are
+        # compressed, each message is flagged on its own
+        deflate = self._deflate
+        if (deflate is not None and deflate.can_compress and
+                opcode < OP_CLOSE and
+                len(payload) >= self._compression_min_size):
+            return build_frame(
+                opcode, deflate.compress(payload), compressed=True)
+        return build_frame(opcode, payload)
+
+    async def drain(self):
+        if self._paused and not self.closed:
+            waiter = self._loop.create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    async def receive(self):
+        while not self._messages:
+            if self._exception is not None:
+                raise self._exception
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        message = self._messages.popleft()
+        if message is _CLOSED:
+            raise RuntimeError("Connection closed by server")
+        self._buffered -= len(message)
+        if self._reading_paused and self._buffered <= _READ_LIMIT:
+            self._reading_paused = False
+            self._transport.resume_reading()
+        return message
+
+    def close(self, code=CLOSE_NORMAL):
+        if self.closed:
+            return
+        if not self._close_sent:
+            self._close_sent = True
+            self.send(OP_CLOSE, _UINT16.pack(code))
+        self.closed = True
+        self._transport.close()
+
+    def _put(self, message):
+        self._messages.append(message)
+        if message is not _CLOSED:
+            self._buffered += len(message)
+            if (not self._reading_paused and not self.closed and
+                    self._buffered > _READ_LIMIT):
+                self._reading_paused = True
+                self._transport.pause_reading()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _fail(self, exc):
+        if self._exception is None:
+            self._exception = exc
+        if not self._handshake.done():
+            self._handshake.set_exception(exc)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _wake_drain(self, exc=None):
+        # Every writer waiting for the buffer to drain resumes, or fails if
+        # the connection was lost
+        waiters, self._drain_waiters = (
+            self._drain_waiters, collections.deque())
+        for waiter in waiters:
+            if not waiter.done():
+                if exc is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(exc)
+
+
+def _check_handshake(header, key):
+    lines = header.decode('latin-1').split('\r\n')
+    status = lines[0].split(' ', 2)
+    if len(status) < 2 or status[1] != '101':
+        raise exception.ClientError(
+            'Websocket handshake failed: {}'.format(lines[0]))
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    accept = base64.b64encode(hashlib.sha1(key + _GUID).digest()).decode()
+    if (headers.get('upgrade', '').lower() != 'websocket' or
+            headers.get('sec-websocket-accept') != accept):
+        raise exception.ClientError(
+            'Websocket handshake failed: invalid upgrade response')
+    return headers
+
+
+def _negotiate_deflate(headers, level):
+    # The Deflate state for the extensions the server accepted, if any
+    extensions = headers.get('sec-websocket-extensions')
+    if not extensions:
+        return None
+    params = [param.strip() for param in extensions.split(';')]
+    if (not level or ',' in extensions or
+            params[0].lower() != 'permessage-deflate'):
+        raise exception.ClientError(
+            'Server accepted extensions that were not offered: {}'.format(
+                extensions))
+    window_bits = zlib.MAX_WBITS
+    no_context_takeover = False
+    for param in params[1:]:
+        name, _, value = param.partition('=')
+        name = name.strip().lower()
+        value = value.strip().strip('"')
+        if name == 'client_max_window_bits':
+            if not value.isdigit() or not 8 <= int(value) <= 15:
+                raise exception.ClientError(
+                    'Invalid permessage-deflate parameter: {}'.format(param))
+            window_bits = int(value)
+        elif name == 'client_no_context_takeover':
+            no_context_takeover = True
+        elif name not in ('server_max_window_bits',
+                          'server_no_context_takeover'):
+            raise exception.ClientError(
+                'Invalid permessage-deflate parameter: {}'.format(param))
+    return Deflate(level, window_bits, no_context_takeover)
+
+
+class WebSocketTransport(transport.AbstractBaseTransport):
+    """
+    Websocket transport built directly on :py:class:`asyncio.Protocol`.
+    Unlike :py:class:`AiohttpTransport<aiogremlin.driver.aiohttp.transport.AiohttpTransport>`
+    it needs no client session per connection and parses frames with a
+    small framer that only implements what a Gremlin client needs.
+
+    :param asyncio.BaseEventLoop loop:
+    :param int compression_level: zlib level used to compress requests with
+        permessage-deflate if the server supports it, `0`, the default,
+        doesn't offer the extension
+    :param int compression_min_size: Requests smaller than this many bytes
+        are sent uncompressed
+    :param ByteCounters byte_counters: Optional counters to update, e.g.
+        shared by all connections to a host
+    :param aiohttp.ClientSession session: Ignored, this transport does not
+        use :py:mod:`aiohttp`
+    """
+
+    def __init__(self, loop, *, compression_level=0, compression_min_size=0,
+                 byte_counters=None, session=None):
+        self._loop = loop
+        self._compression_level = compression_level
+        self._compression_min_size = compression_min_size
+        if byte_counters is None:
+            byte_counters = ByteCounters()
+        self._byte_counters = byte_counters
+        self._protocol = None
+
+    @property
+    def byte_counters(self):
+        """Read-only property"""
+        return self._byte_counters
+
+    @property
+    def compress(self):
+        """
+        Read-only property. Negotiated deflate window bits, `0` if messages
+        are not compressed.
+        """
+        if self._protocol is None or self._protocol.deflate is None:
+            return 0
+        return self._protocol.deflate.window_bits
+
+    async def connect(self, url, *, ssl_context=None):
+        await self.close()
+        url = urllib.parse.urlsplit(url)
+        secure = url.scheme in ('wss', 'https')
+        if secure and ssl_context is None:
+            ssl_context = ssl.create_default_context()
+        port = url.port or (443 if secure else 80)
+        path = url.path or '/'
+        if url.query:
+            path += '?' + url.query
+        _, protocol = await self._loop.create_connection(
+            lambda: _WebSocketProtocol(
+                self._loop, self._byte_counters, self._compression_level,
+                self._compression_min_size),
+            url.hostname, port, ssl=ssl_context if secure else None)
+        await protocol.handshake(path, url.netloc)
+        self._protocol = protocol
+
+    async def write(self, message):
+        self._byte_counters.bytes_sent += len(message)
+        self._protocol.send(OP_BINARY, message)
+        await self._protocol.drain()
+
+    async def write_many(self, messages):
+        """
+        **coroutine** Write several messages, each as its own frame, with
+        one socket write.
+
+        :param list messages: `bytes` messages
+        """
+        self._byte_counters.bytes_sent += sum(len(m) for m in messages)
+        self._protocol.send_many(OP_BINARY, messages)
+        await self._protocol.drain()
+
+    async def read(self):
+        """
+        **coroutine** Read the next message.
+
+        :returns: `str` for text messages, `bytes` for binary messages
+        """
+        data = await self._protocol.receive()
+        self._byte_counters.bytes_received += len(data)
+        return data
+
+    async def ping(self):
+        """
+        **coroutine** Send a ping and wait for the pong.
+
+        :returns: Round trip time in seconds
+        """
+        pings = self._protocol.pings
+        payload, waiter = pings.new()
+        start = self._loop.time()
+        try:
+            self._protocol.send(OP_PING, payload)
+            await waiter
+        finally:
+            pings.discard(payload)
+        return self._loop.time() - start
+
+    async def close(self):
+        if self._protocol is not None:
+            self._protocol.close()
+
+    @property
+    def closed(self):
+        return self._protocol is None or self._protocol.closed
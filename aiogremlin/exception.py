@@ -32,3 +32,15 @@ class GremlinServerError(Exception):
 
 class ResponseTimeoutError(Exception):
     pass
+
+
+class ConnectionLostError(Exception):
+    pass
+
+
+class ConnectTimeoutError(Exception):
+    pass
+
+
+class SerializationError(Exception):
+    pass
@@ -1,4 +1,8 @@
-from aiogremlin.process.traversal import AsyncTraversalStrategies
+import inspect
+
+from aiogremlin.driver import columns
+from aiogremlin.process.traversal import (
+    AsyncTraversalStrategies, Parameter, PreparedBytecode, prepare_bytecode)
 from aiogremlin.remote.remote_connection import AsyncRemoteStrategy
 
 from gremlin_python.process import graph_traversal, traversal
@@ -35,6 +39,50 @@ class AsyncGraphTraversal(graph_traversal.GraphTraversal):
             results.add(result)
         return results
 
+    async def to_columns(self, unfold=True):
+        """
+        Return results as columns, see
+        :py:class:`ColumnBuilder<aiogremlin.driver.columns.ColumnBuilder>`.
+
+        :param bool unfold: Store single item lists as the item itself
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_columns()
+
+    async def to_numpy(self, unfold=True):
+        """
+        Return results as columns of `numpy` arrays.
+
+        :param bool unfold: Store single item lists as the item itself
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_numpy()
+
+    async def to_arrow(self, unfold=True):
+        """
+        Return results as a `pyarrow.Table`.
+
+        :param bool unfold: Store single item lists as the item itself
+        """
+        builder = await self._build_columns(unfold)
+        return builder.to_arrow()
+
+    async def _build_columns(self, unfold):
+        builder = columns.ColumnBuilder(unfold=unfold)
+        if self.traversers is None:
+            await self.traversal_strategies.apply_strategies(self)
+        if self.last_traverser is not None:
+            builder.add(self.last_traverser)
+            self.last_traverser = None
+        batches = getattr(self.traversers, 'batches', None)
+        if batches is not None:
+            async for batch in batches():
+                builder.extend(batch)
+        else:
+            async for traverser in self.traversers:
+                builder.add(traverser)
+        return builder
+
     async def iterate(self):
         """Iterate over results."""
         while True:
@@ -82,6 +130,30 @@ class AsyncGraphTraversalSource(graph_traversal.GraphTraversalSource):
         super().__init__(*args, **kwargs)
         self.graph_traversal = AsyncGraphTraversal
 
+    def prepare(self, func):
+        """
+        Prepare a traversal that is run many times with different values.
+        `func` is called once with this traversal source and one binding per
+        remaining parameter, and must return the traversal. Parameters can be
+        used anywhere a step argument is expected, including inside
+        predicates and collections::
+
+            >>> knows = g.prepare(lambda g, x: g.V(x).out('knows'))
+            >>> friends = await knows(1).toList()
+            >>> older = g.prepare(lambda g, x: g.V().has('age', P.gt(x)))
+
+        A :py:exc:`TypeError` is raised if a parameter is used anywhere else,
+        e.g. in a lambda, as its value could not be sent.
+
+        The message serializers shipped with :py:mod:`aiogremlin` serialize
+        the request once per prepared traversal and only patch the request id
+        and parameter values into the cached payload on later calls.
+
+        :param func: Function that builds the traversal
+        :returns: :py:class:`PreparedTraversal`
+        """
+        return PreparedTraversal(self, func)
+
     def withRemote(self, remote_connection):
         source = self.get_graph_traversal_source()
         source.traversal_strategies.add_strategies([AsyncRemoteStrategy(remote_connection)])
@@ -91,3 +163,47 @@ class AsyncGraphTraversalSource(graph_traversal.GraphTraversalSource):
         return self.__class__(
             self.graph, AsyncTraversalStrategies(self.traversal_strategies),
             traversal.Bytecode(self.bytecode))
+
+
+class PreparedTraversal:
+    """
+    Traversal with parameters, see
+    :py:meth:`AsyncGraphTraversalSource.prepare`. Call it with the parameter
+    values to get an :py:class:`AsyncGraphTraversal`.
+
+    :param AsyncGraphTraversalSource source: Traversal source
+    :param func: Function that builds the traversal
+    """
+
+    def __init__(self, source, func):
+        names = list(inspect.signature(func).parameters)[1:]
+        self._source = source
+        self._names = tuple(names)
+        self._bytecode = prepare_bytecode(
+            func(source, *[Parameter(name) for name in names]).bytecode,
+            names)
+
+    @property
+    def names(self):
+        """Read-only property. Parameter names"""
+        return self._names
+
+    @property
+    def bytecode(self):
+        """Read-only property. Bytecode with all parameters bound to `None`"""
+        return self._bytecode
+
+    def __call__(self, *args, **kwargs):
+        if len(args) > len(self._names):
+            raise TypeError('Expected at most {} arguments, got {}'.format(
+                len(self._names), len(args)))
+        values = dict(zip(self._names, args))
+        values.update(kwargs)
+        if len(values) != len(self._names) or not all(
+                name in values for name in self._names):
+            raise TypeError('Expected values for {}, got {}'.format(
+                ', '.join(self._names), ', '.join(values)))
+        source = self._source
+        return source.graph_traversal(
+            source.graph, source.traversal_strategies,
+            PreparedBytecode(self, values))
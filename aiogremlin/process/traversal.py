@@ -1,4 +1,5 @@
 import asyncio
+import copy
 
 from gremlin_python.process import traversal
 
@@ -10,3 +11,181 @@ class AsyncTraversalStrategies(traversal.TraversalStrategies):
             func = traversal_strategy.apply(traversal)
             if asyncio.iscoroutine(func):
                 await func
+
+
+class Parameter(tuple):
+    """
+    Stands in for a parameter of a
+    :py:class:`PreparedTraversal<aiogremlin.process.graph_traversal.PreparedTraversal>`
+    while its traversal is built. Step arguments turn it into a binding like
+    any ``(name, value)`` tuple, :py:func:`prepare_bytecode` binds the ones
+    left inside predicates.
+
+    :param str name: Parameter name
+    """
+
+    def __new__(cls, name):
+        return super().__new__(cls, (name, None))
+
+
+class PreparedBytecode(traversal.Bytecode):
+    """
+    Bytecode of a call to a
+    :py:class:`PreparedTraversal<aiogremlin.process.graph_traversal.PreparedTraversal>`.
+    Serializers that know about prepared traversals only use
+    :py:attr:`prepared` and :py:attr:`values`; the full bytecode is built
+    the first time it is accessed.
+
+    :param prepared: The prepared traversal
+    :param dict values: Parameter values by name
+    """
+
+    def __init__(self, prepared, values):
+        self._prepared = prepared
+        self._values = values
+        self._bytecode = None
+
+    @property
+    def prepared(self):
+        """
+        Read-only property. `None` once steps have been added to the
+        traversal, as it no longer matches the prepared one.
+        """
+        return self._prepared
+
+    @property
+    def values(self):
+        """Read-only property"""
+        return self._values
+
+    @property
+    def source_instructions(self):
+        return self._get_bytecode().source_instructions
+
+    @property
+    def step_instructions(self):
+        return self._get_bytecode().step_instructions
+
+    @property
+    def bindings(self):
+        return self._get_bytecode().bindings
+
+    def __eq__(self, other):
+        return self._get_bytecode() == other
+
+    def add_source(self, source_name, *args):
+        bytecode = self._get_bytecode()
+        self._prepared = None
+        bytecode.add_source(source_name, *args)
+
+    def add_step(self, step_name, *args):
+        bytecode = self._get_bytecode()
+        self._prepared = None
+        bytecode.add_step(step_name, *args)
+
+    def _get_bytecode(self):
+        if self._bytecode is None:
+            self._bytecode = bind_bytecode(
+                self._prepared.bytecode, self._values)
+        return self._bytecode
+
+
+def bind_bytecode(bytecode, values):
+    """
+    Copy `bytecode`, replacing the values of the bindings named in `values`.
+
+    :param bytecode: Bytecode with bindings
+    :param dict values: New binding values by name
+    :returns: `Bytecode<gremlin_python.process.traversal.Bytecode>`
+    """
+    new_bytecode = traversal.Bytecode()
+    new_bytecode.source_instructions = [
+        _bind_argument(instruction, values)
+        for instruction in bytecode.source_instructions]
+    new_bytecode.step_instructions = [
+        _bind_argument(instruction, values)
+        for instruction in bytecode.step_instructions]
+    new_bytecode.bindings = dict(bytecode.bindings)
+    for key in new_bytecode.bindings:
+        if key in values:
+            new_bytecode.bindings[key] = values[key]
+    return new_bytecode
+
+
+def prepare_bytecode(bytecode, names):
+    """
+    Copy `bytecode`, replacing each :py:class:`Parameter` with a binding,
+    including the ones inside predicates and nested traversals.
+
+    :param bytecode: Bytecode built with :py:class:`Parameter` arguments
+    :param names: Parameter names
+    :returns: `Bytecode<gremlin_python.process.traversal.Bytecode>`
+    :raises TypeError: if a parameter is not used where a binding can be
+        sent, e.g. inside a lambda
+    """
+    bindings = {}
+    new_bytecode = _prepare_argument(bytecode, bindings)
+    missing = [name for name in names if name not in bindings]
+    if missing:
+        raise TypeError(
+            'Parameters {} must be used as step arguments or predicate '
+            'values'.format(', '.join(missing)))
+    return new_bytecode
+
+
+def _prepare_argument(arg, bindings):
+    if isinstance(arg, Parameter):
+        bindings[arg[0]] = None
+        return traversal.Binding(arg[0], None)
+    elif isinstance(arg, traversal.Binding):
+        bindings[arg.key] = arg.value
+        return arg
+    elif isinstance(arg, traversal.Bytecode):
+        nested = {}
+        new_bytecode = traversal.Bytecode()
+        new_bytecode.source_instructions = [
+            _prepare_argument(instruction, nested)
+            for instruction in arg.source_instructions]
+        new_bytecode.step_instructions = [
+            _prepare_argument(instruction, nested)
+            for instruction in arg.step_instructions]
+        new_bytecode.bindings = dict(arg.bindings)
+        new_bytecode.bindings.update(nested)
+        bindings.update(new_bytecode.bindings)
+        return new_bytecode
+    elif isinstance(arg, traversal.P):
+        predicate = copy.copy(arg)
+        predicate.value = _prepare_argument(arg.value, bindings)
+        predicate.other = _prepare_argument(arg.other, bindings)
+        return predicate
+    elif isinstance(arg, list):
+        return [_prepare_argument(item, bindings) for item in arg]
+    elif isinstance(arg, dict):
+        return dict((_prepare_argument(key, bindings),
+                     _prepare_argument(item, bindings))
+                    for key, item in arg.items())
+    elif isinstance(arg, set):
+        return set(_prepare_argument(item, bindings) for item in arg)
+    return arg
+
+
+def _bind_argument(arg, values):
+    if isinstance(arg, traversal.Binding):
+        if arg.key in values:
+            return traversal.Binding(arg.key, values[arg.key])
+        return arg
+    elif isinstance(arg, traversal.Bytecode):
+        return bind_bytecode(arg, values)
+    elif isinstance(arg, traversal.P):
+        predicate = copy.copy(arg)
+        predicate.value = _bind_argument(arg.value, values)
+        predicate.other = _bind_argument(arg.other, values)
+        return predicate
+    elif isinstance(arg, list):
+        return [_bind_argument(item, values) for item in arg]
+    elif isinstance(arg, dict):
+        return dict((_bind_argument(key, values), _bind_argument(item, values))
+                    for key, item in arg.items())
+    elif isinstance(arg, set):
+        return set(_bind_argument(item, values) for item in arg)
+    return arg
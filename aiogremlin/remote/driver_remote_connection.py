@@ -1,8 +1,8 @@
 import asyncio
 from urllib.parse import urlparse
 
-from aiogremlin.driver.cluster import Cluster
-from gremlin_python.driver import serializer
+from aiogremlin.driver import serializer
+from aiogremlin.driver.cluster import Cluster, my_import
 from aiogremlin.remote.driver_remote_side_effects import (
     AsyncRemoteTraversalSideEffects)
 from gremlin_python.driver.remote_connection import RemoteTraversal
@@ -58,8 +58,10 @@ class DriverRemoteConnection:
         :param dict aliases: Optional mapping for aliases. Default is `None`.
             Also accepts `str` argument which will be assigned to `g`
         :param asyncio.BaseEventLoop loop:
-        :param graphson_reader: Custom graphson_reader
-        :param graphson_writer: Custom graphson_writer
+        :param graphson_reader: Custom graphson_reader, used with GraphSON
+            message serializers
+        :param graphson_writer: Custom graphson_writer, used with GraphSON
+            message serializers
         :param config: Optional cluster configuration passed as kwargs or `dict`
         """
         if url:
@@ -72,9 +74,16 @@ class DriverRemoteConnection:
             aliases = {'g': aliases}
         if not loop:
             loop = asyncio.get_event_loop()
-        message_serializer = serializer.GraphSONMessageSerializer(
-            reader=graphson_reader,
-            writer=graphson_writer)
+        message_serializer = config.get(
+            'message_serializer', serializer.GraphSONMessageSerializer)
+        if isinstance(message_serializer, str):
+            message_serializer = my_import(message_serializer)
+        if (isinstance(message_serializer, type) and issubclass(
+                message_serializer, serializer.GraphSONMessageSerializer)):
+            message_serializer = message_serializer(
+                reader=graphson_reader,
+                writer=graphson_writer,
+                json_backend=config.get('json_backend'))
         config.update({'message_serializer': message_serializer})
         cluster = await Cluster.open(loop, aliases=aliases, **config)
         client = await cluster.connect()
@@ -0,0 +1,634 @@
+"""Reader and writer for the GraphBinary 1.0 serialization format."""
+
+import calendar
+import collections
+import datetime
+import decimal
+import functools
+import struct
+import uuid
+
+import six
+from aenum import Enum
+
+from aiogremlin import exception
+from gremlin_python import statics
+from gremlin_python.process.traversal import (
+    Barrier, Binding, Bytecode, Cardinality, Column, Direction, Operator,
+    Order, P, Pick, Pop, Scope, T, Traversal, TraversalStrategy, Traverser)
+from gremlin_python.structure.graph import (
+    Edge, Path, Property, Vertex, VertexProperty)
+
+
+_byte = struct.Struct('>b')
+_short = struct.Struct('>h')
+_int = struct.Struct('>i')
+_long = struct.Struct('>q')
+_float = struct.Struct('>f')
+_double = struct.Struct('>d')
+
+_INT_MIN, _INT_MAX = -2 ** 31, 2 ** 31 - 1
+_LONG_MIN, _LONG_MAX = -2 ** 63, 2 ** 63 - 1
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+_VALUE = 0x00
+_NULL = 0x01
+
+# Predicates written with one argument per collection item
+_COLLECTION_PREDICATES = frozenset(['within', 'without'])
+
+
+class DataType:
+    """GraphBinary type codes"""
+    custom = 0x00
+    int = 0x01
+    long = 0x02
+    string = 0x03
+    date = 0x04
+    timestamp = 0x05
+    clazz = 0x06
+    double = 0x07
+    float = 0x08
+    list = 0x09
+    map = 0x0a
+    set = 0x0b
+    uuid = 0x0c
+    edge = 0x0d
+    path = 0x0e
+    property = 0x0f
+    graph = 0x10
+    vertex = 0x11
+    vertexproperty = 0x12
+    barrier = 0x13
+    binding = 0x14
+    bytecode = 0x15
+    cardinality = 0x16
+    column = 0x17
+    direction = 0x18
+    operator = 0x19
+    order = 0x1a
+    pick = 0x1b
+    pop = 0x1c
+    lambda_ = 0x1d
+    p = 0x1e
+    scope = 0x1f
+    t = 0x20
+    traverser = 0x21
+    bigdecimal = 0x22
+    biginteger = 0x23
+    byte = 0x24
+    bytebuffer = 0x25
+    short = 0x26
+    boolean = 0x27
+    textp = 0x28
+    traversalstrategy = 0x29
+    bulkset = 0x2a
+    tree = 0x2b
+    metrics = 0x2c
+    traversalmetrics = 0x2d
+    unspecified_null = 0xfe
+
+
+_ENUM_TYPES = {
+    DataType.barrier: Barrier,
+    DataType.cardinality: Cardinality,
+    DataType.column: Column,
+    DataType.direction: Direction,
+    DataType.operator: Operator,
+    DataType.order: Order,
+    DataType.pick: Pick,
+    DataType.pop: Pop,
+    DataType.scope: Scope,
+    DataType.t: T
+}
+
+_ENUM_CODES = dict((enum.__name__, code) for code, enum in _ENUM_TYPES.items())
+
+_STRATEGY_PACKAGES = {
+    'ConnectiveStrategy': 'process.traversal.strategy.decoration',
+    'ElementIdStrategy': 'process.traversal.strategy.decoration',
+    'HaltedTraverserStrategy': 'process.traversal.strategy.decoration',
+    'PartitionStrategy': 'process.traversal.strategy.decoration',
+    'SubgraphStrategy': 'process.traversal.strategy.decoration',
+    'VertexProgramStrategy': 'process.computer.traversal.strategy.decoration',
+    'MatchAlgorithmStrategy': 'process.traversal.strategy.finalization',
+    'GraphFilterStrategy': 'process.computer.traversal.strategy.optimization',
+    'LambdaRestrictionStrategy': 'process.traversal.strategy.verification',
+    'ReadOnlyStrategy': 'process.traversal.strategy.verification'
+}
+
+
+def _strategy_class_name(strategy):
+    name = strategy.strategy_name
+    package = _STRATEGY_PACKAGES.get(
+        name, 'process.traversal.strategy.optimization')
+    return 'org.apache.tinkerpop.gremlin.{}.{}'.format(package, name)
+
+
+class GraphBinaryReader:
+    """
+    Decodes GraphBinary values directly from a `bytes` or `memoryview`
+    buffer. All read methods take the buffer and an offset and return a
+    tuple of `(value, offset)`, where `offset` points just past the value.
+
+    :param dict deserializer_map: Optional mapping of type code to a function
+        with the signature `(reader, buf, offset)` used to override or extend
+        the default readers
+    """
+
+    def __init__(self, deserializer_map=None):
+        self._readers = {
+            DataType.int: self._read_int,
+            DataType.long: self._read_long,
+            DataType.string: self._read_string,
+            DataType.date: self._read_date,
+            DataType.timestamp: self._read_date,
+            DataType.clazz: self._read_string,
+            DataType.double: self._read_double,
+            DataType.float: self._read_float,
+            DataType.list: self._read_list,
+            DataType.map: self._read_map,
+            DataType.set: self._read_set,
+            DataType.uuid: self._read_uuid,
+            DataType.edge: self._read_edge,
+            DataType.path: self._read_path,
+            DataType.property: self._read_property,
+            DataType.vertex: self._read_vertex,
+            DataType.vertexproperty: self._read_vertex_property,
+            DataType.binding: self._read_binding,
+            DataType.p: self._read_p,
+            DataType.bytecode: self._read_bytecode,
+            DataType.traverser: self._read_traverser,
+            DataType.bigdecimal: self._read_bigdecimal,
+            DataType.biginteger: self._read_biginteger,
+            DataType.byte: self._read_byte,
+            DataType.bytebuffer: self._read_bytebuffer,
+            DataType.short: self._read_short,
+            DataType.boolean: self._read_boolean,
+            DataType.bulkset: self._read_bulkset
+        }
+        for type_code, enum in _ENUM_TYPES.items():
+            self._readers[type_code] = functools.partial(
+                self._read_enum, enum=enum)
+        self._deserializer_map = deserializer_map
+        if deserializer_map:
+            for type_code, func in deserializer_map.items():
+                self._readers[type_code] = (
+                    lambda buf, offset, func=func: func(self, buf, offset))
+
+    def __reduce__(self):
+        return (self.__class__, (self._deserializer_map,))
+
+    def read_object(self, buf, offset=0):
+        """Read a fully qualified value: `{type_code}{value_flag}{value}`"""
+        type_code = buf[offset]
+        if buf[offset + 1] & _NULL:
+            return None, offset + 2
+        return self.read_value(type_code, buf, offset + 2)
+
+    def read_value(self, type_code, buf, offset):
+        """Read a bare value of a known type"""
+        try:
+            reader = self._readers[type_code]
+        except KeyError:
+            raise exception.SerializationError(
+                'Unsupported GraphBinary type code: {:#04x}'.format(type_code))
+        return reader(buf, offset)
+
+    def read_nullable(self, type_code, buf, offset):
+        """Read a value that is only prefixed by its value flag"""
+        if buf[offset] & _NULL:
+            return None, offset + 1
+        return self.read_value(type_code, buf, offset + 1)
+
+    def iter_results(self, buf, offset):
+        """
+        Lazily iterate over a fully qualified result value. Collections
+        yield one decoded item at a time so that large frames are never
+        materialized as a whole; scalar results yield a single item.
+        """
+        type_code = buf[offset]
+        if buf[offset + 1] & _NULL:
+            return
+        offset += 2
+        if type_code in (DataType.list, DataType.set):
+            length = _int.unpack_from(buf, offset)[0]
+            offset += 4
+            for _ in range(length):
+                item, offset = self.read_object(buf, offset)
+                yield item
+        elif type_code == DataType.bulkset:
+            length = _int.unpack_from(buf, offset)[0]
+            offset += 4
+            for _ in range(length):
+                item, offset = self.read_object(buf, offset)
+                bulk = _long.unpack_from(buf, offset)[0]
+                offset += 8
+                for _ in range(bulk):
+                    yield item
+        else:
+            yield self.read_value(type_code, buf, offset)[0]
+
+    def _read_int(self, buf, offset):
+        return _int.unpack_from(buf, offset)[0], offset + 4
+
+    def _read_long(self, buf, offset):
+        return _long.unpack_from(buf, offset)[0], offset + 8
+
+    def _read_short(self, buf, offset):
+        return _short.unpack_from(buf, offset)[0], offset + 2
+
+    def _read_byte(self, buf, offset):
+        return _byte.unpack_from(buf, offset)[0], offset + 1
+
+    def _read_boolean(self, buf, offset):
+        return buf[offset] != 0, offset + 1
+
+    def _read_double(self, buf, offset):
+        return _double.unpack_from(buf, offset)[0], offset + 8
+
+    def _read_float(self, buf, offset):
+        return _float.unpack_from(buf, offset)[0], offset + 4
+
+    def _read_string(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        end = offset + length
+        return str(buf[offset:end], 'utf-8'), end
+
+    def _read_date(self, buf, offset):
+        millis = _long.unpack_from(buf, offset)[0]
+        return (_EPOCH + datetime.timedelta(milliseconds=millis),
+                offset + 8)
+
+    def _read_uuid(self, buf, offset):
+        end = offset + 16
+        return uuid.UUID(bytes=bytes(buf[offset:end])), end
+
+    def _read_biginteger(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        end = offset + length
+        return int.from_bytes(buf[offset:end], 'big', signed=True), end
+
+    def _read_bigdecimal(self, buf, offset):
+        scale = _int.unpack_from(buf, offset)[0]
+        unscaled, offset = self._read_biginteger(buf, offset + 4)
+        return decimal.Decimal(unscaled).scaleb(-scale), offset
+
+    def _read_bytebuffer(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        end = offset + length
+        return bytes(buf[offset:end]), end
+
+    def _read_list(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        results = []
+        for _ in range(length):
+            item, offset = self.read_object(buf, offset)
+            results.append(item)
+        return results, offset
+
+    def _read_set(self, buf, offset):
+        items, offset = self._read_list(buf, offset)
+        return set(items), offset
+
+    def _read_bulkset(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        results = []
+        for _ in range(length):
+            item, offset = self.read_object(buf, offset)
+            bulk = _long.unpack_from(buf, offset)[0]
+            offset += 8
+            results.extend([item] * bulk)
+        return results, offset
+
+    def _read_map(self, buf, offset):
+        length = _int.unpack_from(buf, offset)[0]
+        offset += 4
+        results = {}
+        for _ in range(length):
+            key, offset = self.read_object(buf, offset)
+            value, offset = self.read_object(buf, offset)
+            results[key] = value
+        return results, offset
+
+    def _read_vertex(self, buf, offset):
+        vid, offset = self.read_object(buf, offset)
+        label, offset = self._read_string(buf, offset)
+        _, offset = self.read_object(buf, offset)  # properties
+        return Vertex(vid, label), offset
+
+    def _read_edge(self, buf, offset):
+        eid, offset = self.read_object(buf, offset)
+        label, offset = self._read_string(buf, offset)
+        in_id, offset = self.read_object(buf, offset)
+        in_label, offset = self._read_string(buf, offset)
+        out_id, offset = self.read_object(buf, offset)
+        out_label, offset = self._read_string(buf, offset)
+        _, offset = self.read_object(buf, offset)  # parent
+        _, offset = self.read_object(buf, offset)  # properties
+        return Edge(eid, Vertex(out_id, out_label), label,
+                    Vertex(in_id, in_label)), offset
+
+    def _read_vertex_property(self, buf, offset):
+        vpid, offset = self.read_object(buf, offset)
+        label, offset = self._read_string(buf, offset)
+        value, offset = self.read_object(buf, offset)
+        _, offset = self.read_object(buf, offset)  # parent
+        _, offset = self.read_object(buf, offset)  # properties
+        return VertexProperty(vpid, label, value, None), offset
+
+    def _read_property(self, buf, offset):
+        key, offset = self._read_string(buf, offset)
+        value, offset = self.read_object(buf, offset)
+        _, offset = self.read_object(buf, offset)  # parent
+        return Property(key, value, None), offset
+
+    def _read_path(self, buf, offset):
+        labels, offset = self.read_object(buf, offset)
+        objects, offset = self.read_object(buf, offset)
+        return Path(labels, objects), offset
+
+    def _read_traverser(self, buf, offset):
+        bulk = _long.unpack_from(buf, offset)[0]
+        value, offset = self.read_object(buf, offset + 8)
+        return Traverser(value, bulk), offset
+
+    def _read_binding(self, buf, offset):
+        key, offset = self._read_string(buf, offset)
+        value, offset = self.read_object(buf, offset)
+        return Binding(key, value), offset
+
+    def _read_p(self, buf, offset):
+        operator, offset = self._read_string(buf, offset)
+        args, offset = self._read_list(buf, offset)
+        # Like gremlin_python, collection predicates get their arguments as
+        # one list
+        if operator in _COLLECTION_PREDICATES or len(args) > 2:
+            return P(operator, args), offset
+        return P(operator, *args), offset
+
+    def _read_enum(self, buf, offset, enum):
+        name, offset = self.read_object(buf, offset)
+        try:
+            return enum[name], offset
+        except KeyError:
+            return enum[name + '_'], offset
+
+    def _read_bytecode(self, buf, offset):
+        bytecode = Bytecode()
+        for instructions in (bytecode.step_instructions,
+                             bytecode.source_instructions):
+            length = _int.unpack_from(buf, offset)[0]
+            offset += 4
+            for _ in range(length):
+                name, offset = self._read_string(buf, offset)
+                instruction = [name]
+                num_args = _int.unpack_from(buf, offset)[0]
+                offset += 4
+                for _ in range(num_args):
+                    arg, offset = self.read_object(buf, offset)
+                    instruction.append(arg)
+                instructions.append(instruction)
+        return bytecode, offset
+
+
+class GraphBinaryWriter:
+    """
+    Encodes Python objects as GraphBinary into a `bytearray`.
+
+    :param dict serializer_map: Optional mapping of Python type to a function
+        with the signature `(writer, obj, buf)` that writes a fully qualified
+        value. Used to override or extend the default writers
+    """
+
+    def __init__(self, serializer_map=None):
+        # Order matters for the isinstance fallback: bool before int,
+        # statics.long before int.
+        self.serializers = collections.OrderedDict([
+            (type(None), GraphBinaryWriter._write_null),
+            (bool, GraphBinaryWriter._write_boolean),
+            (statics.LongType, GraphBinaryWriter._write_long),
+            (int, GraphBinaryWriter._write_int),
+            (float, GraphBinaryWriter._write_double),
+            (str, GraphBinaryWriter._write_string),
+            (uuid.UUID, GraphBinaryWriter._write_uuid),
+            (datetime.datetime, GraphBinaryWriter._write_date),
+            (bytes, GraphBinaryWriter._write_bytebuffer),
+            (bytearray, GraphBinaryWriter._write_bytebuffer),
+            (list, GraphBinaryWriter._write_list),
+            (tuple, GraphBinaryWriter._write_list),
+            (set, GraphBinaryWriter._write_set),
+            (dict, GraphBinaryWriter._write_map),
+            (Traversal, GraphBinaryWriter._write_bytecode),
+            (Bytecode, GraphBinaryWriter._write_bytecode),
+            (Traverser, GraphBinaryWriter._write_traverser),
+            (Binding, GraphBinaryWriter._write_binding),
+            (P, GraphBinaryWriter._write_p),
+            (Enum, GraphBinaryWriter._write_enum),
+            (TraversalStrategy, GraphBinaryWriter._write_strategy),
+            (statics.FunctionType, GraphBinaryWriter._write_lambda),
+            (Vertex, GraphBinaryWriter._write_vertex),
+            (Edge, GraphBinaryWriter._write_edge),
+            (VertexProperty, GraphBinaryWriter._write_vertex_property),
+            (Property, GraphBinaryWriter._write_property)
+        ])
+        if serializer_map:
+            self.serializers.update(serializer_map)
+
+    def writeObject(self, obj):
+        """Serialize an object to `bytes` as a fully qualified value"""
+        buf = bytearray()
+        self.write_object(obj, buf)
+        return bytes(buf)
+
+    def write_object(self, obj, buf):
+        """Append a fully qualified value to a `bytearray`"""
+        try:
+            serializer = self.serializers[type(obj)]
+        except KeyError:
+            for python_type, serializer in self.serializers.items():
+                if isinstance(obj, python_type):
+                    break
+            else:
+                raise exception.SerializationError(
+                    'Cannot serialize {} as GraphBinary'.format(type(obj)))
+        serializer(self, obj, buf)
+
+    def write_bare_string(self, value, buf):
+        value = value.encode('utf-8')
+        buf += _int.pack(len(value))
+        buf += value
+
+    def write_bare_map(self, value, buf):
+        buf += _int.pack(len(value))
+        for key, item in value.items():
+            self.write_object(key, buf)
+            self.write_object(item, buf)
+
+    def _write_null(self, obj, buf):
+        buf.append(DataType.unspecified_null)
+        buf.append(_NULL)
+
+    def _write_boolean(self, obj, buf):
+        buf += bytes((DataType.boolean, _VALUE, 1 if obj else 0))
+
+    def _write_int(self, obj, buf):
+        if _INT_MIN <= obj <= _INT_MAX:
+            buf += bytes((DataType.int, _VALUE))
+            buf += _int.pack(obj)
+        else:
+            self._write_long(obj, buf)
+
+    def _write_long(self, obj, buf):
+        if _LONG_MIN <= obj <= _LONG_MAX:
+            buf += bytes((DataType.long, _VALUE))
+            buf += _long.pack(obj)
+        else:
+            length = (obj.bit_length() + 8) // 8
+            buf += bytes((DataType.biginteger, _VALUE))
+            buf += _int.pack(length)
+            buf += obj.to_bytes(length, 'big', signed=True)
+
+    def _write_double(self, obj, buf):
+        buf += bytes((DataType.double, _VALUE))
+        buf += _double.pack(obj)
+
+    def _write_string(self, obj, buf):
+        buf += bytes((DataType.string, _VALUE))
+        self.write_bare_string(obj, buf)
+
+    def _write_uuid(self, obj, buf):
+        buf += bytes((DataType.uuid, _VALUE))
+        buf += obj.bytes
+
+    def _write_date(self, obj, buf):
+        millis = (calendar.timegm(obj.utctimetuple()) * 1000 +
+                  obj.microsecond // 1000)
+        buf += bytes((DataType.date, _VALUE))
+        buf += _long.pack(millis)
+
+    def _write_bytebuffer(self, obj, buf):
+        buf += bytes((DataType.bytebuffer, _VALUE))
+        buf += _int.pack(len(obj))
+        buf += obj
+
+    def _write_list(self, obj, buf, type_code=DataType.list):
+        buf += bytes((type_code, _VALUE))
+        buf += _int.pack(len(obj))
+        for item in obj:
+            self.write_object(item, buf)
+
+    def _write_set(self, obj, buf):
+        self._write_list(obj, buf, type_code=DataType.set)
+
+    def _write_map(self, obj, buf):
+        buf += bytes((DataType.map, _VALUE))
+        self.write_bare_map(obj, buf)
+
+    def _write_traverser(self, obj, buf):
+        buf += bytes((DataType.traverser, _VALUE))
+        buf += _long.pack(obj.bulk)
+        self.write_object(obj.object, buf)
+
+    def _write_instructions(self, instructions, buf):
+        buf += _int.pack(len(instructions))
+        for instruction in instructions:
+            self.write_bare_string(instruction[0], buf)
+            buf += _int.pack(len(instruction) - 1)
+            for arg in instruction[1:]:
+                self.write_object(arg, buf)
+
+    def _write_bytecode(self, obj, buf):
+        if isinstance(obj, Traversal):
+            obj = obj.bytecode
+        buf += bytes((DataType.bytecode, _VALUE))
+        self._write_instructions(obj.step_instructions, buf)
+        self._write_instructions(obj.source_instructions, buf)
+
+    def _write_binding(self, obj, buf):
+        buf += bytes((DataType.binding, _VALUE))
+        self.write_bare_string(obj.key, buf)
+        self.write_object(obj.value, buf)
+
+    def _write_p(self, obj, buf):
+        buf += bytes((DataType.p, _VALUE))
+        self.write_bare_string(obj.operator, buf)
+        if obj.other is not None:
+            args = [obj.value, obj.other]
+        elif (obj.operator in _COLLECTION_PREDICATES and
+                isinstance(obj.value, (list, set))):
+            args = list(obj.value)
+        else:
+            args = [obj.value]
+        buf += _int.pack(len(args))
+        for arg in args:
+            self.write_object(arg, buf)
+
+    def _write_enum(self, obj, buf):
+        try:
+            type_code = _ENUM_CODES[type(obj).__name__]
+        except KeyError:
+            raise exception.SerializationError(
+                'Cannot serialize {} as GraphBinary'.format(type(obj)))
+        buf += bytes((type_code, _VALUE))
+        self._write_string(obj.name.rstrip('_'), buf)
+
+    def _write_strategy(self, obj, buf):
+        buf += bytes((DataType.traversalstrategy, _VALUE))
+        self.write_bare_string(_strategy_class_name(obj), buf)
+        self.write_bare_map(obj.configuration, buf)
+
+    def _write_lambda(self, obj, buf):
+        lambda_result = obj()
+        if isinstance(lambda_result, str):
+            script = lambda_result
+            language = statics.default_lambda_language
+        else:
+            script, language = lambda_result
+        if language in ('gremlin-jython', 'gremlin-python'):
+            if not script.strip().startswith('lambda'):
+                script = 'lambda ' + script
+            arguments = six.get_function_code(eval(script)).co_argcount
+        else:
+            arguments = -1
+        buf += bytes((DataType.lambda_, _VALUE))
+        self.write_bare_string(language, buf)
+        self.write_bare_string(script, buf)
+        buf += _int.pack(arguments)
+
+    def _write_vertex(self, obj, buf):
+        buf += bytes((DataType.vertex, _VALUE))
+        self.write_object(obj.id, buf)
+        self.write_bare_string(obj.label, buf)
+        self._write_null(None, buf)
+
+    def _write_edge(self, obj, buf):
+        buf += bytes((DataType.edge, _VALUE))
+        self.write_object(obj.id, buf)
+        self.write_bare_string(obj.label, buf)
+        self.write_object(obj.inV.id, buf)
+        self.write_bare_string(obj.inV.label, buf)
+        self.write_object(obj.outV.id, buf)
+        self.write_bare_string(obj.outV.label, buf)
+        self._write_null(None, buf)
+        self._write_null(None, buf)
+
+    def _write_vertex_property(self, obj, buf):
+        buf += bytes((DataType.vertexproperty, _VALUE))
+        self.write_object(obj.id, buf)
+        self.write_bare_string(obj.label, buf)
+        self.write_object(obj.value, buf)
+        self._write_null(None, buf)
+        self._write_null(None, buf)
+
+    def _write_property(self, obj, buf):
+        buf += bytes((DataType.property, _VALUE))
+        self.write_bare_string(obj.key, buf)
+        self.write_object(obj.value, buf)
+        self._write_null(None, buf)
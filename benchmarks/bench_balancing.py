@@ -0,0 +1,116 @@
+"""
+Compare load balancing policies when one host is slow.
+
+    $ python benchmarks/bench_balancing.py [--requests 6000] [--workers 8]
+
+Three fake Gremlin Servers run in separate processes, on 127.0.0.1,
+127.0.0.2 and 127.0.0.3. Two answer after 1 ms, the third, like a host
+stalled by garbage collection, after 20 ms. Workers submit scripts
+through one cluster until `--requests` are done; the latency percentiles
+and the share of requests sent to the slow host are reported per policy.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+from aiohttp import web
+
+from aiogremlin import Cluster
+
+
+RESPONSE = ('{{"requestId": "{}", "status": {{"code": 200, "message": "", '
+            '"attributes": {{}}}}, "result": {{"meta": {{}}, "data": '
+            '{{"@type": "g:List", "@value": []}}}}}}')
+
+HOSTS = ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+
+POLICIES = ['RoundRobin', 'Weighted', 'PowerOfTwoChoices', 'LeastLatency']
+
+
+def serve(sock, delay):
+    async def respond(ws, request_id):
+        await asyncio.sleep(delay)
+        await ws.send_bytes(RESPONSE.format(request_id).encode('utf-8'))
+
+    async def gremlin(request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        async for msg in ws:
+            data = msg.data
+            request_id = json.loads(
+                data[data[0] + 1:].decode('utf-8'))['requestId']['@value']
+            asyncio.ensure_future(respond(ws, request_id))
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/gremlin', gremlin)
+    web.run_app(app, sock=sock, print=None)
+
+
+async def run(policy, port, requests, workers, loop):
+    cluster = await Cluster.open(
+        loop, hosts=HOSTS, port=port, min_conns=4, max_conns=4,
+        load_balancer='aiogremlin.driver.balancer.' + policy,
+        # The weights an operator would configure knowing the slow host
+        host_weights={HOSTS[2]: 0.1})
+    client = await cluster.connect()
+    remaining = [requests]
+    latencies = []
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            resp = await client.submit('1')
+            await resp.all()
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(workers)], loop=loop)
+        slow = cluster.hosts[2].stats.requests / requests
+    finally:
+        await cluster.close()
+    latencies.sort()
+    return [sum(latencies) / len(latencies)] + [
+        latencies[int(len(latencies) * q)] for q in (0.5, 0.9, 0.99)] + [slow]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=6000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    sock = socket.socket()
+    sock.bind((HOSTS[0], 0))
+    port = sock.getsockname()[1]
+    servers = []
+    for host, delay in zip(HOSTS, (0.001, 0.001, 0.02)):
+        if host != HOSTS[0]:
+            sock = socket.socket()
+            sock.bind((host, port))
+        server = multiprocessing.Process(
+            target=serve, args=(sock, delay), daemon=True)
+        server.start()
+        servers.append(server)
+    time.sleep(1)
+    loop = asyncio.get_event_loop()
+    print('{} requests, {} workers, hosts answering after 1, 1 and 20 '
+          'ms:'.format(args.requests, args.workers))
+    try:
+        for policy in POLICIES:
+            mean, p50, p90, p99, slow = loop.run_until_complete(run(
+                policy, port, args.requests, args.workers, loop))
+            print('  {:<18} mean {:5.1f} ms  p50 {:5.1f} ms  p90 {:5.1f} ms  '
+                  'p99 {:5.1f} ms  {:4.1f}% to the slow host'.format(
+                      policy, mean * 1e3, p50 * 1e3, p90 * 1e3, p99 * 1e3,
+                      slow * 100))
+    finally:
+        for server in servers:
+            server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Measure the effect of write coalescing on bursts of small requests.
+
+    $ python benchmarks/bench_coalescing.py [--requests 5000] [--concurrency 2000]
+
+A fake Gremlin Server runs in a separate process and answers every request
+with a single vertex id. The client submits `g.V(id)` lookups as bytecode,
+keeping `--concurrency` of them in flight on one connection, with and
+without `coalesce_writes`. Requests per second include the server's work,
+client CPU time per request only the client's.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+from aiohttp import web
+
+from aiogremlin.driver import connection
+from aiogremlin.driver.aiohttp.transport import AiohttpTransport
+from aiogremlin.driver.websocket.transport import WebSocketTransport
+from gremlin_python.driver import request
+from gremlin_python.process.graph_traversal import __
+
+
+RESPONSE = ('{{"requestId": "{}", "status": {{"code": 200, "message": "", '
+            '"attributes": {{}}}}, "result": {{"meta": {{}}, "data": '
+            '{{"@type": "g:List", "@value": [{{"@type": "g:Int64", '
+            '"@value": 1}}]}}}}}}')
+
+
+async def gremlin(request):
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    async for msg in ws:
+        data = msg.data
+        request_id = json.loads(
+            data[data[0] + 1:].decode('utf-8'))['requestId']['@value']
+        await ws.send_bytes(RESPONSE.format(request_id).encode('utf-8'))
+    return ws
+
+
+def serve(sock):
+    app = web.Application()
+    app.router.add_get('/gremlin', gremlin)
+    web.run_app(app, sock=sock, print=None)
+
+
+async def lookups(url, transport_class, coalesce, requests, concurrency,
+                  loop):
+    conn = await connection.Connection.open(
+        url, loop, transport_class=transport_class,
+        max_inflight=concurrency, coalesce_writes=coalesce)
+    semaphore = asyncio.Semaphore(concurrency, loop=loop)
+
+    async def lookup(i):
+        async with semaphore:
+            message = request.RequestMessage(
+                'traversal', 'bytecode',
+                {'gremlin': __.V(i).bytecode, 'aliases': {'g': 'g'}})
+            result_set = await conn.write(message)
+            await result_set.one()
+
+    try:
+        await asyncio.gather(*[lookup(i) for i in range(100)], loop=loop)
+        start = time.perf_counter()
+        cpu = time.process_time()
+        await asyncio.gather(*[lookup(i) for i in range(requests)],
+                             loop=loop)
+        return (time.perf_counter() - start, time.process_time() - cpu,
+                conn.write_buffer)
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=2000)
+    args = parser.parse_args()
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    url = 'ws://127.0.0.1:{}/gremlin'.format(sock.getsockname()[1])
+    server = multiprocessing.Process(target=serve, args=(sock,), daemon=True)
+    server.start()
+    time.sleep(1)
+    loop = asyncio.get_event_loop()
+    print('{} g.V(id) lookups, {} concurrent'.format(
+        args.requests, args.concurrency))
+    try:
+        for transport_class in (AiohttpTransport, WebSocketTransport):
+            for coalesce in (False, True):
+                seconds, cpu, write_buffer = min(
+                    (loop.run_until_complete(lookups(
+                        url, transport_class, coalesce, args.requests,
+                        args.concurrency, loop)) for _ in range(3)),
+                    key=lambda result: result[0])
+                line = ('  {:<18} coalesce={:<5} {:8.0f} requests/s '
+                        '{:6.1f} us client CPU/request'.format(
+                            transport_class.__name__, str(coalesce),
+                            args.requests / seconds,
+                            cpu / args.requests * 1e6))
+                if write_buffer is not None:
+                    line += ', {:.1f} requests/write'.format(
+                        write_buffer.messages / write_buffer.writes)
+                print(line)
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
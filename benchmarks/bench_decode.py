@@ -0,0 +1,83 @@
+"""
+Compare response frame decoding paths on large GraphSON frames.
+
+    $ python benchmarks/bench_decode.py [--items 64] [--frames 200]
+
+The "legacy" path is the original protocol implementation: decode the
+frame, parse it with `json`, deserialize the envelope, then deserialize
+every result item a second time.
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from aiogremlin.driver import serializer
+from gremlin_python.driver import serializer as graphson_serializer
+
+
+def value_map(i):
+    return {'@type': 'g:Map', '@value': [
+        'name', {'@type': 'g:List', '@value': ['person-{}'.format(i)]},
+        'age', {'@type': 'g:List', '@value': [
+            {'@type': 'g:Int32', '@value': i % 90}]},
+        'score', {'@type': 'g:List', '@value': [
+            {'@type': 'g:Double', '@value': i / 3.0}]},
+        'id', {'@type': 'g:Int64', '@value': i}]}
+
+
+def vertex(i):
+    return {'@type': 'g:Vertex', '@value': {
+        'id': {'@type': 'g:Int64', '@value': i}, 'label': 'person'}}
+
+
+def build_frame(make_item, items):
+    frame = {
+        'requestId': str(uuid.uuid4()),
+        'status': {'code': 206, 'message': '', 'attributes': {}},
+        'result': {'meta': {}, 'data': {
+            '@type': 'g:List',
+            '@value': [{'@type': 'g:Traverser', '@value': {
+                'bulk': {'@type': 'g:Int64', '@value': 1},
+                'value': make_item(i)}} for i in range(items)]}}}
+    return json.dumps(frame).encode('utf-8')
+
+
+def legacy_decode(message_serializer, data):
+    data = data.decode('utf-8')
+    message = message_serializer.deserialize_message(json.loads(data))
+    return [message_serializer.deserialize_message(result)
+            for result in message['result']['data']]
+
+
+def run(name, func, frames):
+    seconds = min(timeit.repeat(func, number=frames, repeat=3))
+    print('  {:<10} {:8.3f} ms/frame'.format(name, seconds / frames * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=64)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+    legacy = graphson_serializer.GraphSONMessageSerializer()
+    for label, make_item in (('valueMap', value_map), ('vertex', vertex)):
+        data = build_frame(make_item, args.items)
+        print('{} frame: {} items, {} bytes'.format(
+            label, args.items, len(data)))
+        run('legacy', lambda: legacy_decode(legacy, data), args.frames)
+        for backend in serializer.JSON_BACKENDS:
+            try:
+                message_serializer = serializer.GraphSONMessageSerializer(
+                    json_backend=backend)
+            except Exception:
+                print('  {:<10} not installed'.format(backend))
+                continue
+            run(backend,
+                lambda: list(message_serializer.deserialize_response(
+                    data).data),
+                args.frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure the cost of the transport/protocol boundary on large text frames.
+
+    $ python benchmarks/bench_read_path.py [--items 10000] [--frames 20]
+
+"copying" is the original read path: the transport encodes text frames to
+`bytes` and the protocol decodes them back to `str` before parsing. "direct"
+hands the `str` straight to the serializer.
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from aiogremlin.driver import serializer
+
+
+def build_frame(items):
+    return json.dumps({
+        'requestId': str(uuid.uuid4()),
+        'status': {'code': 206, 'message': '', 'attributes': {}},
+        'result': {'meta': {}, 'data': {'@type': 'g:List', '@value': [
+            {'@type': 'g:Map', '@value': [
+                'name', {'@type': 'g:List', '@value': ['person-{}'.format(i)]},
+                'id', {'@type': 'g:Int64', '@value': i}]}
+            for i in range(items)]}}})
+
+
+def copying(message_serializer, text):
+    data = text.strip().encode('utf-8')
+    return message_serializer.deserialize_response(
+        data.decode('utf-8'), lazy=True)
+
+
+def direct(message_serializer, text):
+    return message_serializer.deserialize_response(text, lazy=True)
+
+
+def run(name, func, frames):
+    seconds = min(timeit.repeat(func, number=frames, repeat=3))
+    print('  {:<18} {:8.3f} ms/frame'.format(name, seconds / frames * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+    text = build_frame(args.items)
+    print('text frame: {} items, {} bytes'.format(args.items, len(text)))
+    run('copies only', lambda: text.strip().encode('utf-8').decode('utf-8'),
+        args.frames)
+    for backend in serializer.JSON_BACKENDS:
+        try:
+            message_serializer = serializer.GraphSONMessageSerializer(
+                json_backend=backend)
+        except Exception:
+            print('  {:<18} not installed'.format(backend))
+            continue
+        # Lazy decoding only parses the frame, which isolates the copies
+        run(backend + ' copying',
+            lambda: copying(message_serializer, text), args.frames)
+        run(backend + ' direct',
+            lambda: direct(message_serializer, text), args.frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare how a full pool picks the connection to share under a mixed
+workload.
+
+    $ python benchmarks/bench_selection.py [--requests 4000] [--workers 48]
+
+A fake Gremlin Server runs in a separate process and answers the requests
+of each connection one at a time, so a slow request holds up the requests
+queued behind it on the same connection. Most requests take 1 ms, some
+take 25 ms. Workers submit requests through one pool until `--requests`
+are done, and the latency of the short ones is reported for the pool's
+least-loaded selection and for the rotation it replaced.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+
+from aiohttp import web
+
+from aiogremlin.driver import pool, provider, serializer
+from gremlin_python.driver import request
+
+
+RESPONSE = ('{{"requestId": "{}", "status": {{"code": 200, "message": "", '
+            '"attributes": {{}}}}, "result": {{"meta": {{}}, "data": '
+            '{{"@type": "g:List", "@value": []}}}}}}')
+
+
+async def gremlin(request):
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    async for msg in ws:
+        data = msg.data
+        message = json.loads(data[data[0] + 1:].decode('utf-8'))
+        await asyncio.sleep(float(message['args']['gremlin']) / 1000)
+        await ws.send_bytes(RESPONSE.format(
+            message['requestId']['@value']).encode('utf-8'))
+    return ws
+
+
+def serve(sock):
+    app = web.Application()
+    app.router.add_get('/gremlin', gremlin)
+    web.run_app(app, sock=sock, print=None)
+
+
+class RotatingPool(pool.ConnectionPool):
+    """Shares the next connection in rotation that can take one more"""
+
+    def _share(self, priority):
+        for _ in range(len(self._acquired)):
+            conn = self._acquired[0]
+            self._acquired.rotate(-1)
+            if (not conn.closed and
+                    conn.times_acquired < self._max_times_acquired):
+                return conn
+        return None
+
+
+async def run(pool_class, url, requests, workers, seed, loop):
+    conn_pool = pool_class(
+        url, loop, None, '', '', 4, 4, 64, 64, None,
+        serializer.GraphSONMessageSerializer(), provider.TinkerGraph)
+    await conn_pool.init_pool()
+    rand = random.Random(seed)
+    remaining = [requests]
+    latencies = []
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            slow = rand.random() < 0.1
+            message = request.RequestMessage(
+                '', 'eval', {'gremlin': '25' if slow else '1'})
+            start = time.perf_counter()
+            conn = await conn_pool.acquire()
+            try:
+                result_set = await conn.write(message)
+                await result_set.all()
+            finally:
+                conn.release()
+            if not slow:
+                latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(workers)], loop=loop)
+    finally:
+        await conn_pool.close()
+    latencies.sort()
+    return [latencies[int(len(latencies) * q)] for q in (0.5, 0.9, 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--workers', type=int, default=48)
+    args = parser.parse_args()
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    url = 'ws://127.0.0.1:{}/gremlin'.format(sock.getsockname()[1])
+    server = multiprocessing.Process(target=serve, args=(sock,), daemon=True)
+    server.start()
+    time.sleep(1)
+    loop = asyncio.get_event_loop()
+    print('{} requests, {} workers, 4 connections; short request '
+          'latency:'.format(args.requests, args.workers))
+    try:
+        for name, pool_class in (('rotation', RotatingPool),
+                                 ('least loaded', pool.ConnectionPool)):
+            p50, p90, p99 = loop.run_until_complete(run(
+                pool_class, url, args.requests, args.workers, 1, loop))
+            print('  {:<13} p50 {:6.1f} ms  p90 {:6.1f} ms  '
+                  'p99 {:6.1f} ms'.format(
+                      name, p50 * 1e3, p90 * 1e3, p99 * 1e3))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare the per-frame overhead of the websocket transports.
+
+    $ python benchmarks/bench_transport.py [--frames 5000] [--sizes 100,100000]
+
+An aiohttp echo server runs in a separate process, so the timings are
+dominated by the client side: writing a request frame, reading the echoed
+response and the event loop work in between. Frames are sent one at a
+time, like sequential requests on a single connection.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from aiohttp import web
+
+from aiogremlin.driver.aiohttp.transport import AiohttpTransport
+from aiogremlin.driver.websocket.transport import WebSocketTransport
+
+
+async def echo(request):
+    ws = web.WebSocketResponse(max_msg_size=0)
+    await ws.prepare(request)
+    async for msg in ws:
+        await ws.send_bytes(msg.data)
+    return ws
+
+
+def serve(sock):
+    app = web.Application()
+    app.router.add_get('/gremlin', echo)
+    web.run_app(app, sock=sock, print=None)
+
+
+async def round_trips(transport_class, url, message, frames, loop):
+    transport = transport_class(loop)
+    await transport.connect(url)
+    try:
+        for _ in range(10):
+            await transport.write(message)
+            await transport.read()
+        start = time.perf_counter()
+        for _ in range(frames):
+            await transport.write(message)
+            await transport.read()
+        return time.perf_counter() - start
+    finally:
+        await transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=5000)
+    parser.add_argument('--sizes', default='100,10000,1000000')
+    args = parser.parse_args()
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    url = 'ws://127.0.0.1:{}/gremlin'.format(sock.getsockname()[1])
+    server = multiprocessing.Process(target=serve, args=(sock,), daemon=True)
+    server.start()
+    time.sleep(1)
+    loop = asyncio.get_event_loop()
+    try:
+        for size in [int(size) for size in args.sizes.split(',')]:
+            message = b'x' * size
+            # Keep large frames from taking forever
+            frames = max(min(args.frames, 10 ** 9 // max(size, 1) // 10), 10)
+            print('{} byte frames, {} round trips'.format(size, frames))
+            for transport_class in (AiohttpTransport, WebSocketTransport):
+                seconds = min(
+                    loop.run_until_complete(round_trips(
+                        transport_class, url, message, frames, loop))
+                    for _ in range(3))
+                print('  {:<18} {:8.1f} us/round trip'.format(
+                    transport_class.__name__, seconds / frames * 1e6))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,8 +14,10 @@ setup(
     packages=['aiogremlin',
               'aiogremlin.driver',
               'aiogremlin.driver.aiohttp',
+              'aiogremlin.driver.websocket',
               'aiogremlin.process',
               'aiogremlin.structure',
+              'aiogremlin.structure.io',
               'aiogremlin.remote'],
     install_requires=[
         'aenum>=1.4.5',  # required gremlinpython dep
@@ -23,6 +25,10 @@ setup(
         'PyYAML>=3.12',
         'six>=1.10.0'  # required gremlinpython dep
     ],
+    extras_require={
+        'arrow': ['pyarrow'],
+        'numpy': ['numpy']
+    },
     test_suite='tests',
     setup_requires=['pytest-runner'],
     tests_require=['pytest-asyncio', 'pytest', 'mock'],
@@ -0,0 +1,113 @@
+"""Fake transport for testing connections and pools without a server."""
+import asyncio
+import json
+
+
+def request_id(message):
+    """Request id of a GraphSON request written by the serializer"""
+    request_id = json.loads(
+        message[message[0] + 1:].decode('utf-8'))['requestId']
+    if isinstance(request_id, dict):
+        request_id = request_id['@value']
+    return request_id
+
+
+def build_response(request_id, data, status_code=200):
+    return json.dumps({
+        'requestId': request_id,
+        'status': {'code': status_code, 'message': '', 'attributes': {}},
+        'result': {'meta': {}, 'data': {'@type': 'g:List', '@value': data}}
+    }).encode('utf-8')
+
+
+def transport_class(connect_errors=0):
+    """
+    Create a fake transport class that records its instances. The next
+    `connect_errors` connects fail, the count can be changed on the class,
+    and each connect takes `connect_delay` seconds.
+    """
+
+    class FakeTransport:
+
+        instances = []
+        connects = 0
+        connect_errors = 0
+        connect_delay = 0
+        connecting = 0
+        max_connecting = 0
+
+        def __init__(self, loop, **kwargs):
+            self._loop = loop
+            self._frames = asyncio.Queue(loop=loop)
+            self.written = []
+            self.batches = []
+            self.write_error = None
+            self.pong_delay = 0
+            self.closed = True
+            self.instances.append(self)
+
+        async def connect(self, url, *, ssl_context=None):
+            cls = type(self)
+            cls.connects += 1
+            # Hosts named "down" never answer
+            if '://down' in url:
+                await self._loop.create_future()
+            if cls.connect_delay:
+                cls.connecting += 1
+                cls.max_connecting = max(cls.max_connecting, cls.connecting)
+                try:
+                    await asyncio.sleep(cls.connect_delay, loop=self._loop)
+                finally:
+                    cls.connecting -= 1
+            if cls.connect_errors:
+                cls.connect_errors -= 1
+                raise OSError('Connection refused')
+            self.closed = False
+
+        async def write(self, message):
+            if self.write_error is not None:
+                raise self.write_error
+            if self.closed:
+                raise RuntimeError('Connection closed')
+            self.written.append(message)
+
+        async def write_many(self, messages):
+            await self.write(messages[0])
+            self.written.extend(messages[1:])
+            self.batches.append(len(messages))
+
+        async def read(self):
+            frame = await self._frames.get()
+            if isinstance(frame, Exception):
+                raise frame
+            return frame
+
+        async def ping(self):
+            # A `pong_delay` of `None` never answers
+            if self.pong_delay is None:
+                await self._loop.create_future()
+            await asyncio.sleep(self.pong_delay, loop=self._loop)
+            return self.pong_delay
+
+        async def close(self):
+            self.closed = True
+
+        @property
+        def unread(self):
+            """Number of frames fed but not read yet"""
+            return self._frames.qsize()
+
+        def feed(self, frame):
+            self._frames.put_nowait(frame)
+
+        def respond(self, data, status_code=200, message=-1):
+            """Answer the `message`-th request written so far"""
+            self.feed(build_response(
+                request_id(self.written[message]), data, status_code))
+
+        def fail(self, exc=None):
+            self.closed = True
+            self.feed(exc or ConnectionResetError('Connection reset'))
+
+    FakeTransport.connect_errors = connect_errors
+    return FakeTransport
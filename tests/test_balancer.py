@@ -0,0 +1,185 @@
+import asyncio
+import collections
+import random
+
+import pytest
+
+from aiogremlin.driver import balancer
+from aiogremlin.driver.cluster import Cluster
+from gremlin_python.driver import request
+
+import fakes
+
+
+class FakeLoop:
+
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        return self.now
+
+
+class FakeHost:
+
+    def __init__(self, url, loop, weight=1):
+        self.url = url
+        self.weight = weight
+        self.stats = balancer.HostStats(loop)
+
+
+@pytest.fixture
+def loop():
+    return FakeLoop()
+
+
+def counts(policy, hosts, n):
+    return collections.Counter(policy.select(hosts).url for _ in range(n))
+
+
+def test_host_stats(loop):
+    stats = balancer.HostStats(loop, smoothing=0.5, decay=10)
+    assert stats.latency is None
+    stats.started()
+    stats.waiting += 1
+    assert stats.outstanding == 2
+    stats.finished(0.1, 200)
+    assert stats.latency == 0.1
+    # Slower responses count right away, faster ones gradually
+    stats.started()
+    stats.finished(0.3, 200)
+    assert stats.latency == pytest.approx(0.3)
+    stats.started()
+    stats.finished(0.1, 500)
+    assert stats.latency == pytest.approx(0.2)
+    stats.started()
+    stats.finished()
+    assert stats.requests == 4
+    assert stats.errors == 2
+    assert stats.outstanding == 1
+    loop.now = 10
+    assert stats.latency == pytest.approx(0.2 / 2.718281828)
+
+
+def test_round_robin(loop):
+    hosts = [FakeHost(url, loop) for url in 'abc']
+    assert counts(balancer.RoundRobin(), hosts, 30) == {
+        'a': 10, 'b': 10, 'c': 10}
+
+
+def test_weighted(loop):
+    hosts = [FakeHost('a', loop, 3), FakeHost('b', loop, 1),
+             FakeHost('c', loop, 0)]
+    policy = balancer.Weighted()
+    order = ''.join(policy.select(hosts).url for _ in range(8))
+    assert collections.Counter(order) == {'a': 6, 'b': 2}
+    # Spread out instead of bunched up
+    assert 'b' in order[:4] and 'b' in order[4:]
+    hosts[0].weight = hosts[1].weight = 0
+    assert counts(policy, hosts, 6) == {'a': 2, 'b': 2, 'c': 2}
+
+
+def test_least_latency(loop):
+    hosts = [FakeHost(url, loop) for url in 'abc']
+    policy = balancer.LeastLatency()
+    # Hosts without responses are tried in turn
+    assert [policy.select(hosts).url for _ in range(3)] == ['a', 'b', 'c']
+    for host, latency in zip(hosts, (0.01, 0.002, 0.005)):
+        host.stats.started()
+        host.stats.finished(latency)
+    assert counts(policy, hosts, 5) == {'b': 5}
+    # Outstanding requests add up
+    for _ in range(2):
+        hosts[1].stats.started()
+    assert policy.select(hosts).url == 'c'
+    # A slow host is tried again once its estimate decayed
+    hosts[1].stats.finished(0.002)
+    hosts[1].stats.finished(0.002)
+    hosts[1].stats.started()
+    hosts[1].stats.finished(1.0)
+    hosts[2].stats.started()
+    hosts[2].stats.finished(1.0)
+    assert policy.select(hosts).url == 'a'
+    loop.now = 60
+    hosts[0].stats.started()
+    hosts[0].stats.finished(0.01)
+    assert policy.select(hosts).url in ('b', 'c')
+
+
+def test_least_latency_cold_host(loop):
+    hosts = [FakeHost(url, loop) for url in 'abc']
+    policy = balancer.LeastLatency()
+    for host, latency in zip(hosts, (0.01, 0.02)):
+        host.stats.started()
+        host.stats.finished(latency)
+    # A host without responses counts as average, not free
+    for _ in range(3):
+        hosts[2].stats.started()
+    assert counts(policy, hosts, 4) == {'a': 4}
+    # Without any responses, outstanding requests decide
+    hosts = [FakeHost(url, loop) for url in 'ab']
+    hosts[0].stats.started()
+    assert counts(policy, hosts, 3) == {'b': 3}
+
+
+def test_power_of_two_choices(loop):
+    hosts = [FakeHost(url, loop) for url in 'ab']
+    policy = balancer.PowerOfTwoChoices(random.Random(1))
+    hosts[0].stats.started()
+    assert counts(policy, hosts, 10) == {'b': 10}
+    hosts[1].stats.started()
+    hosts[0].stats.finished(0.1)
+    hosts[1].stats.finished(0.2)
+    assert counts(policy, hosts, 10) == {'a': 10}
+    hosts = [FakeHost(url, loop) for url in 'abcd']
+    hosts[0].stats.inflight = 10
+    assert counts(policy, hosts, 100)['a'] == 0
+    assert policy.select(hosts[:1]) is hosts[0]
+
+
+@pytest.mark.asyncio
+async def test_cluster_round_robin_concurrent(event_loop):
+    transport_class = fakes.transport_class()
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], min_conns=1, max_conns=1,
+        max_times_acquired=1, transport=transport_class)
+    assert isinstance(cluster.load_balancer, balancer.RoundRobin)
+    first = [await cluster.get_connection() for _ in range(2)]
+    # Both hosts are busy, waiters are still spread evenly
+    waiters = [event_loop.create_task(cluster.get_connection())
+               for _ in range(4)]
+    await asyncio.sleep(0.01, loop=event_loop)
+    assert [host.stats.waiting for host in cluster.hosts] == [2, 2]
+    for conn in first:
+        conn.release()
+    await asyncio.sleep(0.01, loop=event_loop)
+    done = [waiter for waiter in waiters if waiter.done()]
+    assert len(done) == 2
+    for waiter in done:
+        waiter.result().release()
+    await asyncio.gather(*waiters, loop=event_loop)
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_cluster_stats(event_loop):
+    transport_class = fakes.transport_class()
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], transport=transport_class,
+        load_balancer='aiogremlin.driver.balancer.Weighted',
+        host_weights={'a': 2})
+    assert [host.weight for host in cluster.hosts] == [2, 1]
+    host = cluster.hosts[0]
+    conn = await cluster.get_connection()
+    assert host.stats.waiting == 0
+    resp = await conn.write(
+        request.RequestMessage('', 'eval', {'gremlin': '1'}))
+    assert host.stats.inflight == 1
+    conn._conn._transport.respond([1])
+    assert await resp.all() == [1]
+    await asyncio.sleep(0, loop=event_loop)
+    assert host.stats.inflight == 0
+    assert host.stats.requests == 1
+    assert host.stats.latency is not None
+    conn.release()
+    await cluster.close()
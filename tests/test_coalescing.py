@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import connection
+
+import fakes
+from test_failover import eval_message
+
+
+def open_connection(loop, **kwargs):
+    return connection.Connection.open(
+        'ws://fake', loop, transport_class=fakes.transport_class(),
+        coalesce_writes=True, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_coalesce_writes(event_loop):
+    conn = await open_connection(event_loop)
+    transport = conn._transport
+    results = await asyncio.gather(
+        *[conn.write(eval_message(str(i))) for i in range(5)],
+        loop=event_loop)
+    assert transport.batches == [5]
+    assert (conn.write_buffer.writes, conn.write_buffer.messages) == (1, 5)
+    for i, result_set in enumerate(results):
+        transport.respond([i], message=i)
+    assert [await result_set.all() for result_set in results] == [
+        [i] for i in range(5)]
+    await conn.write(eval_message())
+    assert transport.batches == [5, 1]
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_max_bytes(event_loop):
+    conn = await open_connection(event_loop, coalesce_max_bytes=1)
+    await asyncio.gather(*[conn.write(eval_message()) for i in range(3)],
+                         loop=event_loop)
+    assert conn._transport.batches == [1, 1, 1]
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_max_delay(event_loop):
+    conn = await open_connection(event_loop, coalesce_max_delay=0.02)
+    first = event_loop.create_task(conn.write(eval_message()))
+    await asyncio.sleep(0.01, loop=event_loop)
+    await conn.write(eval_message())
+    await first
+    assert conn._transport.batches == [2]
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_cancel_one_writer(event_loop):
+    conn = await open_connection(event_loop)
+    writers = [event_loop.create_task(conn.write(eval_message(str(i))))
+               for i in range(3)]
+    await asyncio.sleep(0, loop=event_loop)
+    writers[1].cancel()
+    results = await asyncio.gather(
+        *writers, loop=event_loop, return_exceptions=True)
+    assert isinstance(results[1], asyncio.CancelledError)
+    # The other writers of the batch still get their result sets
+    for i in (0, 2):
+        conn._transport.respond([i], message=i)
+        assert await results[i].all() == [i]
+    assert conn._transport.batches == [3]
+    assert conn.healthy
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_write_error(event_loop):
+    conn = await open_connection(event_loop)
+    conn._transport.write_error = BrokenPipeError()
+    results = await asyncio.gather(
+        *[conn.write(eval_message()) for i in range(3)],
+        loop=event_loop, return_exceptions=True)
+    assert all(isinstance(result, exception.ConnectionLostError)
+               for result in results)
+    assert not conn.healthy
+
+
+@pytest.mark.asyncio
+async def test_close_fails_buffered(event_loop):
+    conn = await open_connection(event_loop, coalesce_max_delay=10)
+    pending = event_loop.create_task(conn.write(eval_message()))
+    await asyncio.sleep(0, loop=event_loop)
+    await conn.close()
+    with pytest.raises(exception.ConnectionLostError):
+        await pending
+    assert conn._transport.written == []
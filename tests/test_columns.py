@@ -0,0 +1,105 @@
+import array
+
+import pytest
+
+from aiogremlin.driver import columns, resultset
+from gremlin_python.process.traversal import T, Traverser
+from gremlin_python.structure.graph import Vertex
+
+
+ROWS = [
+    {'name': ['marko'], 'age': [29], 'score': [1.5]},
+    {'name': ['vadas'], 'age': [27], 'score': [0.5], 'active': [True]},
+    {'name': ['lop'], 'age': [2 ** 70], 'score': [2.0]}]
+
+
+@pytest.fixture
+def builder():
+    builder = columns.ColumnBuilder()
+    builder.extend(ROWS)
+    return builder
+
+
+def test_to_columns(builder):
+    result = builder.to_columns()
+    assert list(result) == ['name', 'age', 'score', 'active']
+    assert result['name'] == ['marko', 'vadas', 'lop']
+    assert result['age'] == [29, 27, 2 ** 70]
+    assert result['score'] == array.array('d', [1.5, 0.5, 2.0])
+    assert result['active'] == [None, True, None]
+    assert len(builder) == 3
+
+
+def test_scalars_and_traversers():
+    builder = columns.ColumnBuilder(unfold=False)
+    builder.extend([Traverser(1, 2), Traverser(3, 1)])
+    builder.add({T.id: 1, 'names': ['a']})
+    result = builder.to_columns()
+    assert result[columns.VALUE_COLUMN] == [1, 1, 3, None]
+    assert result[T.id] == [None, None, None, 1]
+    assert result['names'] == [None, None, None, ['a']]
+
+
+def test_typed_columns():
+    builder = columns.ColumnBuilder()
+    builder.extend([{'n': 1, 'x': 1.5, 'flag': True, 'mixed': 1},
+                    {'n': 2, 'x': 2.5, 'flag': False, 'mixed': 2.5},
+                    {'n': 3, 'x': None, 'flag': True, 'mixed': 'a'}])
+    result = builder.to_columns()
+    assert result['n'] == array.array('q', [1, 2, 3])
+    # Columns fall back to lists once a value doesn't fit the array
+    assert result['x'] == [1.5, 2.5, None]
+    assert result['flag'] == array.array('b', [1, 0, 1])
+    assert builder._columns['flag'].tolist() == [True, False, True]
+    assert result['mixed'] == [1, 2.5, 'a']
+
+
+def test_list_values():
+    # valueMap without unfolding, each property is a one item list
+    builder = columns.ColumnBuilder(unfold=False)
+    builder.extend(ROWS[:2])
+    result = builder.to_columns()
+    assert result['name'] == [['marko'], ['vadas']]
+    assert result['age'] == [[29], [27]]
+    assert result['active'] == [None, [True]]
+
+
+def test_to_numpy_list_values():
+    numpy = pytest.importorskip('numpy')
+    builder = columns.ColumnBuilder(unfold=False)
+    builder.extend(ROWS[:2])
+    result = builder.to_numpy()
+    assert result['name'].dtype == object
+    assert result['name'].shape == (2,)
+    assert result['name'].tolist() == [['marko'], ['vadas']]
+
+
+def test_to_numpy(builder):
+    numpy = pytest.importorskip('numpy')
+    builder.add({'score': [3.0]})
+    result = builder.to_numpy()
+    assert result['score'].dtype == numpy.float64
+    assert result['score'].tolist() == [1.5, 0.5, 2.0, 3.0]
+    assert result['age'].dtype == object
+
+
+def test_to_arrow():
+    pyarrow = pytest.importorskip('pyarrow')
+    builder = columns.ColumnBuilder()
+    builder.extend([{T.label: ['person'], 'age': [29], 'active': [True]},
+                    {T.label: ['person'], 'age': [27], 'active': [False]}])
+    table = builder.to_arrow()
+    assert table.column_names == ['label', 'age', 'active']
+    assert table.column('age').type == pyarrow.int64()
+    assert table.to_pydict() == {'label': ['person', 'person'],
+                                 'age': [29, 27], 'active': [True, False]}
+
+
+@pytest.mark.asyncio
+async def test_result_set_to_columns(event_loop):
+    result_set = resultset.ResultSet('id', None, event_loop)
+    result_set.queue_batch(206, [Traverser(Vertex(1), 1)], '')
+    result_set.queue_batch(200, [Traverser(Vertex(2), 1)], '')
+    result_set.queue_result(None)
+    result = await result_set.to_columns()
+    assert result[columns.VALUE_COLUMN] == [Vertex(1), Vertex(2)]
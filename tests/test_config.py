@@ -19,6 +19,7 @@ import os
 import pytest
 
 from aiogremlin import driver, exception
+from aiogremlin.driver.websocket.transport import WebSocketTransport
 from gremlin_python.driver import serializer
 
 import config_module
@@ -47,6 +48,13 @@ def test_cluster_default_config(event_loop):
     assert cluster.config['password'] == ''
 
 
+def test_cluster_transport_config(event_loop):
+    cluster = driver.Cluster(
+        event_loop,
+        transport='aiogremlin.driver.websocket.transport.WebSocketTransport')
+    assert cluster.config['transport'] is WebSocketTransport
+
+
 def test_cluster_custom_config(event_loop, cluster_class):
     cluster = cluster_class(event_loop, username='dave', password='mypass',
                             hosts=['127.0.0.1'])
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import connection, pool, provider, serializer
+from gremlin_python.driver import request
+
+import fakes
+
+
+def eval_message(gremlin='1'):
+    return request.RequestMessage('', 'eval', {'gremlin': gremlin})
+
+
+@pytest.fixture
+def lost():
+    return []
+
+
+@pytest.fixture
+def conn(request, event_loop, lost):
+    conn = event_loop.run_until_complete(connection.Connection.open(
+        'ws://fake', event_loop, transport_class=fakes.transport_class(),
+        on_lost=lambda conn, error: lost.append(error)))
+    request.addfinalizer(lambda: event_loop.run_until_complete(conn.close()))
+    return conn
+
+
+def make_pool(loop, transport_class, min_conns=1, **kwargs):
+    return pool.ConnectionPool(
+        'ws://fake', loop, None, '', '', 4, min_conns, 16, 64, None,
+        serializer.GraphSONMessageSerializer(), provider.TinkerGraph,
+        transport_class=transport_class, reconnect_delay=0.01, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_read_error_fails_pending(conn, lost):
+    transport = conn._transport
+    first = await conn.write(eval_message())
+    second = await conn.write(eval_message())
+    transport.respond([1], status_code=206, message=0)
+    transport.fail()
+    # Results received before the failure are still delivered
+    assert await first.one() == 1
+    with pytest.raises(exception.ConnectionLostError):
+        await first.one()
+    with pytest.raises(exception.ConnectionLostError):
+        await second.all()
+    assert lost and isinstance(lost[0], exception.ConnectionLostError)
+    assert conn.closed
+    assert not conn.healthy
+    with pytest.raises(exception.ConnectionLostError):
+        await conn.write(eval_message())
+
+
+@pytest.mark.asyncio
+async def test_write_error(conn, lost):
+    pending = await conn.write(eval_message())
+    conn._transport.write_error = BrokenPipeError()
+    with pytest.raises(exception.ConnectionLostError):
+        await conn.write(eval_message())
+    with pytest.raises(exception.ConnectionLostError):
+        await pending.all()
+    assert len(lost) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_write(event_loop, conn, lost):
+    written = event_loop.create_future()
+
+    async def write(message):
+        await written
+
+    conn._transport.write = write
+    writer = event_loop.create_task(conn.write(eval_message()))
+    await asyncio.sleep(0, loop=event_loop)
+    writer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await writer
+    # Giving up on a write doesn't cost the connection
+    assert conn.healthy
+    assert not lost
+
+
+@pytest.mark.asyncio
+async def test_close_fails_pending(event_loop):
+    conn = await connection.Connection.open(
+        'ws://fake', event_loop, transport_class=fakes.transport_class())
+    pending = await conn.write(eval_message())
+    await conn.close()
+    with pytest.raises(exception.ConnectionLostError):
+        await pending.all()
+
+
+@pytest.mark.asyncio
+async def test_pool_reconnects(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class)
+    await conn_pool.init_pool()
+    conn = await conn_pool.acquire()
+    transport_class.instances[0].fail()
+    await asyncio.sleep(0.05, loop=event_loop)
+    assert not conn.healthy
+    assert len(transport_class.instances) == 2
+    conn.release()
+    replacement = await conn_pool.acquire()
+    assert replacement is not conn
+    assert replacement.healthy
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_reconnect_backoff(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class)
+    await conn_pool.init_pool()
+    transport_class.connect_errors = 3
+    transport_class.instances[0].fail()
+    # Retries after 0.01, 0.02 and 0.04 seconds
+    for _ in range(50):
+        await asyncio.sleep(0.01, loop=event_loop)
+        if transport_class.connects == 5:
+            break
+    assert transport_class.connects == 5
+    conn = await conn_pool.acquire()
+    assert conn.healthy
+    assert len(transport_class.instances) == 5
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_stops_reconnect(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class)
+    await conn_pool.init_pool()
+    transport_class.connect_delay = 10
+    transport_class.instances[0].fail()
+    await asyncio.sleep(0.02, loop=event_loop)
+    task = conn_pool._reconnect_task
+    connects = transport_class.connects
+    await conn_pool.close()
+    await asyncio.sleep(0.05, loop=event_loop)
+    assert task.cancelled()
+    assert transport_class.connects == connects
+
+
+@pytest.mark.asyncio
+async def test_heartbeat(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class,
+                          heartbeat_interval=0.01, heartbeat_timeout=0.02)
+    await conn_pool.init_pool()
+    transport_class.instances[0].pong_delay = 0.001
+    await asyncio.sleep(0.05, loop=event_loop)
+    assert conn_pool.rtt_samples
+    assert all(rtt == 0.001 for rtt in conn_pool.rtt_samples)
+    conn = await conn_pool.acquire()
+    assert conn.rtt == 0.001
+    # Missing pongs evict the connection
+    transport_class.instances[0].pong_delay = None
+    await asyncio.sleep(0.1, loop=event_loop)
+    assert not conn.healthy
+    assert len(transport_class.instances) == 2
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_idle(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class, idle_timeout=0.02)
+    await conn_pool.init_pool()
+    conns = [await conn_pool.acquire() for _ in range(3)]
+    assert len(transport_class.instances) == 3
+    for conn in conns:
+        conn.release()
+    await asyncio.sleep(0.1, loop=event_loop)
+    # Only min_conns connections stay open
+    assert [t.closed for t in transport_class.instances].count(False) == 1
+    await conn_pool.close()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import connection
+
+import fakes
+from test_failover import eval_message
+
+
+def open_connection(loop, **kwargs):
+    return connection.Connection.open(
+        'ws://fake', loop, transport_class=fakes.transport_class(), **kwargs)
+
+
+async def settle(loop):
+    for _ in range(5):
+        await asyncio.sleep(0, loop=loop)
+
+
+@pytest.mark.asyncio
+async def test_result_buffer_size(event_loop):
+    conn = await open_connection(event_loop, result_buffer_size=100)
+    transport = conn._transport
+    slow = await conn.write(eval_message())
+    other = await conn.write(eval_message())
+    transport.respond([0] * 30, status_code=206, message=0)
+    transport.respond([1] * 30, message=0)
+    transport.respond([2] * 30, message=1)
+    await settle(event_loop)
+    # Reading stops after the frame that put `slow` over its budget
+    assert conn.flow_control.paused
+    assert transport.unread == 2
+    assert await slow.one() == 0
+    await settle(event_loop)
+    assert transport.unread == 1
+    assert await slow.all() == [0] * 29 + [1] * 30
+    assert await other.all() == [2] * 30
+    assert transport.unread == 0
+    assert not conn.flow_control.paused
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_timeout(event_loop):
+    conn = await open_connection(
+        event_loop, buffer_size=100, buffer_timeout=0.02)
+    transport = conn._transport
+    abandoned = await conn.write(eval_message())
+    other = await conn.write(eval_message())
+    transport.respond([1] * 50, status_code=206, message=0)
+    transport.respond([2], message=1)
+    await settle(event_loop)
+    assert transport.unread == 1
+    # The stall of other requests ends with the timeout
+    assert await other.all() == [2]
+    with pytest.raises(exception.ResponseTimeoutError):
+        await abandoned.all()
+    assert conn.flow_control.discarded == 1
+    assert not conn.closed
+    await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_no_ping_while_paused(event_loop):
+    conn = await open_connection(event_loop, buffer_size=10)
+    transport = conn._transport
+    transport.pong_delay = None
+    await conn.write(eval_message())
+    transport.respond([1] * 10, status_code=206)
+    await settle(event_loop)
+    assert await conn.ping(0.01) is None
+    assert conn.healthy
+    await conn.close()
@@ -0,0 +1,149 @@
+import datetime
+import struct
+import uuid
+
+import pytest
+
+from aiogremlin.driver import resultset
+from aiogremlin.driver.protocol import GremlinServerWSProtocol
+from aiogremlin.driver.serializer import GraphBinaryMessageSerializer
+from aiogremlin.remote.driver_remote_connection import DriverRemoteConnection
+from aiogremlin.structure.io import graphbinaryV1
+from gremlin_python.driver import request
+from gremlin_python.process.traversal import Bytecode, P, T, Traverser
+from gremlin_python.structure.graph import Edge, Path, Vertex
+
+import fakes
+
+
+def build_response(request_id, status_code, data, meta=None, message=''):
+    writer = graphbinaryV1.GraphBinaryWriter()
+    buf = bytearray(b'\x81\x00')
+    buf += uuid.UUID(request_id).bytes
+    buf += struct.pack('>i', status_code)
+    buf.append(0x00)
+    writer.write_bare_string(message, buf)
+    writer.write_bare_map({}, buf)
+    writer.write_bare_map(meta or {}, buf)
+    writer.write_object(data, buf)
+    return bytes(buf)
+
+
+@pytest.fixture
+def reader():
+    return graphbinaryV1.GraphBinaryReader()
+
+
+@pytest.fixture
+def writer():
+    return graphbinaryV1.GraphBinaryWriter()
+
+
+@pytest.mark.parametrize('value', [
+    1, -2 ** 40, 2 ** 70, 1.5, 'joe', True, None, [1, 'a'], {1, 2},
+    {'name': ['joe'], 'age': [29]}, b'bytes',
+    uuid.UUID('41d2e28a-20a4-4ab0-b379-d810dede3786'),
+    datetime.datetime(2017, 5, 1, 12, 30, 15, 123000),
+    Vertex(1, 'person'), T.id])
+def test_round_trip(reader, writer, value):
+    assert reader.read_object(writer.writeObject(value))[0] == value
+
+
+@pytest.mark.parametrize('value', [
+    P.gt(30), P.between(1, 5), P.within([1, 2, 3]), P.without(['a']),
+    P.gt(1).and_(P.lt(5))])
+def test_round_trip_predicate(reader, writer, value):
+    assert reader.read_object(writer.writeObject(value))[0] == value
+
+
+def test_read_predicate_arguments(reader, writer):
+    # P.within(1, 2, 3) as written by servers, one argument per item
+    buf = bytearray([graphbinaryV1.DataType.p, 0x00])
+    writer.write_bare_string('within', buf)
+    buf += struct.pack('>i', 3)
+    for item in (1, 2, 3):
+        writer.write_object(item, buf)
+    assert reader.read_object(bytes(buf))[0] == P.within([1, 2, 3])
+    assert writer.writeObject(P.within([1, 2, 3])) == bytes(buf)
+
+
+def test_read_edge_and_path(reader, writer):
+    edge = Edge(7, Vertex(1, 'person'), 'knows', Vertex(2, 'person'))
+    result = reader.read_object(writer.writeObject(edge))[0]
+    assert result == edge
+    assert result.outV.id == 1 and result.inV.label == 'person'
+    path = Path([set(['a']), set()], [Vertex(1), 'marko'])
+    buf = bytearray([graphbinaryV1.DataType.path, 0x00])
+    writer.write_object(path.labels, buf)
+    writer.write_object(path.objects, buf)
+    assert reader.read_object(bytes(buf))[0] == path
+
+
+def test_serialize_request_message():
+    message_serializer = GraphBinaryMessageSerializer()
+    request_id = str(uuid.uuid4())
+    bytecode = Bytecode()
+    bytecode.add_step('V')
+    bytecode.add_step('has', 'age', P.gt(30))
+    message = request.RequestMessage(
+        processor='traversal', op='bytecode', args={'gremlin': bytecode})
+    data = message_serializer.serialize_message(request_id, message)
+    header_len = data[0] + 1
+    assert data[1:header_len] == b'application/vnd.graphbinary-v1.0'
+    assert data[header_len] == 0x81
+    assert uuid.UUID(bytes=data[header_len + 1:header_len + 17]) == \
+        uuid.UUID(request_id)
+    reader = graphbinaryV1.GraphBinaryReader()
+    offset = header_len + 17
+    op, offset = reader.read_value(graphbinaryV1.DataType.string, data, offset)
+    processor, offset = reader.read_value(
+        graphbinaryV1.DataType.string, data, offset)
+    args, offset = reader.read_value(graphbinaryV1.DataType.map, data, offset)
+    assert op == 'bytecode'
+    assert processor == 'traversal'
+    assert args['aliases'] == {'g': 'g'}
+    assert args['gremlin'] == bytecode
+    assert offset == len(data)
+
+
+def test_deserialize_response_is_lazy():
+    message_serializer = GraphBinaryMessageSerializer()
+    request_id = str(uuid.uuid4())
+    data = build_response(request_id, 206, [Traverser(1, 2), 'not read'],
+                          meta={'aggregateTo': 'list'})
+    response = message_serializer.deserialize_response(data)
+    assert response.request_id == request_id
+    assert response.status_code == 206
+    assert response.meta == {'aggregateTo': 'list'}
+    results = iter(response.data)
+    first = next(results)
+    assert first.object == 1 and first.bulk == 2
+
+
+@pytest.mark.asyncio
+async def test_protocol_queues_binary_frames(event_loop):
+    protocol = GremlinServerWSProtocol(GraphBinaryMessageSerializer)
+    request_id = str(uuid.uuid4())
+    result_set = resultset.ResultSet(request_id, None, event_loop)
+    results_dict = {request_id: result_set}
+    await protocol.data_received(
+        build_response(request_id, 206, [1, 2]), results_dict)
+    await protocol.data_received(
+        build_response(request_id, 200, [3]), results_dict)
+    assert await result_set.all() == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('message_serializer', [
+    GraphBinaryMessageSerializer,
+    'aiogremlin.driver.serializer.GraphBinaryMessageSerializer'])
+async def test_remote_connection_serializer(event_loop, message_serializer):
+    remote = await DriverRemoteConnection.open(
+        'ws://a:8182/gremlin', 'g', loop=event_loop,
+        message_serializer=message_serializer,
+        transport=fakes.transport_class())
+    conn = await remote.client.cluster.get_connection()
+    assert isinstance(conn._conn.message_serializer,
+                      GraphBinaryMessageSerializer)
+    conn.release()
+    await remote.close()
@@ -0,0 +1,201 @@
+import asyncio
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import health
+from aiogremlin.driver.cluster import Cluster
+from gremlin_python.driver import request
+
+import fakes
+
+
+class FakeLoop:
+
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        return self.now
+
+
+def message():
+    return request.RequestMessage('', 'eval', {'gremlin': '1'})
+
+
+def test_consecutive_failures():
+    opened = []
+    breaker = health.CircuitBreaker(
+        FakeLoop(), failure_threshold=3, failure_rate=None,
+        on_open=opened.append)
+    for success in (False, False, True, False, False):
+        breaker.record(success)
+    assert breaker.state == health.CLOSED
+    breaker.record(False)
+    assert breaker.state == health.OPEN
+    assert not breaker.available
+    assert opened == [breaker]
+    # Outcomes of requests sent before the circuit opened don't count
+    breaker.record(True)
+    assert breaker.state == health.OPEN
+
+
+def test_failure_rate():
+    breaker = health.CircuitBreaker(
+        FakeLoop(), failure_threshold=None, failure_rate=0.5,
+        failure_window=4)
+    # The window must be full
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.available
+    breaker.record(False)
+    assert breaker.state == health.OPEN
+
+
+def test_failure_rate_window_slides():
+    breaker = health.CircuitBreaker(
+        FakeLoop(), failure_threshold=None, failure_rate=0.5,
+        failure_window=4)
+    for success in (False, True, True, True, True, False, True):
+        breaker.record(success)
+    assert breaker.available
+    breaker.record(False)
+    assert breaker.state == health.OPEN
+
+
+def test_states():
+    loop = FakeLoop()
+    opened = []
+    breaker = health.CircuitBreaker(loop, on_open=opened.append)
+    loop.now = 1
+    breaker.open()
+    assert breaker.changed == 1
+    breaker.half_open()
+    assert breaker.state == health.HALF_OPEN
+    # A failed probe opens the circuit again, without calling back
+    loop.now = 2
+    breaker.open()
+    assert breaker.changed == 2
+    assert breaker.opened == 1
+    assert len(opened) == 1
+    breaker.close()
+    assert breaker.available
+    # Failures before the circuit closed are forgotten
+    for _ in range(4):
+        breaker.record(False)
+    assert breaker.available
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_skipped_and_probed(event_loop):
+    transport_class = fakes.transport_class()
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], min_conns=1, max_conns=1,
+        failure_threshold=2, probe_interval=0.01,
+        transport=transport_class)
+    a, b = cluster.hosts
+    for _ in range(2):
+        conn = await cluster.get_connection(hostname='a')
+        resp = await conn.write(message())
+        transport = conn._conn._transport
+        transport.respond([], status_code=429)
+        with pytest.raises(exception.GremlinServerError):
+            await resp.all()
+        conn.release()
+    await asyncio.sleep(0, loop=event_loop)
+    assert a.breaker.state == health.OPEN
+    for _ in range(4):
+        conn = await cluster.get_connection()
+        assert conn._conn.url == b.url
+        conn.release()
+    # The host is probed with a script
+    written = len(transport.written)
+    while len(transport.written) == written:
+        await asyncio.sleep(0.005, loop=event_loop)
+    assert a.breaker.state == health.HALF_OPEN
+    transport.respond([1])
+    await asyncio.sleep(0.005, loop=event_loop)
+    assert a.breaker.state == health.CLOSED
+    hosts = set()
+    for _ in range(2):
+        conn = await cluster.get_connection()
+        hosts.add(conn._conn.url)
+        conn.release()
+    assert hosts == {a.url, b.url}
+    await cluster.close()
+
+
+async def fail_requests(cluster, status_code, n):
+    for _ in range(n):
+        conn = await cluster.get_connection()
+        resp = await conn.write(message())
+        conn._conn._transport.respond([], status_code=status_code)
+        with pytest.raises(exception.GremlinServerError):
+            await resp.all()
+        conn.release()
+    # Outcomes are recorded once the response is terminated
+    await asyncio.sleep(0, loop=cluster._loop)
+
+
+@pytest.mark.asyncio
+async def test_query_errors_keep_circuit_closed(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], failure_threshold=2,
+        transport=fakes.transport_class())
+    [host] = cluster.hosts
+    await fail_requests(cluster, 500, 5)
+    await fail_requests(cluster, 598, 5)
+    assert host.breaker.state == health.CLOSED
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_failure_status_codes(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], failure_threshold=2,
+        failure_status_codes=[500], transport=fakes.transport_class())
+    [host] = cluster.hosts
+    await fail_requests(cluster, 429, 2)
+    assert host.breaker.state == health.CLOSED
+    await fail_requests(cluster, 500, 2)
+    assert host.breaker.state == health.OPEN
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens(event_loop):
+    transport_class = fakes.transport_class()
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], min_conns=1, max_conns=1,
+        probe_interval=0.01, probe_timeout=0.01,
+        transport=transport_class)
+    [host] = cluster.hosts
+    host.breaker.open()
+    [transport] = transport_class.instances
+    while not transport.written:
+        await asyncio.sleep(0.005, loop=event_loop)
+    # The probe timed out, the host is probed again
+    while len(transport.written) < 2:
+        await asyncio.sleep(0.005, loop=event_loop)
+    assert host.breaker.opened == 1
+    # All circuits are open, the host still gets requests
+    conn = await cluster.get_connection()
+    conn.release()
+    await cluster.close()
+    assert host._probe_task is None
+
+
+@pytest.mark.asyncio
+async def test_down_host_recovers(event_loop):
+    transport_class = fakes.transport_class(connect_errors=1)
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], probe_interval=0.01,
+        transport=transport_class)
+    [host] = cluster.down_hosts
+    assert len(cluster.hosts) == 1
+    while cluster.down_hosts:
+        await asyncio.sleep(0.01, loop=event_loop)
+    assert not host.down
+    assert host in cluster.hosts
+    assert cluster._recover_task is None
+    await cluster.close()
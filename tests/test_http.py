@@ -0,0 +1,128 @@
+import socket
+import uuid
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from aiogremlin import exception
+from aiogremlin.driver import http, protocol, serializer
+from aiogremlin.driver.cluster import Cluster
+from gremlin_python.driver import request
+from gremlin_python.process.graph_traversal import __
+
+import fakes
+
+
+@pytest.fixture
+def server(request, event_loop):
+    received = []
+    peers = set()
+
+    async def gremlin(request):
+        body = await request.json()
+        received.append((body, request.headers))
+        peers.add(request.transport.get_extra_info('peername'))
+        if body['gremlin'] == 'error':
+            return web.json_response(
+                {'message': 'Script failed', 'Exception-Class': 'Error'},
+                status=500)
+        return web.Response(body=fakes.build_response(
+            str(uuid.uuid4()), [body['gremlin']]))
+
+    app = web.Application()
+    app.router.add_post('/gremlin', gremlin)
+    runner = web.AppRunner(app)
+    event_loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, 'localhost', 0)
+    event_loop.run_until_complete(site.start())
+    request.addfinalizer(
+        lambda: event_loop.run_until_complete(runner.cleanup()))
+    server.port = site._server.sockets[0].getsockname()[1]
+    server.received = received
+    server.peers = peers
+    return server
+
+
+@pytest.fixture
+def cluster(request, event_loop, server):
+    cluster = Cluster(event_loop, hosts=['localhost'], port=server.port,
+                      min_conns=0, http=True, username='user',
+                      password='pass')
+    request.addfinalizer(lambda: event_loop.run_until_complete(cluster.close()))
+    return cluster
+
+
+def test_http_url():
+    assert http.http_url('ws://host:8182/gremlin') == 'http://host:8182/gremlin'
+    assert http.http_url('wss://host/gremlin') == 'https://host/gremlin'
+
+
+@pytest.mark.asyncio
+async def test_submit(cluster, server):
+    client = await cluster.connect()
+    for i in range(5):
+        resp = await client.submit('x + {}'.format(i), {'x': 1})
+        assert await resp.all() == ['x + {}'.format(i)]
+    # Requests share one keep-alive connection
+    assert len(server.peers) == 1
+    body, headers = server.received[0]
+    assert body == {'gremlin': 'x + 0', 'bindings': {'x': 1},
+                    'language': 'gremlin-groovy'}
+    assert headers['Accept'] == 'application/vnd.gremlin-v3.0+json'
+    assert headers['Authorization'].startswith('Basic ')
+
+
+@pytest.mark.asyncio
+async def test_submit_prepared(cluster, server):
+    client = await cluster.connect()
+    resp = await client.prepare('g.V(x)').submit({'x': 1})
+    assert await resp.all() == ['g.V(x)']
+    assert server.received[0][0]['bindings'] == {'x': 1}
+
+
+@pytest.mark.asyncio
+async def test_error_status(cluster):
+    client = await cluster.connect()
+    resp = await client.submit('error')
+    with pytest.raises(exception.GremlinServerError) as excinfo:
+        await resp.all()
+    assert excinfo.value.status_code == 500
+    assert excinfo.value.msg == '500: Script failed'
+
+
+@pytest.mark.asyncio
+async def test_bytecode(cluster):
+    client = await cluster.connect()
+    with pytest.raises(exception.ClientError):
+        await client.submit(__.V().bytecode, http=True)
+
+
+@pytest.mark.asyncio
+async def test_per_request(event_loop, server):
+    cluster = Cluster(event_loop, hosts=['localhost'], port=server.port,
+                      min_conns=0)
+    client = await cluster.connect()
+    resp = await client.submit('1 + 1', http=True)
+    assert await resp.all() == ['1 + 1']
+    assert len(server.received) == 1
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_refused(event_loop):
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    url = 'http://localhost:{}/gremlin'.format(sock.getsockname()[1])
+    sock.close()
+    message_serializer = serializer.GraphSONMessageSerializer()
+    async with aiohttp.ClientSession(loop=event_loop) as session:
+        conn = http.HTTPConnection(
+            url, event_loop, session,
+            protocol.GremlinServerWSProtocol(message_serializer),
+            message_serializer)
+        resp = await conn.write(request.RequestMessage(
+            '', 'eval', {'gremlin': '1'}))
+        with pytest.raises(exception.ConnectionLostError):
+            await resp.all()
+
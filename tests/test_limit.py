@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import limit, pool, provider, serializer
+from gremlin_python.driver import request
+
+import fakes
+
+
+def eval_message(gremlin='1'):
+    return request.RequestMessage('', 'eval', {'gremlin': gremlin})
+
+
+async def fill(concurrency_limit):
+    while concurrency_limit.inflight < concurrency_limit.limit:
+        await concurrency_limit.acquire()
+
+
+@pytest.mark.asyncio
+async def test_fixed_limit(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(event_loop, 2)
+    assert not concurrency_limit.adaptive
+    await fill(concurrency_limit)
+    waiter = event_loop.create_task(concurrency_limit.acquire())
+    await asyncio.sleep(0, loop=event_loop)
+    assert not waiter.done()
+    assert concurrency_limit.waiting == 1
+    concurrency_limit.release(0.01, 200)
+    await waiter
+    assert concurrency_limit.inflight == 2
+    for _ in range(10):
+        concurrency_limit.release(1.0, 429)
+        await concurrency_limit.acquire()
+    assert concurrency_limit.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_increase(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(
+        event_loop, 4, min_limit=2)
+    assert concurrency_limit.limit == 2
+    for _ in range(20):
+        await fill(concurrency_limit)
+        concurrency_limit.release(0.01, 200)
+    assert concurrency_limit.limit == 4
+    assert concurrency_limit.increases == 2
+    assert concurrency_limit.decreases == 0
+
+
+@pytest.mark.asyncio
+async def test_no_increase_unsaturated(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(
+        event_loop, 4, min_limit=2)
+    for _ in range(20):
+        await concurrency_limit.acquire()
+        concurrency_limit.release(0.01, 200)
+    assert concurrency_limit.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_latency_backoff(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(
+        event_loop, 16, min_limit=2)
+    for _ in range(40):
+        await fill(concurrency_limit)
+        concurrency_limit.release(0.01, 200)
+    grown = concurrency_limit.limit
+    assert grown > 4
+    assert concurrency_limit.baseline == 0.01
+    await fill(concurrency_limit)
+    concurrency_limit.release(0.1, 200)
+    assert concurrency_limit.limit == grown // 2
+    assert concurrency_limit.decreases == 1
+
+
+@pytest.mark.asyncio
+async def test_overload_backoff_once_per_window(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(
+        event_loop, 16, min_limit=2)
+    for _ in range(200):
+        await fill(concurrency_limit)
+        concurrency_limit.release(0.01, 200)
+    assert concurrency_limit.limit == 16
+    concurrency_limit.release(0.01, 429)
+    assert concurrency_limit.limit == 8
+    # Sent before the limit was cut
+    concurrency_limit.release(0.01, 598)
+    assert concurrency_limit.limit == 8
+    # Sent after
+    concurrency_limit.release(0, 598)
+    assert concurrency_limit.limit == 4
+    concurrency_limit.release(None)
+    assert concurrency_limit.limit == 4
+    assert concurrency_limit.decreases == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(event_loop, 1)
+    await concurrency_limit.acquire()
+    waiter = event_loop.create_task(concurrency_limit.acquire())
+    await asyncio.sleep(0, loop=event_loop)
+    waiter.cancel()
+    concurrency_limit.release()
+    await concurrency_limit.acquire()
+    assert concurrency_limit.inflight == 1
+    assert concurrency_limit.waiting == 0
+
+
+def test_invalid_limits(event_loop):
+    with pytest.raises(ValueError):
+        limit.ConcurrencyLimit(event_loop, 4, min_limit=8)
+
+
+@pytest.mark.asyncio
+async def test_pool_max_inflight(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = pool.ConnectionPool(
+        'ws://fake', event_loop, None, '', '', 1, 1, 16, 2, None,
+        serializer.GraphSONMessageSerializer(), provider.TinkerGraph,
+        transport_class=transport_class)
+    await conn_pool.init_pool()
+    conn = await conn_pool.acquire()
+    assert conn.concurrency_limit.limit == 2
+    assert conn_pool.concurrency_limit is None
+    transport = transport_class.instances[0]
+    await conn.write(eval_message())
+    await conn.write(eval_message())
+    third = event_loop.create_task(conn.write(eval_message()))
+    await asyncio.sleep(0.01, loop=event_loop)
+    assert not third.done()
+    transport.respond([1], message=0)
+    resp = await third
+    transport.respond([3])
+    assert await resp.all() == [3]
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_adaptive_connection(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = pool.ConnectionPool(
+        'ws://fake', event_loop, None, '', '', 2, 1, 16, 8, None,
+        serializer.GraphSONMessageSerializer(), provider.TinkerGraph,
+        transport_class=transport_class, min_inflight=2)
+    await conn_pool.init_pool()
+    host_limit = conn_pool.concurrency_limit
+    assert host_limit.adaptive
+    assert host_limit.limit == 2
+    conn = await conn_pool.acquire()
+    conn_limit = conn.concurrency_limit
+    assert conn_pool.connection_limits == [conn_limit]
+    assert conn_limit.adaptive
+    transport = transport_class.instances[0]
+    # Keep the connection saturated, its limit and the host's grow
+    for _ in range(12):
+        resps = [await conn.write(eval_message())
+                 for _ in range(conn_limit.limit)]
+        for i in range(len(resps)):
+            transport.respond([i], message=-len(resps) + i)
+        for resp in resps:
+            await resp.all()
+        await asyncio.sleep(0, loop=event_loop)
+    assert conn_limit.limit > 2
+    assert host_limit.limit > 2
+    assert conn_limit.inflight == host_limit.inflight == 0
+    # Overload cuts both
+    before = conn_limit.limit, host_limit.limit
+    resp = await conn.write(eval_message())
+    transport.respond([], status_code=429)
+    with pytest.raises(exception.GremlinServerError):
+        await resp.all()
+    assert resp.status_code == 429
+    await asyncio.sleep(0, loop=event_loop)
+    assert conn_limit.limit == before[0] // 2
+    assert host_limit.limit == before[1] // 2
+    await conn_pool.close()
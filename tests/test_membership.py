@@ -0,0 +1,233 @@
+import asyncio
+import socket
+import ssl
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import server
+from aiogremlin.driver.cluster import Cluster
+from gremlin_python.driver import request
+
+import fakes
+
+
+def message():
+    return request.RequestMessage('', 'eval', {'gremlin': '1'})
+
+
+@pytest.mark.asyncio
+async def test_add_host(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], transport=fakes.transport_class())
+    host = await cluster.add_host('b')
+    assert await cluster.add_host('b') is host
+    assert [h.url for h in cluster.hosts] == [
+        'ws://a:8182/gremlin', 'ws://b:8182/gremlin']
+    urls = set()
+    for _ in range(2):
+        conn = await cluster.get_connection()
+        urls.add(conn._conn.url)
+        conn.release()
+    assert urls == {'ws://a:8182/gremlin', 'ws://b:8182/gremlin'}
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_add_unreachable_host(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], connect_timeout=0.01,
+        transport=fakes.transport_class())
+    host = await cluster.add_host('down')
+    assert cluster.down_hosts == [host]
+    assert cluster._recover_task is not None
+    assert await cluster.remove_host('down')
+    assert not cluster.down_hosts
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_remove_host_drains(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], min_conns=1, max_conns=1,
+        transport=fakes.transport_class())
+    conn = await cluster.get_connection(hostname='b')
+    transport = conn._conn._transport
+    resp = await conn.write(message())
+    removal = event_loop.create_task(cluster.remove_host('b'))
+    await asyncio.sleep(0.01, loop=event_loop)
+    # The host gets no more requests, but its response still arrives
+    assert [host.url for host in cluster.hosts] == ['ws://a:8182/gremlin']
+    with pytest.raises(exception.ConfigError):
+        await cluster.get_connection(hostname='b')
+    assert not removal.done()
+    transport.respond([1])
+    assert await resp.all() == [1]
+    await asyncio.sleep(0.01, loop=event_loop)
+    assert not removal.done()
+    conn.release()
+    assert await removal
+    assert transport.closed
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_remove_host_timeout(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'b'], transport=fakes.transport_class())
+    conn = await cluster.get_connection(hostname='b')
+    transport = conn._conn._transport
+    assert not await cluster.remove_host('b', timeout=0.01)
+    assert transport.closed
+    with pytest.raises(exception.ConfigError):
+        await cluster.remove_host('b')
+    await cluster.close()
+
+
+def fake_dns(loop, monkeypatch, addresses):
+    """Resolve any name to `addresses`, returns the names resolved"""
+    resolved = []
+
+    async def getaddrinfo(host, port, *, type=0):
+        resolved.append(host)
+        return [(socket.AF_INET6 if ':' in address else socket.AF_INET,
+                 socket.SOCK_STREAM, 6, '', (address, port))
+                for address in addresses for _ in range(2)]
+
+    monkeypatch.setattr(loop, 'getaddrinfo', getaddrinfo)
+    return resolved
+
+
+async def resolutions(loop, resolved, n):
+    # Wait until the name was resolved `n` more times
+    count = len(resolved) + n
+    while len(resolved) < count:
+        await asyncio.sleep(0.005, loop=loop)
+
+
+@pytest.mark.asyncio
+async def test_resolve_hostname(event_loop, monkeypatch):
+    addresses = ['10.0.0.1', '10.0.0.2']
+    resolved = fake_dns(event_loop, monkeypatch, addresses)
+    cluster = await Cluster.open(
+        event_loop, resolve_hostname='gremlin', resolve_interval=0.01,
+        transport=fakes.transport_class())
+    assert [host.url for host in cluster.hosts] == [
+        'ws://10.0.0.1:8182/gremlin', 'ws://10.0.0.2:8182/gremlin']
+    # A host is replaced
+    addresses[:] = ['10.0.0.2', '::1']
+    await resolutions(event_loop, resolved, 2)
+    assert [host.url for host in cluster.hosts] == [
+        'ws://10.0.0.2:8182/gremlin', 'ws://[::1]:8182/gremlin']
+    assert resolved[0] == 'gremlin'
+    await cluster.close()
+    assert cluster._resolve_task is None
+
+
+@pytest.mark.asyncio
+async def test_resolve_hostname_errors(event_loop, monkeypatch):
+    addresses = ['10.0.0.1']
+    resolved = fake_dns(event_loop, monkeypatch, addresses)
+    cluster = await Cluster.open(
+        event_loop, resolve_hostname='gremlin', resolve_interval=0.01,
+        transport=fakes.transport_class())
+    create_resolved_host = cluster._create_resolved_host
+
+    def create_host(address, config):
+        if address == '10.0.0.2':
+            raise ValueError('Bad address')
+        return create_resolved_host(address, config)
+
+    monkeypatch.setattr(cluster, '_create_resolved_host', create_host)
+    addresses[:] = ['10.0.0.1', '10.0.0.2']
+    await resolutions(event_loop, resolved, 2)
+    # The name is still resolved after a host could not be added
+    addresses.append('10.0.0.3')
+    await resolutions(event_loop, resolved, 2)
+    assert [host.url for host in cluster.hosts] == [
+        'ws://10.0.0.1:8182/gremlin', 'ws://10.0.0.3:8182/gremlin']
+    assert not cluster._resolve_task.done()
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_resolve_hostname_drains_in_background(event_loop, monkeypatch):
+    addresses = ['10.0.0.1', '10.0.0.2']
+    resolved = fake_dns(event_loop, monkeypatch, addresses)
+    cluster = await Cluster.open(
+        event_loop, resolve_hostname='gremlin', resolve_interval=0.01,
+        transport=fakes.transport_class())
+    conn = await cluster.get_connection(hostname='10.0.0.1')
+    transport = conn._conn._transport
+    addresses[:] = ['10.0.0.2']
+    await resolutions(event_loop, resolved, 2)
+    addresses.append('10.0.0.3')
+    await resolutions(event_loop, resolved, 2)
+    # Hosts are added while the removed one is still draining
+    assert [host.url for host in cluster.hosts] == [
+        'ws://10.0.0.2:8182/gremlin', 'ws://10.0.0.3:8182/gremlin']
+    [task] = cluster._draining
+    assert not task.done()
+    assert not transport.closed
+    # Closing the cluster closes draining hosts
+    await cluster.close()
+    assert task.cancelled()
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_resolve_hostname_tls(event_loop, monkeypatch):
+    monkeypatch.setattr(
+        ssl.SSLContext, 'load_cert_chain', lambda *args, **kwargs: None)
+    fake_dns(event_loop, monkeypatch, ['10.0.0.1', '::1'])
+    cluster = await Cluster.open(
+        event_loop, scheme='wss', resolve_hostname='gremlin',
+        transport=fakes.transport_class())
+    # Certificates are checked against the name, connections go to the
+    # addresses
+    assert [(host.url, host.address) for host in cluster.hosts] == [
+        ('wss://gremlin:8182/gremlin', '10.0.0.1'),
+        ('wss://gremlin:8182/gremlin', '::1')]
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_pinned_resolver():
+    resolver = server._PinnedResolver('::1')
+    [info] = await resolver.resolve('gremlin', 8182)
+    assert info['hostname'] == 'gremlin'
+    assert info['host'] == '::1'
+    assert info['family'] == socket.AF_INET6
+
+
+@pytest.mark.asyncio
+async def test_close_down_hosts(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a', 'down'], connect_timeout=0.01,
+        transport=fakes.transport_class())
+    [down] = cluster.down_hosts
+    closed = []
+
+    async def close():
+        closed.append(down)
+
+    down.close = close
+    await cluster.close()
+    assert closed == [down]
+    assert not cluster.down_hosts
+
+
+@pytest.mark.asyncio
+async def test_establish_hosts_again(event_loop):
+    cluster = await Cluster.open(
+        event_loop, hosts=['a'], transport=fakes.transport_class())
+    [old] = cluster.hosts
+    conn = await cluster.get_connection()
+    transport = conn._conn._transport
+    conn.release()
+    await cluster.establish_hosts()
+    [new] = cluster.hosts
+    assert new is not old
+    assert transport.closed
+    assert old.pool is None
+    await cluster.close()
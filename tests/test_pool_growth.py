@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+import fakes
+from test_failover import make_pool
+
+
+@pytest.mark.asyncio
+async def test_share_during_handshake(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class, min_conns=1)
+    conn_pool._max_conns = 2
+    await conn_pool.init_pool()
+    conn1 = await conn_pool.acquire()
+    transport_class.connect_delay = 0.1
+    growing = event_loop.create_task(conn_pool.acquire())
+    await asyncio.sleep(0.01, loop=event_loop)
+    # The pool is full once the handshake completes, so this acquirer
+    # shares instead of waiting for the lock
+    start = event_loop.time()
+    conn2 = await conn_pool.acquire()
+    assert event_loop.time() - start < 0.05
+    assert conn2 is conn1
+    assert conn1.times_acquired == 2
+    conn3 = await growing
+    assert conn3 is not conn1
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_release_serves_waiter(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class, min_conns=1)
+    conn_pool._max_conns = 2
+    conn_pool._max_times_acquired = 1
+    await conn_pool.init_pool()
+    conn1 = await conn_pool.acquire()
+    transport_class.connect_delay = 0.2
+    waiter = event_loop.create_task(conn_pool.acquire())
+    await asyncio.sleep(0.01, loop=event_loop)
+    conn1.release()
+    start = event_loop.time()
+    assert await waiter is conn1
+    assert event_loop.time() - start < 0.1
+    # The new connection still joins the pool
+    await asyncio.sleep(0.25, loop=event_loop)
+    assert len(conn_pool._available) == 1
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_max_handshakes(event_loop):
+    transport_class = fakes.transport_class()
+    transport_class.connect_delay = 0.02
+    conn_pool = make_pool(event_loop, transport_class, min_conns=0,
+                          max_handshakes=2)
+    conn_pool._max_times_acquired = 1
+    conns = await asyncio.gather(
+        *[conn_pool.acquire() for _ in range(4)], loop=event_loop)
+    assert len(set(conns)) == 4
+    assert transport_class.max_connecting == 2
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_growth_error(event_loop):
+    transport_class = fakes.transport_class(connect_errors=1)
+    conn_pool = make_pool(event_loop, transport_class, min_conns=0)
+    with pytest.raises(OSError):
+        await conn_pool.acquire()
+    conn = await conn_pool.acquire()
+    assert conn.healthy
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_share_least_loaded(event_loop):
+    transport_class = fakes.transport_class()
+    conn_pool = make_pool(event_loop, transport_class, min_conns=0)
+    conn_pool._max_conns = 3
+    conn1, conn2, conn3 = [await conn_pool.acquire() for _ in range(3)]
+    for _ in range(6):
+        await conn_pool.acquire()
+    assert [conn.times_acquired for conn in (conn1, conn2, conn3)] == [
+        3, 3, 3]
+    conn2.release()
+    conn2.release()
+    conn3.release()
+    assert await conn_pool.acquire() is conn2
+    assert {await conn_pool.acquire(), await conn_pool.acquire()} == {
+        conn2, conn3}
+    # Lost connections are skipped
+    transport_class.instances[0].fail()
+    await asyncio.sleep(0, loop=event_loop)
+    conn1.release()
+    conn = await conn_pool.acquire()
+    assert conn is not conn1
+    await conn_pool.close()
@@ -0,0 +1,116 @@
+import json
+import uuid
+
+import pytest
+
+from aiogremlin.driver import serializer
+from aiogremlin.structure.graph import Graph
+from gremlin_python.driver import request
+from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.traversal import Binding, P
+
+
+@pytest.fixture
+def g():
+    return Graph().traversal()
+
+
+@pytest.fixture
+def prepared(g):
+    return g.prepare(
+        lambda g, x, y: g.V(x).where(__.has('age', y)).has('name', y))
+
+
+def build_message(bytecode, aliases=None):
+    return request.RequestMessage(
+        'traversal', 'bytecode', {'gremlin': bytecode, 'aliases': aliases})
+
+
+@pytest.mark.parametrize('message_serializer', [
+    serializer.GraphSONMessageSerializer,
+    serializer.GraphBinaryMessageSerializer])
+@pytest.mark.parametrize('values', [(1, 'a'), (2 ** 40, {'k': [1.5]})])
+def test_serialize_prepared(prepared, g, message_serializer, values):
+    message_serializer = message_serializer()
+    for aliases in ({}, {'g': 'h'}):
+        request_id = str(uuid.uuid4())
+        x, y = values
+        expected = message_serializer.serialize_message(
+            request_id, build_message(
+                g.V(('x', x)).where(__.has('age', ('y', y))).has(
+                    'name', ('y', y)).bytecode, aliases))
+        result = message_serializer.serialize_message(
+            request_id, build_message(prepared(*values).bytecode, aliases))
+        assert result == expected
+    assert len(message_serializer._templates[prepared]) == 2
+
+
+def test_prepared_bytecode(prepared, g):
+    traversal = prepared(1, y=2)
+    assert traversal.bytecode.prepared is prepared
+    assert traversal.bytecode == g.V(('x', 1)).where(
+        __.has('age', ('y', 2))).has('name', ('y', 2)).bytecode
+    assert traversal.bytecode.bindings == {'x': 1, 'y': 2}
+    traversal.limit(1)
+    assert traversal.bytecode.prepared is None
+    assert traversal.bytecode.step_instructions[-1] == ['limit', 1]
+    # The prepared traversal is unchanged
+    assert len(prepared(1, 2).bytecode.step_instructions) == 3
+
+
+def test_prepared_arguments(prepared):
+    assert prepared.names == ('x', 'y')
+    with pytest.raises(TypeError):
+        prepared(1)
+    with pytest.raises(TypeError):
+        prepared(1, 2, 3)
+    with pytest.raises(TypeError):
+        prepared(1, z=2)
+
+
+@pytest.mark.parametrize('message_serializer', [
+    serializer.GraphSONMessageSerializer,
+    serializer.GraphBinaryMessageSerializer])
+def test_serialize_prepared_predicate(g, message_serializer):
+    message_serializer = message_serializer()
+    prepared = g.prepare(lambda g, x, y: g.V().has(
+        'age', P.gt(x).and_(P.within([y, 40]))))
+    for x in (30, 31):
+        request_id = str(uuid.uuid4())
+        expected = message_serializer.serialize_message(
+            request_id, build_message(g.V().has('age', P.gt(
+                Binding('x', x)).and_(P.within([Binding('y', 35), 40]))
+            ).bytecode, {}))
+        result = message_serializer.serialize_message(
+            request_id, build_message(prepared(x, 35).bytecode, {}))
+        assert result == expected
+
+
+def test_serialize_prepared_predicate_value(g):
+    message_serializer = serializer.GraphSONMessageSerializer()
+    prepared = g.prepare(lambda g, x: g.V().has('age', P.gt(x)))
+    for x in (30, 31):
+        payload = message_serializer.serialize_message(
+            str(uuid.uuid4()), build_message(prepared(x).bytecode, {}))
+        step = json.loads(payload[len(b'!application/vnd.gremlin-v3.0+json'):]
+                          .decode())['args']['gremlin']['@value']['step'][-1]
+        predicate = step[-1]['@value']
+        assert predicate['predicate'] == 'gt'
+        assert predicate['value']['@value'] == {
+            'key': 'x', 'value': {'@type': 'g:Int32', '@value': x}}
+
+
+def test_prepared_nested_predicate(g):
+    prepared = g.prepare(lambda g, x: g.V().where(
+        __.values('age').is_(P.lt(x))))
+    traversal = prepared(3)
+    assert traversal.bytecode == g.V().where(
+        __.values('age').is_(P.lt(Binding('x', 3)))).bytecode
+    assert traversal.bytecode.bindings == {'x': 3}
+
+
+def test_prepared_unbound_parameter(g):
+    with pytest.raises(TypeError):
+        g.prepare(lambda g, x: g.V().has('age', x[0]))
+    with pytest.raises(TypeError):
+        g.prepare(lambda g, x: g.V().has('age', P.gt((x,))))
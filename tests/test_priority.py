@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from aiogremlin.driver import limit, pool, provider, serializer
+
+import fakes
+
+
+def make_pool(loop, max_times_acquired, **kwargs):
+    return pool.ConnectionPool(
+        'ws://fake', loop, None, '', '', 1, 1, max_times_acquired, 64, None,
+        serializer.GraphSONMessageSerializer(), provider.TinkerGraph,
+        transport_class=fakes.transport_class(), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_limit_priority_order(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(event_loop, 1)
+    await concurrency_limit.acquire()
+    order = []
+
+    async def acquire(priority):
+        await concurrency_limit.acquire(priority)
+        order.append(priority)
+
+    tasks = []
+    for priority in (limit.PRIORITY_LOW, limit.PRIORITY_NORMAL,
+                     limit.PRIORITY_LOW, limit.PRIORITY_HIGH):
+        tasks.append(event_loop.create_task(acquire(priority)))
+        await asyncio.sleep(0, loop=event_loop)
+    for _ in tasks:
+        concurrency_limit.release()
+        await asyncio.sleep(0, loop=event_loop)
+    assert order == [limit.PRIORITY_HIGH, limit.PRIORITY_NORMAL,
+                     limit.PRIORITY_LOW, limit.PRIORITY_LOW]
+
+
+@pytest.mark.asyncio
+async def test_limit_reserved(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(event_loop, 4, reserved=2)
+    await concurrency_limit.acquire(limit.PRIORITY_LOW)
+    await concurrency_limit.acquire(limit.PRIORITY_NORMAL)
+    low = event_loop.create_task(
+        concurrency_limit.acquire(limit.PRIORITY_LOW))
+    await asyncio.sleep(0, loop=event_loop)
+    assert not low.done()
+    # High priority requests pass the waiting low priority one
+    await concurrency_limit.acquire(limit.PRIORITY_HIGH)
+    await concurrency_limit.acquire(limit.PRIORITY_HIGH)
+    assert concurrency_limit.inflight == 4
+    concurrency_limit.release()
+    await asyncio.sleep(0, loop=event_loop)
+    assert not low.done()
+    concurrency_limit.release()
+    concurrency_limit.release()
+    await low
+    assert concurrency_limit.inflight == 2
+
+
+@pytest.mark.asyncio
+async def test_limit_reserved_keeps_one_slot(event_loop):
+    concurrency_limit = limit.ConcurrencyLimit(event_loop, 2, reserved=4)
+    await concurrency_limit.acquire(limit.PRIORITY_LOW)
+    assert concurrency_limit.inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_priority_order(event_loop):
+    conn_pool = make_pool(event_loop, 1)
+    await conn_pool.init_pool()
+    conn = await conn_pool.acquire()
+    order = []
+
+    async def acquire(priority):
+        conn = await conn_pool.acquire(priority)
+        order.append(priority)
+        return conn
+
+    low = event_loop.create_task(acquire(limit.PRIORITY_LOW))
+    await asyncio.sleep(0, loop=event_loop)
+    high = event_loop.create_task(acquire(limit.PRIORITY_HIGH))
+    await asyncio.sleep(0, loop=event_loop)
+    conn.release()
+    conn = await high
+    assert not low.done()
+    conn.release()
+    await low
+    assert order == [limit.PRIORITY_HIGH, limit.PRIORITY_LOW]
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_priority_cancelled(event_loop):
+    conn_pool = make_pool(event_loop, 1)
+    await conn_pool.init_pool()
+    conn = await conn_pool.acquire()
+    low = event_loop.create_task(conn_pool.acquire(limit.PRIORITY_LOW))
+    high = event_loop.create_task(conn_pool.acquire(limit.PRIORITY_HIGH))
+    await asyncio.sleep(0, loop=event_loop)
+    conn.release()
+    high.cancel()
+    assert await asyncio.wait_for(low, 1, loop=event_loop) is conn
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_reserved(event_loop):
+    conn_pool = make_pool(event_loop, 3, reserved_inflight=2)
+    await conn_pool.init_pool()
+    conn = await conn_pool.acquire()
+    waiter = event_loop.create_task(conn_pool.acquire())
+    await asyncio.sleep(0.01, loop=event_loop)
+    assert not waiter.done()
+    assert await conn_pool.acquire(limit.PRIORITY_HIGH) is conn
+    assert await conn_pool.acquire(limit.PRIORITY_HIGH) is conn
+    assert conn.times_acquired == 3
+    for _ in range(3):
+        conn.release()
+    assert await asyncio.wait_for(waiter, 1, loop=event_loop) is conn
+    await conn_pool.close()
@@ -0,0 +1,100 @@
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import resultset
+
+
+@pytest.fixture
+def result_set(event_loop):
+    result_set = resultset.ResultSet('id', None, event_loop)
+    result_set.queue_batch(206, [1, 2], '')
+    result_set.queue_batch(206, [], '')
+    result_set.queue_batch(200, iter([0, None, 3]), '')
+    result_set.queue_result(None)
+    return result_set
+
+
+@pytest.mark.asyncio
+async def test_batches(result_set):
+    batches = []
+    async for batch in result_set.batches():
+        batches.append(batch)
+    assert batches == [[1, 2], [0, None, 3]]
+
+
+@pytest.mark.asyncio
+async def test_all(result_set):
+    assert await result_set.all() == [1, 2, 0, None, 3]
+
+
+@pytest.mark.asyncio
+async def test_one_then_batches(result_set):
+    assert await result_set.one() == 1
+    assert await result_set.batches().__anext__() == [2]
+    assert await result_set.all() == [0, None, 3]
+    assert await result_set.one() is None
+
+
+@pytest.mark.asyncio
+async def test_batches_error(event_loop):
+    result_set = resultset.ResultSet('id', None, event_loop)
+    result_set.queue_batch(206, [1], '')
+    result_set.queue_batch(500, [], 'Server error')
+    result_set.queue_result(None)
+    batches = result_set.batches()
+    assert await batches.__anext__() == [1]
+    with pytest.raises(exception.GremlinServerError):
+        await batches.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_batches_timeout(event_loop):
+    result_set = resultset.ResultSet('id', 0.01, event_loop)
+    with pytest.raises(exception.ResponseTimeoutError):
+        await result_set.all()
+
+
+@pytest.mark.asyncio
+async def test_flow_control(event_loop):
+    flow_control = resultset.FlowControl(
+        event_loop, max_bytes=100, max_result_bytes=50)
+    first = resultset.ResultSet('1', None, event_loop,
+                                flow_control=flow_control)
+    second = resultset.ResultSet('2', None, event_loop,
+                                 flow_control=flow_control)
+    first.queue_batch(206, [1], '', 40)
+    assert not flow_control.paused
+    first.queue_batch(206, [2], '', 40)
+    assert first.buffered == 80
+    assert flow_control.paused
+    assert await first.one() == 1
+    assert first.buffered == 40
+    assert not flow_control.paused
+    second.queue_batch(206, [3], '', 45)
+    second.queue_batch(200, [4], '', 45)
+    second.queue_result(None)
+    assert flow_control.buffered == 130
+    assert flow_control.paused
+    assert await second.all() == [3, 4]
+    assert flow_control.buffered == 40
+    assert not flow_control.paused
+
+
+@pytest.mark.asyncio
+async def test_flow_control_timeout(event_loop):
+    flow_control = resultset.FlowControl(
+        event_loop, max_bytes=100, timeout=0.01)
+    small = resultset.ResultSet('1', None, event_loop,
+                                flow_control=flow_control)
+    large = resultset.ResultSet('2', None, event_loop,
+                                flow_control=flow_control)
+    small.queue_batch(206, [1], '', 40)
+    large.queue_batch(206, [2], '', 70)
+    await flow_control.wait()
+    # Only the largest result set is discarded
+    assert not flow_control.paused
+    assert flow_control.buffered == 40
+    assert (flow_control.pauses, flow_control.discarded) == (1, 1)
+    with pytest.raises(exception.ResponseTimeoutError):
+        await large.one()
+    assert await small.one() == 1
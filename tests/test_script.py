@@ -0,0 +1,119 @@
+import uuid
+
+import pytest
+
+from aiogremlin import Cluster
+from aiogremlin.driver.client import Client
+from aiogremlin.driver import serializer
+from aiogremlin.driver.script import lift_literals
+from gremlin_python.driver import request
+
+
+@pytest.mark.parametrize('script,expected,bindings', [
+    ("g.V(1).out('knows').limit(10)",
+     "g.V(_lit0).out(_lit1).limit(_lit2)",
+     {'_lit0': 1, '_lit1': 'knows', '_lit2': 10}),
+    ('g.V().has("name", "marko").values("name")',
+     'g.V().has(_lit0, _lit1).values(_lit0)',
+     {'_lit0': 'name', '_lit1': 'marko'}),
+    ("g.V(1L).has('x', 1.5).has('y', 2.5d).has('z', 0x10)",
+     "g.V(1L).has(_lit0, 1.5).has(_lit1, _lit2).has(_lit3, 0x10)",
+     {'_lit0': 'x', '_lit1': 'y', '_lit2': 2.5, '_lit3': 'z'}),
+    ("g.V().has('n', \"${x}\").property('a\\'b', 1_000)",
+     "g.V().has(_lit0, \"${x}\").property('a\\'b', 1_000)",
+     {'_lit0': 'n'}),
+    ("[name: 'a', 'k': 2]; v.'name' // 3\ng.V(_lit0)",
+     "[name: __lit0, 'k': __lit1]; v.'name' // 3\ng.V(_lit0)",
+     {'__lit0': 'a', '__lit1': 2})])
+def test_lift_literals(script, expected, bindings):
+    assert lift_literals(script) == (expected, bindings)
+
+
+@pytest.mark.parametrize('script,expected,bindings', [
+    # Groovy reads integers with a leading zero as octal
+    ("g.V().has('a', 010).has('b', 0)",
+     "g.V().has(_lit0, 010).has(_lit1, _lit2)",
+     {'_lit0': 'a', '_lit1': 'b', '_lit2': 0}),
+    ("g.V().has('a', /ab'c'/).has('b', 4 / 2)",
+     "g.V().has(_lit0, /ab'c'/).has(_lit1, _lit2 / _lit3)",
+     {'_lit0': 'a', '_lit1': 'b', '_lit2': 4, '_lit3': 2}),
+    ("x = /a\\/'b'/; g.V(x).values('c')",
+     "x = /a\\/'b'/; g.V(x).values(_lit0)",
+     {'_lit0': 'c'}),
+    ("g.V().has('a', $/ab'c'$/$/d/$)",
+     "g.V().has(_lit0, $/ab'c'$/$/d/$)",
+     {'_lit0': 'a'}),
+    # A slash after a closure could be either, the script is kept
+    ("g.V().has('a', 1).map{ it } / 'b'",
+     "g.V().has('a', 1).map{ it } / 'b'",
+     {})])
+def test_lift_literals_octal_and_slashy(script, expected, bindings):
+    assert lift_literals(script) == (expected, bindings)
+
+
+def test_lift_literals_reserved():
+    assert lift_literals("g.V(x).has('a', 1)", reserved=['x', '_lit0']) == (
+        'g.V(x).has(__lit0, __lit1)', {'__lit0': 'a', '__lit1': 1})
+
+
+@pytest.mark.parametrize('message_serializer', [
+    serializer.GraphSONMessageSerializer,
+    serializer.GraphBinaryMessageSerializer])
+def test_serialize_prepared_script(event_loop, message_serializer):
+    message_serializer = message_serializer()
+    client = Client(Cluster(event_loop), event_loop)
+    prepared = client.prepare('g.V(x).limit(y)')
+    for bindings in ({'x': 1, 'y': 2}, {'x': 'a', 'y': 3}, None):
+        args = {'gremlin': 'g.V(x).limit(y)', 'aliases': {}}
+        if bindings:
+            args['bindings'] = bindings
+        request_id = str(uuid.uuid4())
+        expected = message_serializer.serialize_message(
+            request_id, request.RequestMessage('', 'eval', dict(args)))
+        args['gremlin'] = prepared
+        result = message_serializer.serialize_message(
+            request_id, request.RequestMessage('', 'eval', args))
+        assert result == expected
+    assert len(message_serializer._templates[prepared]) == 2
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.messages = []
+
+    async def write(self, message, priority=None):
+        self.messages.append(message)
+
+    async def release_task(self, resp):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_client_prepare(event_loop):
+    cluster = Cluster(event_loop, lift_literals=True, script_cache_size=2)
+    conn = FakeConnection()
+
+    async def get_connection(hostname=None, http=False, priority=None):
+        return conn
+
+    cluster.get_connection = get_connection
+    client = Client(cluster, event_loop)
+    prepared = client.prepare('g.V(x)')
+    assert client.prepare('g.V(x)') is prepared
+    await prepared.submit({'x': 1})
+    await client.submit("g.V().has('name', 'marko')")
+    await client.submit("g.V().has('name', 'vadas')")
+    await client.submit("g.V(y)", {'y': 1})
+    assert client.script_cache_info() == (2, 3, 2, 2)
+    assert [message.args['gremlin'].script for message in conn.messages] == [
+        'g.V(x)', 'g.V().has(_lit0, _lit1)', 'g.V().has(_lit0, _lit1)',
+        'g.V(y)']
+    assert conn.messages[2].args['bindings'] == {
+        '_lit0': 'name', '_lit1': 'vadas'}
+    # User bindings don't replace lifted literals
+    await client.submit("g.V().has('name', 'marko')", {'_lit0': 2})
+    assert conn.messages[-1].args['gremlin'].script == (
+        'g.V().has(__lit0, __lit1)')
+    assert conn.messages[-1].args['bindings'] == {
+        '__lit0': 'name', '__lit1': 'marko', '_lit0': 2}
@@ -0,0 +1,161 @@
+import concurrent.futures
+import json
+import pickle
+import uuid
+
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver import resultset, serializer
+from aiogremlin.driver.protocol import DecodeStats, GremlinServerWSProtocol
+from gremlin_python.driver import serializer as graphson_serializer
+from gremlin_python.process.traversal import Traverser
+from gremlin_python.structure.graph import Vertex
+from gremlin_python.structure.io import graphsonV3d0
+
+
+def build_frame(data, status_code=206):
+    return json.dumps({
+        'requestId': str(uuid.uuid4()),
+        'status': {'code': status_code, 'message': '', 'attributes': {}},
+        'result': {'meta': {}, 'data': data}}).encode('utf-8')
+
+
+FRAME = build_frame({'@type': 'g:List', '@value': [
+    {'@type': 'g:Traverser', '@value': {
+        'bulk': {'@type': 'g:Int64', '@value': 2},
+        'value': {'@type': 'g:Vertex', '@value': {
+            'id': {'@type': 'g:Int32', '@value': 1}, 'label': 'person'}}}},
+    {'@type': 'g:Map', '@value': [
+        'name', {'@type': 'g:List', '@value': ['marko']},
+        'age', {'@type': 'g:List', '@value': [
+            {'@type': 'g:Int32', '@value': 29}]}]},
+    {'@type': 'g:Set', '@value': [{'@type': 'g:Double', '@value': 1.5}]},
+    {'@type': 'g:UUID', '@value': '41d2e28a-20a4-4ab0-b379-d810dede3786'}]})
+
+
+@pytest.fixture(params=serializer.JSON_BACKENDS)
+def json_backend(request):
+    pytest.importorskip(request.param)
+    return request.param
+
+
+def test_single_pass_matches_graphson_reader(json_backend):
+    message_serializer = serializer.GraphSONMessageSerializer(
+        json_backend=json_backend)
+    response = message_serializer.deserialize_response(FRAME)
+    expected = graphson_serializer.GraphSONMessageSerializer(
+        ).deserialize_message(json.loads(FRAME.decode('utf-8')))
+    assert response.status_code == 206
+    assert response.request_id == expected['requestId']
+    results = list(response.data)
+    traverser = results[0]
+    assert isinstance(traverser, Traverser)
+    assert traverser.object == Vertex(1, 'person')
+    assert traverser.bulk == 2
+    assert results[1:] == expected['result']['data'][1:]
+
+
+def test_empty_data():
+    message_serializer = serializer.GraphSONMessageSerializer()
+    response = message_serializer.deserialize_response(
+        build_frame(None, status_code=204))
+    assert list(response.data) == []
+
+
+def test_unknown_json_backend():
+    with pytest.raises(exception.ConfigError):
+        serializer.GraphSONMessageSerializer(json_backend='simplejson')
+
+
+class FailingDeserializer:
+
+    @classmethod
+    def objectify(cls, d, reader):
+        raise ValueError('not deserializable')
+
+
+def failing_serializer():
+    reader = graphsonV3d0.GraphSONReader({'g:UUID': FailingDeserializer})
+    return serializer.GraphSONMessageSerializer(reader=reader)
+
+
+def test_lazy_response_deserializes_on_iteration():
+    response = failing_serializer().deserialize_response(FRAME, lazy=True)
+    results = iter(response.data)
+    traverser = next(results)
+    assert traverser.object == Vertex(1, 'person')
+    assert next(results) == {'name': ['marko'], 'age': [29]}
+    assert next(results) == {1.5}
+    with pytest.raises(ValueError):
+        next(results)
+
+
+async def queue_frame(protocol, frame, loop):
+    request_id = json.loads(frame.decode('utf-8'))['requestId']
+    result_set = resultset.ResultSet(request_id, None, loop)
+    await protocol.data_received(frame, {request_id: result_set})
+    return result_set
+
+
+@pytest.mark.asyncio
+async def test_lazy_protocol_results(event_loop):
+    eager = GremlinServerWSProtocol(serializer.GraphSONMessageSerializer)
+    lazy = GremlinServerWSProtocol(failing_serializer(), lazy_results=True)
+    frame = build_frame({'@type': 'g:List', '@value': [1, 2]}, 200)
+    eager_results = await queue_frame(eager, frame, event_loop)
+    lazy_results = await queue_frame(lazy, frame, event_loop)
+    assert await lazy_results.all() == await eager_results.all() == [1, 2]
+    # Unread items are never deserialized
+    lazy_results = await queue_frame(lazy, FRAME, event_loop)
+    assert (await lazy_results.one()).object == Vertex(1, 'person')
+
+
+@pytest.mark.parametrize('frame_type', [bytes, str, memoryview])
+def test_frame_types(json_backend, frame_type):
+    message_serializer = serializer.GraphSONMessageSerializer(
+        json_backend=json_backend)
+    if frame_type is str:
+        frame = FRAME.decode('utf-8')
+    else:
+        frame = frame_type(FRAME)
+    response = message_serializer.deserialize_response(frame)
+    assert len(list(response.data)) == 4
+
+
+@pytest.fixture(params=['thread', 'process'])
+def decode_executor(request):
+    if request.param == 'thread':
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(1)
+    request.addfinalizer(executor.shutdown)
+    return executor
+
+
+@pytest.mark.asyncio
+async def test_decode_executor(event_loop, decode_executor):
+    stats = DecodeStats()
+    protocol = GremlinServerWSProtocol(
+        serializer.GraphSONMessageSerializer, lazy_results=True,
+        decode_executor=decode_executor, decode_threshold=len(FRAME),
+        decode_stats=stats, loop=event_loop)
+    small = build_frame({'@type': 'g:List', '@value': [1]}, 200)
+    results = await queue_frame(protocol, FRAME, event_loop)
+    small_results = await queue_frame(protocol, small, event_loop)
+    assert stats.executor_frames == 1
+    assert stats.inline_frames == 1
+    assert stats.executor_seconds > 0
+    assert (await results.one()).object == Vertex(1, 'person')
+    assert await small_results.all() == [1]
+
+
+@pytest.mark.parametrize('message_serializer', [
+    serializer.GraphSONMessageSerializer(json_backend='json'),
+    serializer.GraphBinaryMessageSerializer()])
+def test_pickle_serializer(message_serializer):
+    copy = pickle.loads(pickle.dumps(message_serializer))
+    assert type(copy) is type(message_serializer)
+    if isinstance(copy, serializer.GraphSONMessageSerializer):
+        assert copy.json_backend == message_serializer.json_backend
+        assert len(list(copy.deserialize_response(FRAME).data)) == 4
@@ -0,0 +1,417 @@
+import asyncio
+import base64
+import hashlib
+import re
+import struct
+import zlib
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from aiogremlin import exception
+from aiogremlin.driver.aiohttp.transport import AiohttpTransport, ByteCounters
+from aiogremlin.driver.websocket import transport as websocket
+
+
+async def echo(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    async for msg in ws:
+        if msg.data.startswith(b'text:'):
+            await ws.send_str(msg.data[5:].decode('utf-8'))
+        elif msg.data == b'ping':
+            await ws.ping(b'hi')
+            await ws.send_bytes(msg.data)
+        elif msg.data == b'close':
+            await ws.close()
+        else:
+            await ws.send_bytes(msg.data)
+    return ws
+
+
+@pytest.fixture
+def url(request, event_loop):
+    app = web.Application()
+    app.router.add_get('/gremlin', echo)
+    runner = web.AppRunner(app)
+    event_loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, 'localhost', 0)
+    event_loop.run_until_complete(site.start())
+    request.addfinalizer(
+        lambda: event_loop.run_until_complete(runner.cleanup()))
+    port = site._server.sockets[0].getsockname()[1]
+    return 'ws://localhost:{}/gremlin'.format(port)
+
+
+@pytest.mark.asyncio
+async def test_compression(event_loop, url):
+    counters = ByteCounters()
+    transport = AiohttpTransport(
+        event_loop, compression_level=6, compression_min_size=100,
+        byte_counters=counters)
+    await transport.connect(url)
+    assert transport.compress == 15
+    message = b'{"@type": "g:Vertex"}' * 100
+    await transport.write(message)
+    assert await transport.read() == message
+    assert counters.bytes_sent == counters.bytes_received == len(message)
+    # aiohttp doesn't expose its socket
+    assert counters.wire_bytes_sent == counters.wire_bytes_received == 0
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_compression(event_loop, url):
+    counters = ByteCounters()
+    transport = websocket.WebSocketTransport(
+        event_loop, compression_level=6, compression_min_size=100,
+        byte_counters=counters)
+    await transport.connect(url)
+    assert transport.compress == 15
+    message = b'{"@type": "g:Vertex"}' * 100
+    for _ in range(2):
+        await transport.write(message)
+        assert await transport.read() == message
+    assert counters.bytes_sent == counters.bytes_received == 2 * len(message)
+    # Responses are compressed by the server as well
+    assert counters.wire_bytes_sent < len(message) / 5
+    assert counters.wire_bytes_received < len(message) / 5
+    # Small requests are sent as they are
+    wire_bytes_sent = counters.wire_bytes_sent
+    await transport.write_many([b'x' * 50, message])
+    assert await transport.read() == b'x' * 50
+    assert await transport.read() == message
+    assert counters.wire_bytes_sent - wire_bytes_sent > 50
+    await transport.close()
+
+
+def accept_upgrade(headers, extensions=None):
+    key = re.search(
+        br'Sec-WebSocket-Key: (\S+)', headers, re.IGNORECASE).group(1)
+    accept = base64.b64encode(hashlib.sha1(
+        key + b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11').digest())
+    response = (b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept)
+    if extensions is not None:
+        response += b'\r\nSec-WebSocket-Extensions: ' + extensions
+    return response + b'\r\n\r\n'
+
+
+async def read_frame(reader):
+    first, second = await reader.readexactly(2)
+    length = second & 0x7f
+    if length == 126:
+        length = struct.unpack('!H', await reader.readexactly(2))[0]
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return first, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def inflate(payload, decompressor=None):
+    decompressor = decompressor or zlib.decompressobj(-15)
+    return decompressor.decompress(payload + b'\x00\x00\xff\xff')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('transport_class,min_size', [
+    (AiohttpTransport, 0),
+    (websocket.WebSocketTransport, 100)])
+async def test_compressed_frame(event_loop, transport_class, min_size):
+    frames = asyncio.Queue(loop=event_loop)
+    offers = []
+
+    async def handle(reader, writer):
+        headers = await reader.readuntil(b'\r\n\r\n')
+        offers.append(re.search(br'Sec-WebSocket-Extensions: ([^\r]*)',
+                                headers, re.IGNORECASE).group(1))
+        writer.write(accept_upgrade(headers, b'permessage-deflate'))
+        for _ in range(3):
+            frames.put_nowait(await read_frame(reader))
+        writer.close()
+
+    server = await asyncio.start_server(
+        handle, '127.0.0.1', 0, loop=event_loop)
+    port = server.sockets[0].getsockname()[1]
+    transport = transport_class(
+        event_loop, compression_level=6, compression_min_size=min_size)
+    await transport.connect('ws://127.0.0.1:{}/gremlin'.format(port))
+    assert offers[0].startswith(b'permessage-deflate')
+    assert transport.compress == 15
+    message = b'{"@type": "g:Vertex"}' * 100
+    await transport.write(message)
+    await transport.write(b'x' * 50)
+    await transport.write(message)
+    decompressor = zlib.decompressobj(-15)
+    first, payload = await frames.get()
+    # A final binary frame with RSV1, the permessage-deflate bit, set
+    assert first == 0x80 | 0x40 | 0x2
+    assert len(payload) < len(message) / 10
+    assert inflate(payload, decompressor) == message
+    first, payload = await frames.get()
+    if min_size:
+        assert first == 0x80 | 0x2
+        assert payload == b'x' * 50
+    else:
+        assert first == 0x80 | 0x40 | 0x2
+        assert inflate(payload, decompressor) == b'x' * 50
+    # The compression context carries over between messages
+    first, payload = await frames.get()
+    assert inflate(payload, decompressor) == message
+    await transport.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_deflate_parameters(event_loop):
+    received = asyncio.Queue(loop=event_loop)
+
+    async def handle(reader, writer):
+        headers = await reader.readuntil(b'\r\n\r\n')
+        writer.write(accept_upgrade(
+            headers, b'permessage-deflate; client_max_window_bits=10; '
+                     b'client_no_context_takeover'))
+        # A compressed response split into two fragments
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        payload = compressor.compress(b'abc' * 100) + compressor.flush(
+            zlib.Z_SYNC_FLUSH)
+        payload = payload[:-4]
+        writer.write(bytes([0x40 | 0x2, 5]) + payload[:5] +
+                     bytes([0x80, len(payload) - 5]) + payload[5:])
+        for _ in range(2):
+            received.put_nowait(await read_frame(reader))
+        writer.close()
+
+    server = await asyncio.start_server(
+        handle, '127.0.0.1', 0, loop=event_loop)
+    port = server.sockets[0].getsockname()[1]
+    transport = websocket.WebSocketTransport(event_loop, compression_level=6)
+    await transport.connect('ws://127.0.0.1:{}/gremlin'.format(port))
+    assert transport.compress == 10
+    assert await transport.read() == b'abc' * 100
+    message = b'{"@type": "g:Vertex"}' * 100
+    await transport.write(message)
+    await transport.write(message)
+    # Without context takeover each message is compressed on its own
+    for _ in range(2):
+        first, payload = await received.get()
+        assert first == 0x80 | 0x40 | 0x2
+        assert inflate(payload) == message
+    await transport.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_unoffered_extension(event_loop):
+
+    async def handle(reader, writer):
+        headers = await reader.readuntil(b'\r\n\r\n')
+        writer.write(accept_upgrade(headers, b'permessage-deflate'))
+
+    server = await asyncio.start_server(
+        handle, '127.0.0.1', 0, loop=event_loop)
+    port = server.sockets[0].getsockname()[1]
+    transport = websocket.WebSocketTransport(event_loop)
+    with pytest.raises(exception.ClientError):
+        await transport.connect('ws://127.0.0.1:{}/gremlin'.format(port))
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_no_compression(event_loop, url, transport_class):
+    transport = transport_class(event_loop, compression_min_size=100)
+    await transport.connect(url)
+    assert transport.compress == 0
+    message = b'a' * 1000
+    await transport.write(message)
+    assert await transport.read() == message
+    assert transport.byte_counters.bytes_sent == 1000
+    await transport.close()
+
+
+class CountingResolver(aiohttp.ThreadedResolver):
+
+    lookups = 0
+
+    async def resolve(self, *args, **kwargs):
+        self.lookups += 1
+        return await super().resolve(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_shared_session(event_loop, url):
+    resolver = CountingResolver(loop=event_loop)
+    connector = aiohttp.TCPConnector(
+        limit=0, ttl_dns_cache=10, resolver=resolver, loop=event_loop)
+    session = aiohttp.ClientSession(loop=event_loop, connector=connector)
+    transports = [AiohttpTransport(event_loop, session=session)
+                  for _ in range(3)]
+    for transport in transports:
+        await transport.connect(url)
+        await transport.write(b'x')
+        assert await transport.read() == b'x'
+    assert resolver.lookups == 1
+    await transports[0].close()
+    assert transports[0].closed
+    assert not session.closed
+    # Reconnecting reuses the session and its DNS cache
+    await transports[0].connect(url)
+    assert not transports[0].closed
+    assert resolver.lookups == 1
+    for transport in transports:
+        await transport.close()
+    assert not session.closed
+    await session.close()
+
+
+@pytest.fixture(params=[AiohttpTransport, websocket.WebSocketTransport])
+def transport_class(request):
+    return request.param
+
+
+@pytest.mark.asyncio
+async def test_read_text_frame(event_loop, url, transport_class):
+    transport = transport_class(event_loop)
+    await transport.connect(url)
+    await transport.write(b'text:{"a": 1}')
+    assert await transport.read() == '{"a": 1}'
+    await transport.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('size', [0, 125, 126, 65535, 65536, 1000003])
+async def test_websocket_transport(event_loop, url, size):
+    transport = websocket.WebSocketTransport(event_loop)
+    await transport.connect(url)
+    message = bytes(range(256)) * (size // 256) + b'x' * (size % 256)
+    await transport.write(message)
+    assert await transport.read() == message
+    counters = transport.byte_counters
+    assert counters.bytes_sent == counters.bytes_received == size
+    assert counters.wire_bytes_sent > size
+    await transport.close()
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_write_many(event_loop, url, transport_class):
+    transport = transport_class(event_loop)
+    await transport.connect(url)
+    messages = [b'a' * 10, b'b' * 200, b'c' * 70000]
+    await transport.write_many(messages)
+    for message in messages:
+        assert await transport.read() == message
+    counters = transport.byte_counters
+    assert counters.bytes_sent == sum(len(m) for m in messages)
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_unread_frames(event_loop, url):
+    # Unread frames pause reading from the socket until they are read
+    transport = websocket.WebSocketTransport(event_loop)
+    await transport.connect(url)
+    messages = [bytes([i]) * 20000 for i in range(20)]
+    for message in messages:
+        await transport.write(message)
+    await asyncio.sleep(0.05, loop=event_loop)
+    assert transport.byte_counters.wire_bytes_received < 400000
+    for message in messages:
+        assert await transport.read() == message
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_paused_writers(event_loop, url):
+    transport = websocket.WebSocketTransport(event_loop)
+    await transport.connect(url)
+    protocol = transport._protocol
+    # The socket buffer is full, writers wait until it drained
+    protocol.pause_writing()
+    writers = [event_loop.create_task(transport.write(bytes([i])))
+               for i in range(2)]
+    await asyncio.sleep(0.01, loop=event_loop)
+    assert not any(writer.done() for writer in writers)
+    protocol.resume_writing()
+    await asyncio.wait_for(
+        asyncio.gather(*writers, loop=event_loop), 1, loop=event_loop)
+    assert [await transport.read() for _ in writers] == [b'\x00', b'\x01']
+    # Writers waiting when the connection is lost fail
+    protocol.pause_writing()
+    writers = [event_loop.create_task(transport.write(b'x'))
+               for _ in range(2)]
+    await asyncio.sleep(0.01, loop=event_loop)
+    protocol._transport.abort()
+    for writer in writers:
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(writer, 1, loop=event_loop)
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_control_frames(event_loop, url):
+    transport = websocket.WebSocketTransport(event_loop)
+    await transport.connect(url)
+    await transport.write(b'ping')
+    assert await transport.read() == b'ping'
+    await transport.write(b'close')
+    with pytest.raises(RuntimeError):
+        await transport.read()
+    assert transport.closed
+
+
+@pytest.mark.asyncio
+async def test_websocket_transport_handshake_error(event_loop, url):
+    transport = websocket.WebSocketTransport(event_loop)
+    with pytest.raises(exception.ClientError):
+        await transport.connect(url.replace('/gremlin', '/missing'))
+
+
+def test_frame_parser():
+    parser = websocket.FrameParser()
+    frames = (b'\x01\x03abc' +           # first text fragment
+              b'\x89\x02hi' +            # ping between fragments
+              b'\x80\x02de' +            # final continuation
+              b'\x82\x7e\x01\x00' + b'z' * 256)
+    messages = []
+    for i in range(len(frames)):
+        messages.extend(parser.feed(frames[i:i + 1]))
+    assert messages == [(websocket.OP_PING, b'hi'),
+                        (websocket.OP_TEXT, b'abcde'),
+                        (websocket.OP_BINARY, b'z' * 256)]
+    with pytest.raises(exception.ClientError):
+        parser.feed(b'\x82\x81abcdx')
+    # RSV1 is only allowed once permessage-deflate was negotiated
+    with pytest.raises(exception.ClientError):
+        websocket.FrameParser().feed(b'\xc2\x01x')
+    payload = websocket.Deflate(6).compress(b'abc')
+    parser = websocket.FrameParser(websocket.Deflate(6))
+    assert parser.feed(bytes([0xc2, len(payload)]) + payload) == [
+        (websocket.OP_BINARY, b'abc')]
+
+
+def test_build_frame():
+    header, payload = websocket.build_frame(
+        websocket.OP_BINARY, b'Hello', mask=b'\x37\xfa\x21\x3d')
+    # Example from RFC 6455 section 5.7
+    assert header == b'\x82\x85\x37\xfa\x21\x3d'
+    assert payload == b'\x7f\x9f\x4d\x51\x58'
+    data = bytes(range(256)) * 3
+    assert (websocket._apply_mask(b'abcd', data) ==
+            websocket.apply_mask(b'abcd', data))
+
+
+@pytest.mark.asyncio
+async def test_ping(event_loop, url, transport_class):
+    transport = transport_class(event_loop)
+    await transport.connect(url)
+    # Pongs are processed while reading
+    read = event_loop.create_task(transport.read())
+    rtt = await transport.ping()
+    assert 0 < rtt < 1
+    await transport.write(b'x')
+    assert await read == b'x'
+    await transport.close()
@@ -0,0 +1,69 @@
+import pytest
+
+from aiogremlin import exception
+from aiogremlin.driver.cluster import Cluster
+
+import fakes
+from test_failover import make_pool
+
+
+@pytest.mark.asyncio
+async def test_init_pool_concurrently(event_loop):
+    transport_class = fakes.transport_class()
+    transport_class.connect_delay = 0.05
+    conn_pool = make_pool(event_loop, transport_class, min_conns=4)
+    start = event_loop.time()
+    await conn_pool.init_pool()
+    assert event_loop.time() - start < 0.15
+    assert len(transport_class.instances) == 4
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_init_pool_error(event_loop):
+    transport_class = fakes.transport_class(connect_errors=1)
+    conn_pool = make_pool(event_loop, transport_class, min_conns=3)
+    with pytest.raises(OSError):
+        await conn_pool.init_pool()
+    # The connections that did open are closed again
+    assert all(transport.closed for transport in transport_class.instances)
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_connect_timeout(event_loop):
+    transport_class = fakes.transport_class()
+    transport_class.connect_delay = 1
+    conn_pool = make_pool(event_loop, transport_class, min_conns=2,
+                          connect_timeout=0.02)
+    with pytest.raises(exception.ConnectTimeoutError):
+        await conn_pool.init_pool()
+    await conn_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_cluster_marks_hosts_down(event_loop):
+    transport_class = fakes.transport_class()
+    transport_class.connect_delay = 0.05
+    cluster = await Cluster.open(
+        event_loop, hosts=['up1', 'down', 'up2'], min_conns=2,
+        connect_timeout=0.1, transport=transport_class)
+    # Hosts and their connections are opened at the same time
+    assert len(transport_class.instances) == 6
+    assert [host.url for host in cluster.hosts] == [
+        'ws://up1:8182/gremlin', 'ws://up2:8182/gremlin']
+    [down] = cluster.down_hosts
+    assert down.down
+    assert isinstance(down.error, exception.ConnectTimeoutError)
+    conn = await cluster.get_connection(hostname='up2')
+    conn.release()
+    with pytest.raises(exception.ConnectionLostError):
+        await cluster.get_connection(hostname='down')
+    await cluster.close()
+
+
+@pytest.mark.asyncio
+async def test_cluster_all_hosts_down(event_loop):
+    with pytest.raises(exception.ConnectTimeoutError):
+        await Cluster.open(event_loop, hosts=['down'], connect_timeout=0.01,
+                           transport=fakes.transport_class())